@@ -0,0 +1,327 @@
+import os
+import queue
+import sys
+import threading
+import time
+
+import metrics
+
+
+def resource_path(relative_path):
+    """ 获取资源的绝对路径，对开发和PyInstaller打包都有效 """
+    try:
+        base_path = sys._MEIPASS
+    except Exception:
+        base_path = os.path.abspath(".")
+    return os.path.join(base_path, relative_path)
+
+
+def resolve_sound_path(sound_file):
+    # 如果是默认的相对路径，使用 resource_path
+    if not os.path.isabs(sound_file):
+        sound_file = resource_path(sound_file)
+    return sound_file
+
+
+class DecodedSound:
+    """解码后的 PCM 数据（16 位有符号整数，交错存放各声道）"""
+
+    __slots__ = ("path", "samples", "channels", "sample_rate")
+
+    def __init__(self, path, samples, channels, sample_rate):
+        self.path = path
+        self.samples = samples
+        self.channels = channels
+        self.sample_rate = sample_rate
+
+    @property
+    def duration(self):
+        return len(self.samples) / (self.channels * self.sample_rate)
+
+
+class SoundSequence:
+    """无法预混的音型：依次播放的已解码声音，中间夹着静音秒数（float）"""
+
+    __slots__ = ("steps",)
+
+    def __init__(self, steps):
+        self.steps = steps
+
+
+class MiniaudioBackend:
+    """使用 miniaudio 把声音一次性解码为内存中的 PCM，并通过常驻的输出设备播放"""
+
+    name = "miniaudio"
+
+    def __init__(self):
+        import miniaudio
+        self.miniaudio = miniaudio
+        self.device = None
+        self.device_format = None
+
+    def decode(self, path):
+        decoded = self.miniaudio.decode_file(path, output_format=self.miniaudio.SampleFormat.SIGNED16)
+        return DecodedSound(path, decoded.samples, decoded.nchannels, decoded.sample_rate)
+
+    def prepare(self, sound):
+        """预混好的音型（DecodedSound）可以直接播放"""
+        return sound
+
+    def _device_for(self, sound):
+        device_format = (sound.channels, sound.sample_rate)
+        if self.device is None or self.device_format != device_format:
+            if self.device is not None:
+                self.device.close()
+            self.device = self.miniaudio.PlaybackDevice(
+                output_format=self.miniaudio.SampleFormat.SIGNED16,
+                nchannels=sound.channels,
+                sample_rate=sound.sample_rate,
+            )
+            self.device_format = device_format
+        return self.device
+
+    def play(self, sound):
+        """阻塞播放，直到整段 PCM 输出完毕"""
+        finished = threading.Event()
+        samples = sound.samples
+        channels = sound.channels
+
+        def stream():
+            position = 0
+            frames = yield samples[0:0]
+            while position < len(samples):
+                end = position + frames * channels
+                chunk = samples[position:end]
+                position = end
+                frames = yield chunk
+            finished.set()
+            while True:
+                frames = yield samples[0:0]
+
+        device = self._device_for(sound)
+        generator = stream()
+        next(generator)
+        device.start(generator)
+        finished.wait(sound.duration + 1)
+        device.stop()
+
+    def close(self):
+        if self.device is not None:
+            self.device.close()
+            self.device = None
+
+
+class PlaysoundBackend:
+    """playsound 只能按文件名播放，无法预解码；缓存中保存的是已确认存在的路径"""
+
+    name = "playsound"
+
+    def __init__(self):
+        from playsound import playsound
+        self.playsound = playsound
+        self.temp_files = []
+
+    def decode(self, path):
+        with open(path, 'rb'):
+            pass # 只检查文件能否打开，真正的解码由 playsound 完成
+        return path
+
+    def prepare(self, sound):
+        """playsound 只能按文件名播放：把预混好的音型写成临时 WAV 文件"""
+        import tempfile
+        import wave
+        fd, path = tempfile.mkstemp(prefix="focus-alert-", suffix=".wav")
+        with os.fdopen(fd, 'wb') as f, wave.open(f, 'wb') as out:
+            out.setnchannels(sound.channels)
+            out.setsampwidth(2)
+            out.setframerate(sound.sample_rate)
+            out.writeframes(sound.samples.tobytes())
+        self.temp_files.append(path)
+        return path
+
+    def play(self, sound):
+        self.playsound(sound)
+
+    def close(self):
+        for path in self.temp_files:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+        self.temp_files = []
+
+
+def default_backend():
+    """优先使用能预解码的 miniaudio，否则退回 playsound；两者都没有时抛出 ImportError"""
+    try:
+        return MiniaudioBackend()
+    except ImportError:
+        return PlaysoundBackend()
+
+
+class LatencyStats:
+    """提示音从请求到开始播放的延迟统计（秒）"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.last = 0.0
+        self.max = 0.0
+
+    def record(self, latency):
+        self.count += 1
+        self.total += latency
+        self.last = latency
+        if latency > self.max:
+            self.max = latency
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def as_dict(self):
+        return {"count": self.count, "last": self.last, "mean": self.mean, "max": self.max}
+
+
+class AudioPlayer:
+    """提示音子系统：每个声音文件只解码一次，由一个常驻线程通过有界队列依次播放
+
+    除了按路径播放声音文件，还可以用 set_pattern() 声明提示音型（见 sound_patterns），
+    每个音型在第一次播放或预加载时编译成一段预混好的 PCM，之后整段作为一个流播放。
+    播放线程和音频后端都在第一次请求时才创建，音频库的导入不会拖慢启动。
+    play() 从不阻塞调用者；队列满时新的请求会被丢弃并计数。
+    解码和播放失败通过 on_error(message) 回调报告（在播放线程中调用）。
+    """
+
+    def __init__(self, backend_factory, on_error=None, max_pending=4):
+        self.backend_factory = backend_factory
+        self.backend = None
+        self.on_error = on_error
+        self.latency = LatencyStats()
+        self.latency_histogram = metrics.histogram(
+            "focus_timer_alert_latency_seconds", "提示音从请求到开始播放的延迟")
+        self.dropped = 0
+        self._cache = {}  # 路径或 ("pattern", 名称) -> 后端可以直接播放的声音
+        self._patterns = {}  # 名称 -> (音型, 提示音文件路径)
+        self._cache_lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._worker = None
+        self._worker_lock = threading.Lock()
+
+    def load(self, path):
+        """返回 path 对应的已解码声音，首次使用时解码并缓存；path 也可以是音型的键"""
+        with self._cache_lock:
+            sound = self._cache.get(path)
+            source = self._patterns.get(path[1]) if isinstance(path, tuple) else None
+        if sound is None:
+            if not isinstance(path, tuple):
+                sound = self.backend.decode(path)
+            elif source is None:
+                raise ValueError(f"未定义的音型: {path[1]}")
+            else:
+                import sound_patterns
+                try:
+                    sound = self.backend.prepare(sound_patterns.render(*source, name=path[1]))
+                except ValueError:
+                    # 没有 miniaudio 时只能混音 16 位 WAV；只用到文件的音型退回由后端逐个播放文件
+                    steps = sound_patterns.file_steps(*source)
+                    if steps is None:
+                        raise
+                    sound = SoundSequence(tuple(step if isinstance(step, float) else self.backend.decode(step)
+                                                for step in steps))
+            with self._cache_lock:
+                # 编译期间音型被修改时不缓存旧结果
+                if source is None or self._patterns.get(path[1]) == source:
+                    self._cache[path] = sound
+        return sound
+
+    def set_pattern(self, name, spec, sound_path):
+        """声明或更新一个音型；只有这个音型的内容或它引用的提示音文件变化时才丢弃其编译结果"""
+        with self._cache_lock:
+            if self._patterns.get(name) == (spec, sound_path):
+                return
+            self._patterns[name] = (spec, sound_path)
+            self._cache.pop(("pattern", name), None)
+
+    def play_pattern(self, name):
+        self.play(("pattern", name))
+
+    def preload_pattern(self, name):
+        self.preload(("pattern", name))
+
+    def invalidate(self, path=None):
+        """丢弃某个（或全部）声音的缓存，下次播放时重新解码"""
+        with self._cache_lock:
+            if path is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(path, None)
+
+    def preload(self, path):
+        """在播放线程中提前解码，让第一次提示也没有解码延迟"""
+        self._submit(("load", path, None))
+
+    def play(self, path):
+        self._submit(("play", path, time.perf_counter()))
+
+    def _submit(self, request):
+        if self._worker is None:
+            with self._worker_lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, name="AudioPlayer", daemon=True)
+                    self._worker.start()
+        try:
+            self._queue.put_nowait(request)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        if self._worker is None:
+            return
+        try:
+            self._queue.put_nowait(None)
+        except queue.Full:
+            pass # 播放线程是守护线程，进程退出时会随之结束
+
+    def _run(self):
+        try:
+            self.backend = self.backend_factory()
+        except ImportError:
+            self._report("错误：未安装音频库。\n请在终端运行 'pip install miniaudio' 或 'pip install playsound==1.2.2'")
+            return # 不再消费队列，之后的请求在队列满后被丢弃
+
+        while True:
+            request = self._queue.get()
+            if request is None:
+                self.backend.close()
+                return
+            self._handle(*request)
+
+    def _handle(self, action, path, requested_at):
+        """在播放线程中处理一个请求：按需解码，然后播放"""
+        try:
+            sound = self.load(path)
+            if action == "play":
+                latency = time.perf_counter() - requested_at
+                self.latency.record(latency)
+                if self.latency_histogram is not None:
+                    self.latency_histogram.observe(latency)
+                self._play(sound)
+        except FileNotFoundError as e:
+            self._report(f"找不到声音文件:\n{e.filename or path}")
+        except Exception as e:
+            self._report(f"无法播放声音: {e}")
+
+    def _play(self, sound):
+        if not isinstance(sound, SoundSequence):
+            self.backend.play(sound)
+            return
+        for step in sound.steps:
+            if isinstance(step, float):
+                time.sleep(step)
+            else:
+                self.backend.play(step)
+
+    def _report(self, message):
+        if self.on_error:
+            self.on_error(message)
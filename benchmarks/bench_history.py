@@ -0,0 +1,93 @@
+"""历史导出基准：在合成的多年日志上测量查询和列式导出的吞吐量与峰值内存
+
+用法: python benchmarks/bench_history.py [--sessions 20000] [--format npy]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from journal import (  # noqa: E402
+    FOCUS, MICRO_BREAK, BREAK, PHASE_CODES, SETTING_FIELDS,
+    PHASE_START, PHASE_END, MICRO_BREAK_FIRED, STOP, SETTINGS_VERSION, SETTING_VALUE,
+    pack_record,
+)
+from history import EVENT_COLUMNS, FORMATS, SESSION_COLUMNS, export, iter_events, iter_sessions  # noqa: E402
+
+
+def synthesize_journal(path, sessions, seed=0):
+    """每小时一个会话：设置记录、一轮 25 或 45 分钟的专注（含若干微休息）和大休息；返回记录数"""
+    rng = random.Random(seed)
+    t = 1600000000.0
+    count = 0
+    with open(path, 'wb') as f:
+        f.write(b"FTJ1")
+        for _ in range(sessions):
+            focus = rng.choice((25, 45))
+            values = {"focus_minutes": focus, "break_minutes": 5, "micro_break_seconds": 10,
+                      "random_interval_min": 3, "random_interval_max": rng.choice((5, 8))}
+            chunk = [pack_record(SETTINGS_VERSION, 0, t, 0, 1)]
+            chunk += [pack_record(SETTING_VALUE, code, t, 0, values[name]) for code, name in enumerate(SETTING_FIELDS, 1)]
+            chunk.append(pack_record(PHASE_START, PHASE_CODES[FOCUS], t, 1))
+            moment = t
+            while moment < t + focus * 60 - 300:
+                moment += rng.randint(180, 300)
+                chunk.append(pack_record(MICRO_BREAK_FIRED, PHASE_CODES[MICRO_BREAK], moment, 1, 10))
+                chunk.append(pack_record(PHASE_START, PHASE_CODES[MICRO_BREAK], moment, 1))
+                chunk.append(pack_record(PHASE_END, PHASE_CODES[MICRO_BREAK], moment + 10, 1, 10))
+            chunk.append(pack_record(PHASE_END, PHASE_CODES[FOCUS], t + focus * 60, 1, focus * 60))
+            chunk.append(pack_record(PHASE_START, PHASE_CODES[BREAK], t + focus * 60, 1))
+            chunk.append(pack_record(PHASE_END, PHASE_CODES[BREAK], t + focus * 60 + 300, 1, 300))
+            chunk.append(pack_record(STOP, 0, t + focus * 60 + 300, 1))
+            f.write(b"".join(chunk))
+            count += len(chunk)
+            t += 3600
+    return count
+
+
+def measure(label, func):
+    """先不带 tracemalloc 计时（它会让分配密集的代码慢一个数量级），再单独跑一次量峰值内存"""
+    started = time.perf_counter()
+    rows = func()
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"{label}: {rows} 行, {elapsed:.2f} 秒 ({rows / elapsed / 1e3:.0f} 千行/秒), 峰值内存 {peak / 1e6:.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=20000)
+    parser.add_argument("--format", choices=FORMATS, default="npy")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        journal_path = os.path.join(directory, "journal.bin")
+        records = synthesize_journal(journal_path, args.sessions)
+        print(f"合成日志: {records} 条记录, {os.path.getsize(journal_path) / 1e6:.1f} MB")
+        journals = [("bench", journal_path)]
+
+        measure("导出全部事件", lambda: export(iter_events(journals), EVENT_COLUMNS,
+                                         os.path.join(directory, "events"), args.format))
+        measure("导出全部会话", lambda: export(iter_sessions(journals), SESSION_COLUMNS,
+                                         os.path.join(directory, "sessions"), args.format))
+        measure("按设置过滤会话", lambda: export(
+            iter_sessions(journals, where={"focus_minutes": 45, "random_interval_max": (6, 10)}),
+            SESSION_COLUMNS, os.path.join(directory, "filtered"), args.format))
+
+        # 只查最后一天：二分查找跳过之前的全部历史
+        since = 1600000000.0 + (args.sessions - 24) * 3600
+        started = time.perf_counter()
+        rows = sum(1 for _ in iter_sessions(journals, since=since))
+        print(f"最近 24 小时的会话: {rows} 个, {(time.perf_counter() - started) * 1000:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""多计时器基准：在一个调度线程上运行上万个计时器，报告每个计时器的内存和 CPU 开销
+
+用法: python benchmarks/bench_multi_timer.py [--timers 10000] [--simulated-hours 4] [--realtime-seconds 5]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from multi_timer import TimerManager  # noqa: E402
+from settings_manager import Settings  # noqa: E402
+from timer_engine import VirtualClock  # noqa: E402
+
+
+class EventCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, timer_id, event, *args):
+        self.count += 1
+
+
+def measure_memory(timers, settings):
+    """只统计计时器本身（状态对象、堆中的截止时间、监听器）新增的内存"""
+    tracemalloc.start()
+    manager = TimerManager(on_event=EventCounter(), clock=VirtualClock())
+    before = tracemalloc.get_traced_memory()[0]
+    for timer_id in range(timers):
+        manager.add(timer_id, settings)
+    manager.run(until=0)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / timers, len(manager.scheduler)
+
+
+def measure_simulated(timers, settings, hours):
+    """在虚拟时钟上跑若干小时：CPU 秒数 / 模拟秒数 就是真实运行时需要的 CPU 占比"""
+    counter = EventCounter()
+    manager = TimerManager(on_event=counter, clock=VirtualClock())
+    for timer_id in range(timers):
+        manager.add(timer_id, settings)
+    started = time.process_time()
+    manager.run(until=hours * 3600)
+    cpu = time.process_time() - started
+    return cpu, counter.count, len(manager.scheduler)
+
+
+def measure_realtime(timers, settings, seconds):
+    """真实时钟下运行一段时间（使用很短的微休息间隔加大负载），统计进程 CPU 占用"""
+    counter = EventCounter()
+    manager = TimerManager(on_event=counter)
+    for timer_id in range(timers):
+        manager.add(timer_id, settings)
+    started_cpu, started = time.process_time(), time.perf_counter()
+    manager.start_thread()
+    time.sleep(seconds)
+    threads = threading.active_count()
+    manager.shutdown()
+    elapsed = time.perf_counter() - started
+    return (time.process_time() - started_cpu) / elapsed, counter.count / elapsed, threads
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--timers", type=int, default=10000)
+    parser.add_argument("--simulated-hours", type=float, default=4)
+    parser.add_argument("--realtime-seconds", type=float, default=5)
+    args = parser.parse_args()
+
+    settings = Settings()
+    per_timer, heap = measure_memory(args.timers, settings)
+    print(f"{args.timers} 个计时器: 每个约 {per_timer:.0f} 字节, 截止时间堆 {heap} 项")
+
+    cpu, events, heap = measure_simulated(args.timers, settings, args.simulated_hours)
+    simulated = args.simulated_hours * 3600
+    print(f"模拟 {args.simulated_hours:g} 小时: CPU {cpu:.2f} 秒, 事件 {events} 个, "
+          f"结束时堆 {heap} 项")
+    print(f"  折合真实运行 CPU 占用 {cpu / simulated * 100:.4f}%, "
+          f"每个计时器每小时 {cpu / args.timers / args.simulated_hours * 1e6:.1f} µs")
+
+    # 1-2 分钟的微休息间隔，事件频率约为默认设置的 3 倍
+    busy = Settings(focus_minutes=5, break_minutes=1, micro_break_seconds=5,
+                    random_interval_min=1, random_interval_max=2)
+    cpu_share, rate, threads = measure_realtime(args.timers, busy, args.realtime_seconds)
+    print(f"真实时钟 {args.realtime_seconds:g} 秒（高负载设置）: CPU 占用 {cpu_share * 100:.1f}%, "
+          f"{rate:.0f} 事件/秒, 运行中线程数 {threads}")
+
+
+if __name__ == '__main__':
+    main()
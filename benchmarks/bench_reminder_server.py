@@ -0,0 +1,146 @@
+"""提醒服务扇出基准：大量本地订阅者（其中一部分故意不读数据）下的发布开销与投递延迟
+
+用法: python benchmarks/bench_reminder_server.py [--subscribers 100 1000 5000] [--slow 0.1] [--events 200]
+
+每一档订阅者数量下，从调度线程连续发布 --events 个事件（间隔 --interval 秒），测量：
+  - 生产者每次发布的耗时（只有编码和 call_soon_threadsafe）
+  - 生产者线程醒来的延迟：扇出在事件循环中与它争用 GIL，这一项随订阅者数量增长，
+    反映的是计时线程实际会被拖慢多少
+  - 正常订阅者收到最后一个事件的延迟（P50/P99）
+  - 慢订阅者被合并跳过的中间版本数，以及进程 RSS
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reminder_server import ReminderService  # noqa: E402
+from settings_manager import Settings  # noqa: E402
+
+
+def raise_fd_limit(needed):
+    try:
+        import resource
+    except ImportError:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < needed:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (min(needed, hard), hard))
+
+
+def rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except (OSError, ValueError):
+        return float("nan")
+
+
+async def connect(path, port):
+    if path:
+        return await asyncio.open_unix_connection(path)
+    return await asyncio.open_connection("127.0.0.1", port)
+
+
+async def fast_subscriber(reader, last_seq, latencies):
+    """持续读取；收到最后一个基准事件时记录延迟"""
+    async for line in reader:
+        state = json.loads(line)
+        if state.get("seq") == last_seq:
+            latencies.append(time.perf_counter() - state["sent_at"])
+            return
+
+
+def producer(service, events, interval, publish_costs, wake_delays, done):
+    """模拟调度线程上的事件源：每次只调用一次 publish_threadsafe，并记录睡眠后晚醒了多久"""
+    state = dict(service.listener.state)
+    for seq in range(1, events + 1):
+        state.update(event="tick", remaining=events - seq, seq=seq, sent_at=time.perf_counter())
+        started = time.perf_counter()
+        service.publish_threadsafe(state)
+        publish_costs.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        time.sleep(interval)
+        wake_delays.append(time.perf_counter() - started - interval)
+    done.set()
+
+
+async def run_round(subscribers, slow_ratio, events, interval, path):
+    service = ReminderService(Settings.from_dict({}), autostart=False, max_subscribers=subscribers)
+    loop = asyncio.get_running_loop()
+    ready = loop.create_future()
+    serve_task = asyncio.ensure_future(service.serve(unix_path=path, port=0, ready=ready))
+    server = await ready
+    port = None if path else server.sockets[0].getsockname()[1]
+
+    slow_count = int(subscribers * slow_ratio)
+    connections = []
+    for _ in range(subscribers):
+        connections.append(await connect(path, port))
+    while service.subscribers < subscribers:
+        await asyncio.sleep(0.01)
+
+    latencies = []
+    readers = [asyncio.ensure_future(fast_subscriber(reader, events, latencies))
+               for reader, _ in connections[slow_count:]]
+    publish_costs = []
+    wake_delays = []
+    done = threading.Event()
+    thread = threading.Thread(target=producer, args=(service, events, interval, publish_costs, wake_delays, done))
+    thread.start()
+    await asyncio.wait_for(asyncio.gather(*readers), timeout=60)
+    await loop.run_in_executor(None, done.wait)
+    thread.join()
+
+    result = {
+        "subscribers": subscribers,
+        "slow": slow_count,
+        "publish_us_mean": statistics.mean(publish_costs) * 1e6,
+        "publish_us_max": max(publish_costs) * 1e6,
+        "wake_ms_p99": sorted(wake_delays)[int(len(wake_delays) * 0.99) - 1] * 1000,
+        "wake_ms_max": max(wake_delays) * 1000,
+        "latency_ms_p50": statistics.median(latencies) * 1000,
+        "latency_ms_p99": sorted(latencies)[int(len(latencies) * 0.99) - 1] * 1000 if latencies else 0.0,
+        "coalesced": service.coalesced,
+        "rss_mb": rss_mb(),
+    }
+    for _, writer in connections:
+        writer.close()
+    serve_task.cancel()
+    try:
+        await serve_task
+    except asyncio.CancelledError:
+        pass
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--subscribers", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--slow", type=float, default=0.1, help="不读取数据的慢订阅者比例")
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--interval", type=float, default=0.002, help="事件间隔（秒）")
+    parser.add_argument("--tcp", action="store_true", help="使用 TCP 而不是 Unix 套接字")
+    args = parser.parse_args()
+
+    raise_fd_limit(max(args.subscribers) * 2 + 100)
+    print(f"{'订阅者':>8} {'慢':>6} {'发布均值 us':>12} {'发布最大 us':>12} {'晚醒P99 ms':>11} {'晚醒最大 ms':>11} "
+          f"{'延迟P50 ms':>11} {'延迟P99 ms':>11} {'合并版本':>10} {'RSS MB':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        for subscribers in args.subscribers:
+            path = None if args.tcp else os.path.join(directory, f"bench-{subscribers}.sock")
+            r = asyncio.run(run_round(subscribers, args.slow, args.events, args.interval, path))
+            print(f"{r['subscribers']:>8} {r['slow']:>6} {r['publish_us_mean']:>12.1f} {r['publish_us_max']:>12.1f} "
+                  f"{r['wake_ms_p99']:>11.2f} {r['wake_ms_max']:>11.2f} "
+                  f"{r['latency_ms_p50']:>11.2f} {r['latency_ms_p99']:>11.2f} {r['coalesced']:>10} {r['rss_mb']:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""统计视图基准：在合成的 5 年历史上测量打开统计窗口所需的查询时间
+
+用法: python benchmarks/bench_stats.py [--years 5] [--repeat 200]
+"""
+import argparse
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from journal import (  # noqa: E402
+    FOCUS, MICRO_BREAK, BREAK, PHASE_CODES,
+    PHASE_START, PHASE_END, MICRO_BREAK_FIRED, PAUSE, RESUME,
+    pack_record, read_journal,
+)
+from stats import StatsStore  # noqa: E402
+from stats_window import StatsWindow  # noqa: E402
+
+
+def synthesize_journal(path, years, seed=0):
+    """每个工作日 3-5 轮 90/20 循环，每轮约 20 次微休息，偶尔暂停；返回记录数"""
+    rng = random.Random(seed)
+    start = datetime.datetime.combine(datetime.date.today() - datetime.timedelta(days=365 * years),
+                                      datetime.time(9))
+    count = 0
+    with open(path, 'wb') as f:
+        f.write(b"FTJ1")
+        for day in range(365 * years):
+            moment = start + datetime.timedelta(days=day)
+            if moment.weekday() >= 5:
+                continue
+            t = moment.timestamp()
+            chunk = []
+            for cycle in range(1, rng.randint(3, 5) + 1):
+                chunk.append(pack_record(PHASE_START, PHASE_CODES[FOCUS], t, cycle))
+                focus_end = t + 90 * 60
+                t += rng.randint(180, 300)
+                while t < focus_end:
+                    chunk.append(pack_record(MICRO_BREAK_FIRED, PHASE_CODES[MICRO_BREAK], t, cycle, 10))
+                    chunk.append(pack_record(PHASE_START, PHASE_CODES[MICRO_BREAK], t, cycle))
+                    chunk.append(pack_record(PHASE_END, PHASE_CODES[MICRO_BREAK], t + 10, cycle, 10))
+                    t += 10 + rng.randint(180, 300)
+                if rng.random() < 0.2:
+                    chunk.append(pack_record(PAUSE, 0, focus_end, cycle))
+                    chunk.append(pack_record(RESUME, 0, focus_end + 300, cycle, 300))
+                t = focus_end
+                chunk.append(pack_record(PHASE_END, PHASE_CODES[FOCUS], t, cycle, 90 * 60))
+                chunk.append(pack_record(PHASE_START, PHASE_CODES[BREAK], t, cycle))
+                t += 20 * 60
+                chunk.append(pack_record(PHASE_END, PHASE_CODES[BREAK], t, cycle, 20 * 60))
+            f.write(b"".join(chunk))
+            count += len(chunk)
+    return count
+
+
+def open_view(store):
+    """与 StatsWindow.load_stats 相同的查询：最近 14 天和最近 8 周"""
+    today = datetime.date.today()
+    store.query(today - datetime.timedelta(days=StatsWindow.DAYS - 1), today)
+    store.weekly(today - datetime.timedelta(weeks=StatsWindow.WEEKS - 1), today)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        journal_path = os.path.join(directory, "journal.bin")
+        stats_path = os.path.join(directory, "stats.bin")
+
+        started = time.perf_counter()
+        records = synthesize_journal(journal_path, args.years)
+        print(f"合成日志: {records} 条记录, {os.path.getsize(journal_path) / 1e6:.1f} MB, "
+              f"{time.perf_counter() - started:.2f} 秒")
+
+        started = time.perf_counter()
+        store = StatsStore(stats_path)
+        store.rebuild(read_journal(journal_path))
+        print(f"一次性聚合: {time.perf_counter() - started:.2f} 秒, "
+              f"统计文件 {os.path.getsize(stats_path) / 1e3:.1f} KB ({store.day_count} 天)")
+        store.close()
+
+        started = time.perf_counter()
+        store = StatsStore(stats_path)
+        open_view(store)
+        cold = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            open_view(store)
+        warm = (time.perf_counter() - started) / args.repeat
+        store.close()
+        print(f"打开统计视图: 冷启动 {cold * 1000:.2f} ms, 平均 {warm * 1000:.3f} ms")
+
+        started = time.perf_counter()
+        sum(1 for _ in read_journal(journal_path))
+        print(f"对照：完整扫描日志 {(time.perf_counter() - started) * 1000:.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
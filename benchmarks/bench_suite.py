@@ -0,0 +1,370 @@
+"""可复现的基准套件：计时引擎、界面信箱、设置读写、提示音派发、日历索引
+
+用法:
+  python benchmarks/bench_suite.py [--quick] [--output results.json]
+  python benchmarks/bench_suite.py --compare baseline.json [--threshold 0.3]
+
+全部在虚拟时钟和假音频后端上运行，不需要显示器和声卡，随机种子固定。每项指标取
+多次重复中最好的一次（微基准的噪声几乎都来自其他进程，最好值最稳定）。
+--compare 与之前保存的 JSON 逐项比较，任何一项变差超过阈值时以非零状态退出，
+可以直接用在发布前的检查里。
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio import AudioPlayer  # noqa: E402
+from calendar_index import CalendarIndex  # noqa: E402
+from settings_manager import Settings, SettingsManager  # noqa: E402
+from sound_patterns import render  # noqa: E402
+from timer_core import simulate  # noqa: E402
+from ui_mailbox import UiMailbox, STATUS, TIMER  # noqa: E402
+
+# 指标名 -> 方向：越大越好 ("higher") 或越小越好 ("lower")
+DIRECTIONS = {}
+
+
+def metric(results, name, value, direction):
+    DIRECTIONS[name] = direction
+    results[name] = value
+
+
+def best_of(repeat, func, direction):
+    values = [func() for _ in range(repeat)]
+    return max(values) if direction == "higher" else min(values)
+
+
+# --- 计时引擎 ---
+
+def bench_engine(results, quick):
+    """在虚拟时钟上跑完整循环：不带刻度（纯状态机）和带每秒刻度两种情况"""
+    settings = Settings()
+    cycles = 200 if quick else 2000
+
+    def run(ticks, count):
+        started = time.perf_counter()
+        simulate(settings, count, seed=42, ticks=ticks)
+        return count / (time.perf_counter() - started)
+
+    metric(results, "engine.cycles_per_sec", best_of(5, lambda: run(False, cycles), "higher"), "higher")
+    metric(results, "engine.cycles_per_sec_with_ticks", best_of(5, lambda: run(True, cycles // 20), "higher"), "higher")
+
+
+# --- 界面信箱 ---
+
+def bench_mailbox(results, quick):
+    messages = 20000 if quick else 200000
+
+    def post_cost():
+        mailbox = UiMailbox(lambda: None)
+        started = time.perf_counter()
+        for i in range(messages):
+            mailbox.post(TIMER, i)
+            if i % 50 == 0:
+                mailbox.drain()
+        return (time.perf_counter() - started) / messages * 1e9
+
+    metric(results, "mailbox.post_ns", best_of(5, post_cost, "lower"), "lower")
+
+    def cross_thread():
+        """计时线程每秒式地投递，UI 线程被唤醒后 drain；测量投递到交给 UI 的延迟"""
+        wake = threading.Event()
+        mailbox = UiMailbox(wake.set)
+        latencies = []
+        count = messages // 20
+        done = threading.Event()
+
+        def consumer():
+            while not done.is_set() or wake.is_set():
+                if not wake.wait(0.1):
+                    continue
+                wake.clear()
+                now = time.perf_counter()
+                for kind, value in mailbox.drain():
+                    latencies.append(now - value)
+
+        thread = threading.Thread(target=consumer)
+        thread.start()
+        started = time.perf_counter()
+        for i in range(count):
+            mailbox.post(TIMER if i % 2 else STATUS, time.perf_counter())
+            if i % 100 == 0:
+                time.sleep(0) # 让出 GIL，模拟计时线程在两次刻度之间睡眠
+        elapsed = time.perf_counter() - started
+        done.set()
+        thread.join()
+        latencies.sort()
+        return count / elapsed, latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99)]
+
+    runs = [cross_thread() for _ in range(5)]
+    metric(results, "mailbox.cross_thread_posts_per_sec", max(r[0] for r in runs), "higher")
+    metric(results, "mailbox.latency_p50_us", min(r[1] for r in runs) * 1e6, "lower")
+    metric(results, "mailbox.latency_p99_us", min(r[2] for r in runs) * 1e6, "lower")
+
+
+# --- 设置读写 ---
+
+CORRUPT_CONFIGS = {
+    "truncated": b'{"focus_minutes": 90, "break_min',
+    "binary": bytes(random.Random(0).randrange(256) for _ in range(4096)),
+    "invalid_values": b'{"focus_minutes": -5, "random_interval_min": 9, "random_interval_max": 1}',
+    "not_object": b'[1, 2, 3]',
+    "empty": b'',
+}
+
+
+def large_config(keys):
+    """大量无关键（例如被别的工具写进来的数据）加上正常设置，约 keys * 40 字节"""
+    data = {f"extra_{i}": "x" * 24 for i in range(keys)}
+    data.update(Settings().to_dict())
+    return json.dumps(data).encode("utf-8")
+
+
+def time_load(path, repeat):
+    def once():
+        started = time.perf_counter()
+        SettingsManager(path)
+        return time.perf_counter() - started
+    return best_of(repeat, once, "lower") * 1e6
+
+
+def bench_settings(results, quick, directory):
+    repeat = 20 if quick else 100
+    path = os.path.join(directory, "config.json")
+
+    def write(content):
+        with open(path, 'wb') as f:
+            f.write(content)
+
+    write(json.dumps(Settings().to_dict()).encode("utf-8"))
+    metric(results, "settings.load_us", time_load(path, repeat), "lower")
+
+    write(large_config(25000 if quick else 250000))
+    metric(results, "settings.load_large_us", time_load(path, max(3, repeat // 20)), "lower")
+
+    for name, content in CORRUPT_CONFIGS.items():
+        write(content)
+        # 损坏的文件不应该抛出异常，而是退回默认设置
+        assert SettingsManager(path).settings == Settings(), name
+        metric(results, f"settings.load_corrupt_{name}_us", time_load(path, repeat), "lower")
+
+    write(json.dumps(Settings().to_dict()).encode("utf-8"))
+    manager = SettingsManager(path)
+    settings = Settings(focus_minutes=45)
+
+    def save():
+        started = time.perf_counter()
+        manager.save_settings(settings)
+        return time.perf_counter() - started
+    metric(results, "settings.save_us", best_of(repeat, save, "lower") * 1e6, "lower")
+
+    def unchanged_reload():
+        started = time.perf_counter()
+        for _ in range(1000):
+            manager.reload_if_changed()
+        return (time.perf_counter() - started) / 1000
+    metric(results, "settings.reload_unchanged_us", best_of(5, unchanged_reload, "lower") * 1e6, "lower")
+
+
+# --- 提示音派发 ---
+
+class FakeSound:
+    __slots__ = ("path",)
+
+    def __init__(self, path):
+        self.path = path
+
+
+class FakeBackend:
+    """不发声的音频后端：解码和播放都是空操作，只记录播放次数"""
+
+    name = "fake"
+
+    def __init__(self):
+        self.played = 0
+        self.finished = threading.Event()
+        self.expected = None
+
+    def decode(self, path):
+        return FakeSound(path)
+
+    def prepare(self, sound):
+        return sound
+
+    def play(self, sound):
+        self.played += 1
+        if self.played == self.expected:
+            self.finished.set()
+
+    def close(self):
+        pass
+
+
+def play_and_wait(player, backend):
+    backend.finished.clear()
+    backend.expected = backend.played + 1
+    player.play("alert.mp3")
+    backend.finished.wait(5)
+
+
+def bench_audio(results, quick):
+    alerts = 2000 if quick else 20000
+    backend = FakeBackend()
+    player = AudioPlayer(lambda: backend, max_pending=alerts + 1)
+    play_and_wait(player, backend)  # 预热：启动播放线程并完成解码缓存
+
+    def dispatch():
+        """play() 对调用者（计时线程）的开销：请求一次性排进队列"""
+        backend.finished.clear()
+        backend.expected = backend.played + alerts
+        started = time.perf_counter()
+        for _ in range(alerts):
+            player.play("alert.mp3")
+        elapsed = time.perf_counter() - started
+        backend.finished.wait(30)
+        return elapsed / alerts * 1e6
+
+    metric(results, "audio.play_dispatch_us", best_of(3, dispatch, "lower"), "lower")
+
+    # 逐个提示：从请求到后端开始播放的延迟（含线程切换）
+    latencies = []
+    for _ in range(200 if quick else 1000):
+        play_and_wait(player, backend)
+        latencies.append(player.latency.last)
+    player.close()
+    metric(results, "audio.request_to_start_p50_us", statistics.median(latencies) * 1e6, "lower")
+
+    # 编译一个只有合成音的音型（有 NumPy 时走向量化混音）
+    def compile_pattern():
+        started = time.perf_counter()
+        render("chime", None)
+        return time.perf_counter() - started
+    metric(results, "audio.pattern_compile_ms", best_of(3, compile_pattern, "lower") * 1e3, "lower")
+
+
+# --- 日历索引 ---
+
+def write_calendar(path, events, start, uid_prefix):
+    """生成 events 个 20 分钟的会议（UTC），每十个里有一个每周重复"""
+    rng = random.Random(7)
+    lines = ["BEGIN:VCALENDAR"]
+    for i in range(events):
+        begin = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime(start + rng.uniform(0, 30 * 86400)))
+        lines += ["BEGIN:VEVENT", f"UID:{uid_prefix}{i}", f"DTSTART:{begin}", "DURATION:PT20M"]
+        if i % 10 == 0:
+            lines.append("RRULE:FREQ=WEEKLY;COUNT=8")
+        lines.append("END:VEVENT")
+    lines.append("END:VCALENDAR")
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("\n".join(lines))
+
+
+def bench_calendar(results, quick, directory):
+    files = 4
+    events = 2500 if quick else 25000
+    now = 1767225600.0  # 固定的起点，结果与运行日期无关
+    for n in range(files):
+        write_calendar(os.path.join(directory, f"cal{n}.ics"), events // files, now, f"c{n}-")
+
+    def build():
+        calendar = CalendarIndex([directory])
+        started = time.perf_counter()
+        calendar.refresh(now)
+        return time.perf_counter() - started
+    metric(results, "calendar.build_ms", best_of(3, build, "lower") * 1e3, "lower")
+
+    calendar = CalendarIndex([directory])
+    calendar.refresh(now)
+    changed = os.path.join(directory, "cal0.ics")
+
+    def incremental():
+        # 只改动一个文件：只有它被重新解析
+        stat = os.stat(changed)
+        os.utime(changed, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+        started = time.perf_counter()
+        calendar.refresh(now)
+        return time.perf_counter() - started
+    metric(results, "calendar.incremental_ms", best_of(3, incremental, "lower") * 1e3, "lower")
+
+    probes = [now + random.Random(3).uniform(0, 30 * 86400) for _ in range(1000)]
+    lookup = calendar.busy_until
+
+    def query():
+        started = time.perf_counter()
+        for when in probes:
+            lookup(when)
+        return (time.perf_counter() - started) / len(probes)
+    metric(results, "calendar.lookup_us", best_of(20, query, "lower") * 1e6, "lower")
+
+
+# --- 比较 ---
+
+def compare(current, baseline, threshold):
+    """返回 [(指标, 基线, 当前, 变化比例)]，只包含变差超过阈值的项"""
+    regressions = []
+    for name, value in current.items():
+        old = baseline.get(name)
+        direction = DIRECTIONS.get(name)
+        if not old or direction is None:
+            continue
+        change = (value - old) / old
+        worse = -change if direction == "higher" else change
+        print(f"  {name:42s} {old:14.2f} -> {value:14.2f}  {change:+7.1%}")
+        if worse > threshold:
+            regressions.append((name, old, value, change))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--quick", action="store_true", help="缩小规模，几秒内跑完")
+    parser.add_argument("--output", help="把结果写入 JSON 文件")
+    parser.add_argument("--compare", help="与之前保存的 JSON 比较")
+    parser.add_argument("--threshold", type=float, default=0.3, help="判定为退化的变差比例")
+    args = parser.parse_args()
+
+    results = {}
+    bench_engine(results, args.quick)
+    bench_mailbox(results, args.quick)
+    with tempfile.TemporaryDirectory() as directory:
+        bench_settings(results, args.quick, directory)
+    with tempfile.TemporaryDirectory() as directory:
+        bench_calendar(results, args.quick, directory)
+    bench_audio(results, args.quick)
+
+    if not args.compare:
+        for name, value in results.items():
+            print(f"  {name:42s} {value:14.2f}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "quick": args.quick,
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "results": results,
+            }, f, indent=2, ensure_ascii=False)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline["results"], args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} 项指标变差超过 {args.threshold:.0%}:")
+            for name, old, value, change in regressions:
+                print(f"  {name}: {old:.2f} -> {value:.2f} ({change:+.1%})")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""启动耗时报告：测量首帧时间并列出导入耗时最多的模块
+
+用法: python benchmarks/startup_report.py [--runs 5] [--budget-ms 400] [--output startup.json]
+
+每次运行都以 FOCUS_TIMER_STARTUP_PROBE=1 启动 main.py，程序在首帧绘制完成后打印
+FIRST_FRAME_MS 并退出。首帧时间取中位数，超过预算时以非零状态退出，便于在发布前检查。
+另外用 python -X importtime 运行一次，汇总导入耗时，并确认懒加载的模块没有出现在启动路径上。
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 这些模块只应在第一次提示或第一次打开窗口/对话框时导入
+LAZY_MODULES = (
+    "playsound", "miniaudio", "numpy",
+    "settings_window", "stats_window",
+    "tkinter.filedialog", "tkinter.messagebox",
+)
+
+
+def run_probe(extra_args=()):
+    env = dict(os.environ, FOCUS_TIMER_STARTUP_PROBE="1")
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, *extra_args, "main.py"],
+        cwd=ROOT, env=env, capture_output=True, text=True, timeout=60,
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+    for line in result.stdout.splitlines():
+        if line.startswith("FIRST_FRAME_MS"):
+            _, first_frame, _, modules = line.split()
+            return {
+                "first_frame_ms": float(first_frame),
+                "process_ms": wall_ms,
+                "modules": int(modules),
+                "stderr": result.stderr,
+            }
+    raise RuntimeError(f"main.py 没有报告首帧时间:\n{result.stderr}")
+
+
+def parse_importtime(stderr):
+    """解析 -X importtime 的输出，返回 [(模块, 自身微秒, 累计微秒)]"""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append((name.strip(), int(self_us), int(cumulative_us)))
+    return modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=400.0, help="首帧时间预算（中位数，毫秒）")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--output", help="把结果写入 JSON 文件，便于跨版本比较")
+    args = parser.parse_args()
+
+    run_probe()  # 预热：生成 .pyc，避免第一次运行的编译时间干扰结果
+    runs = [run_probe() for _ in range(args.runs)]
+    first_frame = statistics.median(run["first_frame_ms"] for run in runs)
+    process = statistics.median(run["process_ms"] for run in runs)
+
+    imports = parse_importtime(run_probe(["-X", "importtime"])["stderr"])
+    imported = {name for name, _, _ in imports}
+    eager = [name for name in LAZY_MODULES if name in imported]
+    slowest = sorted(imports, key=lambda item: item[2], reverse=True)[:args.top]
+
+    print(f"首帧: 中位数 {first_frame:.1f} ms（预算 {args.budget_ms:.0f} ms），"
+          f"进程总耗时 {process:.1f} ms，已加载模块 {runs[0]['modules']} 个")
+    print(f"\n导入累计耗时前 {args.top}:")
+    for name, self_us, cumulative_us in slowest:
+        print(f"  {cumulative_us / 1000:8.2f} ms  (自身 {self_us / 1000:6.2f} ms)  {name}")
+    if eager:
+        print(f"\n以下模块应当懒加载，却出现在了启动路径上: {', '.join(eager)}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({
+                "first_frame_ms": first_frame,
+                "process_ms": process,
+                "budget_ms": args.budget_ms,
+                "runs": [{k: v for k, v in run.items() if k != "stderr"} for run in runs],
+                "imports": [{"module": n, "self_us": s, "cumulative_us": c} for n, s, c in slowest],
+                "eager_lazy_modules": eager,
+            }, f, indent=2, ensure_ascii=False)
+
+    if first_frame > args.budget_ms or eager:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
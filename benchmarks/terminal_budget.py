@@ -0,0 +1,114 @@
+"""终端版资源预算检查：在伪终端中运行 terminal_app.py，测量常驻内存和 CPU 占用
+
+用法: python benchmarks/terminal_budget.py [--seconds 10] [--rss-mb 20] [--cpu-percent 0.5] [--output terminal.json]
+
+子进程的标准输入输出都接到一个伪终端上，因此会走与真实终端相同的每秒原地刷新路径。
+稳定运行 --seconds 秒后从 /proc 读取 RSS（VmHWM 峰值）和累计 CPU 时间，
+再用 -X importtime 确认 tkinter 从未被导入。任何一项超出预算时以非零状态退出。
+只支持 Linux（依赖 pty 和 /proc）。
+"""
+import argparse
+import json
+import os
+import pty
+import select
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, "terminal_app.py")
+
+
+def read_status(pid):
+    """返回 (VmRSS, VmHWM)，单位 MB"""
+    values = {}
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("VmRSS", "VmHWM"):
+                values[key] = int(value.split()[0]) / 1024
+    return values["VmRSS"], values["VmHWM"]
+
+
+def cpu_seconds(pid):
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def drain(fd, output):
+    while select.select([fd], [], [], 0)[0]:
+        try:
+            chunk = os.read(fd, 65536)
+        except OSError:
+            return
+        if not chunk:
+            return
+        output.append(chunk)
+
+
+def measure(seconds, workdir):
+    master, slave = pty.openpty()
+    process = subprocess.Popen([sys.executable, APP, "--no-journal"], cwd=workdir,
+                               stdin=slave, stdout=slave, stderr=slave, close_fds=True)
+    os.close(slave)
+    output = []
+    try:
+        time.sleep(1) # 跳过解释器启动，只测稳定运行阶段
+        drain(master, output)
+        cpu_start, started = cpu_seconds(process.pid), time.monotonic()
+        deadline = started + seconds
+        while time.monotonic() < deadline:
+            select.select([master], [], [], 0.5)
+            drain(master, output)
+        cpu = cpu_seconds(process.pid) - cpu_start
+        elapsed = time.monotonic() - started
+        rss, peak = read_status(process.pid)
+        os.write(master, b"q")
+        process.wait(timeout=5)
+    finally:
+        if process.poll() is None:
+            process.kill()
+        os.close(master)
+    frames = b"".join(output).count(b"\x1b[2K")
+    return {"rss_mb": rss, "peak_rss_mb": peak, "cpu_percent": cpu / elapsed * 100,
+            "seconds": elapsed, "redraws": frames}
+
+
+def imports_tkinter(workdir):
+    result = subprocess.run([sys.executable, "-X", "importtime", APP, "--no-journal"], cwd=workdir,
+                            stdin=subprocess.DEVNULL, capture_output=True, text=True, timeout=30)
+    return any("tkinter" in line for line in result.stderr.splitlines() if line.startswith("import time:"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--rss-mb", type=float, default=20.0, help="峰值常驻内存预算（MB）")
+    parser.add_argument("--cpu-percent", type=float, default=0.5, help="稳定运行时的 CPU 预算（单核百分比）")
+    parser.add_argument("--output", help="把结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        result = measure(args.seconds, workdir)
+        result["imports_tkinter"] = imports_tkinter(workdir)
+
+    print(f"常驻内存 {result['rss_mb']:.1f} MB（峰值 {result['peak_rss_mb']:.1f} MB，预算 {args.rss_mb:.0f} MB）")
+    print(f"CPU {result['cpu_percent']:.2f}%（预算 {args.cpu_percent}%），"
+          f"{result['seconds']:.1f} 秒内刷新 {result['redraws']} 次")
+    print("tkinter: " + ("已导入（违反预算）" if result["imports_tkinter"] else "未导入"))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(dict(result, rss_budget_mb=args.rss_mb, cpu_budget_percent=args.cpu_percent),
+                      f, indent=2, ensure_ascii=False)
+
+    if (result["peak_rss_mb"] > args.rss_mb or result["cpu_percent"] > args.cpu_percent
+            or result["imports_tkinter"]):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,415 @@
+"""日历感知的提醒：读取本地 .ics 文件，开会或演示时跳过微休息提示、推迟休息结束提示
+
+后台线程定期检查日历文件，只重新解析修改时间或大小变化了的文件，把其中的忙碌时间段
+（含展开后的重复事件）合并成按开始时间排序、互不重叠的区间数组。计时线程只做查询：
+对不可变的快照二分查找，O(log n)，从不解析文件。
+
+支持的 iCalendar 子集：VEVENT 的 DTSTART/DTEND/DURATION（UTC、TZID 或本地时间）、
+RRULE 的 FREQ=DAILY/WEEKLY/MONTHLY/YEARLY 及 INTERVAL/COUNT/UNTIL、WEEKLY 的 BYDAY、
+EXDATE 和 RECURRENCE-ID。全天事件、TRANSP:TRANSPARENT 和 STATUS:CANCELLED 的事件不算忙碌。
+重复事件只展开到 HORIZON_DAYS 天以内，时间窗口每天随后台刷新向前滚动。
+
+日历位置：环境变量 FOCUS_TIMER_CALENDARS（用 os.pathsep 分隔的文件或目录），
+未设置时使用程序目录下的 calendars/ 目录（存在时）。
+"""
+import bisect
+import os
+import re
+import threading
+import time
+from array import array
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+
+from notify import BREAK_END_ALERT
+
+CALENDAR_DIR = 'calendars'
+HORIZON_DAYS = 30
+REFRESH_SECONDS = 60.0
+MAX_DEFER = 2 * 3600  # 忙碌时间比这更长时不再推迟，直接跳过
+MAX_STEPS = 100000    # 每个重复事件最多展开的候选次数
+
+# start 是不带时区的墙上时间，tz 为 None 时按本地时间解释；时间点都是 epoch 秒
+Event = namedtuple("Event", "uid start tz duration rrule exdates recurrence_id busy")
+
+WEEKDAYS = {"MO": 0, "TU": 1, "WE": 2, "TH": 3, "FR": 4, "SA": 5, "SU": 6}
+DURATION_RE = re.compile(r"([+-])?P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$")
+
+_zones = {}
+
+
+def _zone(tzid):
+    """TZID 对应的时区；未知的时区（例如 Windows 时区名）返回 None，按本地时间处理"""
+    if tzid not in _zones:
+        try:
+            from zoneinfo import ZoneInfo
+            _zones[tzid] = ZoneInfo(tzid.strip('"'))
+        except (ImportError, ValueError, KeyError, OSError):
+            _zones[tzid] = None
+    return _zones[tzid]
+
+
+def to_epoch(dt, tz):
+    return dt.replace(tzinfo=tz).timestamp() if tz is not None else dt.timestamp()
+
+
+def parse_datetime(value, params):
+    """返回 (墙上时间, 时区, 是否全天)；时区为 None 时按本地时间，全天值的墙上时间是当天零点"""
+    value = value.strip()
+    if params.get("VALUE") == "DATE" or len(value) == 8:
+        return datetime.strptime(value[:8], "%Y%m%d"), None, True
+    dt = datetime.strptime(value[:15], "%Y%m%dT%H%M%S")
+    if value.endswith("Z"):
+        return dt, timezone.utc, False
+    if "TZID" in params:
+        return dt, _zone(params["TZID"]), False
+    return dt, None, False
+
+
+def parse_duration(value):
+    match = DURATION_RE.match(value.strip())
+    if match is None:
+        raise ValueError(f"无效的 DURATION: {value}")
+    sign, weeks, days, hours, minutes, seconds = match.groups()
+    total = timedelta(weeks=int(weeks or 0), days=int(days or 0), hours=int(hours or 0),
+                      minutes=int(minutes or 0), seconds=int(seconds or 0)).total_seconds()
+    return -total if sign == "-" else total
+
+
+def unfold(text):
+    """把折行（以空格或制表符开头的行）接回上一行"""
+    lines = []
+    for line in text.splitlines():
+        if line[:1] in (" ", "\t") and lines:
+            lines[-1] += line[1:]
+        elif line:
+            lines.append(line)
+    return lines
+
+
+def parse_property(line):
+    head, _, value = line.partition(":")
+    name, *raw_params = head.split(";")
+    params = {}
+    for param in raw_params:
+        key, _, param_value = param.partition("=")
+        params[key.upper()] = param_value
+    return name.upper(), params, value
+
+
+def parse_ics(text):
+    """解析出所有有时间的 VEVENT；无法解析的单个事件被跳过"""
+    events = []
+    props = None
+    for line in unfold(text):
+        upper = line.upper()
+        if upper == "BEGIN:VEVENT":
+            props = []
+        elif upper == "END:VEVENT":
+            if props is not None:
+                try:
+                    event = build_event(props)
+                except (ValueError, KeyError):
+                    event = None
+                if event is not None:
+                    events.append(event)
+            props = None
+        elif props is not None:
+            props.append(parse_property(line))
+    return events
+
+
+def build_event(props):
+    start = end = duration = rrule = recurrence_id = None
+    uid = ""
+    exdates = set()
+    busy = True
+    for name, params, value in props:
+        if name == "DTSTART":
+            start = parse_datetime(value, params)
+        elif name == "DTEND":
+            end = parse_datetime(value, params)
+        elif name == "DURATION":
+            duration = parse_duration(value)
+        elif name == "RRULE":
+            rrule = dict(part.partition("=")[::2] for part in value.upper().split(";") if part)
+        elif name == "EXDATE":
+            for item in value.split(","):
+                dt, tz, _ = parse_datetime(item, params)
+                exdates.add(to_epoch(dt, tz))
+        elif name == "RECURRENCE-ID":
+            dt, tz, _ = parse_datetime(value, params)
+            recurrence_id = to_epoch(dt, tz)
+        elif name == "UID":
+            uid = value
+        elif name == "TRANSP" and value.strip().upper() == "TRANSPARENT":
+            busy = False
+        elif name == "STATUS" and value.strip().upper() == "CANCELLED":
+            busy = False
+    if start is None or start[2]:
+        return None  # 没有开始时间或是全天事件
+    dt, tz, _ = start
+    if duration is None:
+        duration = to_epoch(end[0], end[1]) - to_epoch(dt, tz) if end is not None and not end[2] else 0.0
+    return Event(uid, dt, tz, duration, rrule, frozenset(exdates), recurrence_id, busy)
+
+
+def _add_months(dt, months):
+    """月份相加；目标月份没有这一天（例如 2 月 30 日）时返回 None，与 RRULE 的规则一致"""
+    month = dt.month - 1 + months
+    try:
+        return dt.replace(year=dt.year + month // 12, month=month % 12 + 1)
+    except ValueError:
+        return None
+
+
+def candidate_starts(event, skip_before):
+    """按时间顺序生成重复事件的候选开始时间（墙上时间）
+
+    没有 COUNT 时，DAILY/WEEKLY 直接跳到 skip_before 附近，不从多年前的第一次开始数。
+    """
+    rule = event.rrule
+    start = event.start
+    freq = rule.get("FREQ")
+    interval = max(int(rule.get("INTERVAL", 1) or 1), 1)
+    skip = "COUNT" not in rule and skip_before is not None
+    if freq == "DAILY":
+        step = timedelta(days=interval)
+        k = max(int((skip_before - start).days // interval) - 1, 0) if skip else 0
+        for n in range(k, k + MAX_STEPS):
+            yield start + step * n
+    elif freq == "WEEKLY":
+        days = sorted(WEEKDAYS[day[-2:]] for day in rule.get("BYDAY", "").split(",") if day[-2:] in WEEKDAYS)
+        days = days or [start.weekday()]
+        week = start - timedelta(days=start.weekday())
+        k = max(int((skip_before - week).days // (7 * interval)) - 1, 0) if skip else 0
+        for n in range(k, k + MAX_STEPS):
+            monday = week + timedelta(weeks=n * interval)
+            for day in days:
+                candidate = monday + timedelta(days=day)
+                if candidate >= start:
+                    yield candidate
+    elif freq in ("MONTHLY", "YEARLY"):
+        months = interval if freq == "MONTHLY" else 12 * interval
+        for n in range(MAX_STEPS):
+            candidate = _add_months(start, n * months)
+            if candidate is not None:
+                yield candidate
+    else:
+        yield start  # 不支持的频率：只算第一次
+
+
+def expand(event, window_start, window_end, overridden=frozenset()):
+    """事件在 [window_start, window_end) 内的忙碌区间 [(开始, 结束)]（epoch 秒）"""
+    tz = event.tz
+    duration = event.duration
+    if event.rrule is None:
+        start = to_epoch(event.start, tz)
+        return [(start, start + duration)] if start < window_end and start + duration > window_start else []
+
+    rule = event.rrule
+    count = int(rule["COUNT"]) if "COUNT" in rule else None
+    until = None
+    if "UNTIL" in rule:
+        dt, until_tz, _ = parse_datetime(rule["UNTIL"], {})
+        until = to_epoch(dt, until_tz if until_tz is not None else tz)
+    skip_before = datetime.fromtimestamp(window_start - duration, tz).replace(tzinfo=None) if tz else \
+        datetime.fromtimestamp(window_start - duration)
+    excluded = event.exdates | overridden
+    intervals = []
+    seen = 0
+    for candidate in candidate_starts(event, skip_before):
+        start = to_epoch(candidate, tz)
+        if (until is not None and start > until) or (count is not None and seen >= count) or start >= window_end:
+            break
+        seen += 1
+        if start + duration > window_start and start not in excluded:
+            intervals.append((start, start + duration))
+    return intervals
+
+
+def expand_events(events, window_start, window_end):
+    """展开一个文件中的全部事件；RECURRENCE-ID 覆盖的那一次从重复事件中去掉"""
+    overrides = {}
+    for event in events:
+        if event.recurrence_id is not None:
+            overrides.setdefault(event.uid, set()).add(event.recurrence_id)
+    intervals = []
+    for event in events:
+        if not event.busy or event.duration <= 0:
+            continue
+        overridden = frozenset(overrides.get(event.uid, ())) if event.recurrence_id is None else frozenset()
+        intervals.extend(expand(event, window_start, window_end, overridden))
+    return intervals
+
+
+class BusyIndex:
+    """合并后互不重叠的忙碌区间，按开始时间排序；构造后不再修改，可以跨线程共享"""
+
+    __slots__ = ("starts", "ends")
+
+    def __init__(self, intervals=()):
+        self.starts = array('d')
+        self.ends = array('d')
+        for start, end in sorted(intervals):
+            if self.ends and start <= self.ends[-1]:
+                if end > self.ends[-1]:
+                    self.ends[-1] = end  # 与上一个区间重叠或相接：合并
+            else:
+                self.starts.append(start)
+                self.ends.append(end)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def busy_until(self, when):
+        """when 落在忙碌区间内时返回该区间的结束时间，否则返回 None"""
+        index = bisect.bisect_right(self.starts, when) - 1
+        if index >= 0 and self.ends[index] > when:
+            return self.ends[index]
+        return None
+
+
+class CalendarIndex:
+    """在后台线程中维护 BusyIndex；计时线程只调用 busy_until() / delay_for()"""
+
+    def __init__(self, paths, horizon_days=HORIZON_DAYS, refresh_interval=REFRESH_SECONDS, on_error=None):
+        self.paths = list(paths)
+        self.horizon = horizon_days * 86400
+        self.refresh_interval = refresh_interval
+        self.on_error = on_error
+        self.index = BusyIndex()
+        self.window_start = None
+        self._files = {}  # 路径 -> [签名, 事件列表, 展开后的区间]
+        self._stop = threading.Event()
+        self._thread = None
+        self.parsed = 0      # 累计解析的文件数
+        self.suppressed = 0  # 因忙碌而跳过的提醒数
+        self.deferred = 0    # 因忙碌而推迟的提醒数
+        self.build_seconds = 0.0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="CalendarIndex", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._stop.set()
+
+    def _run(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception as e:
+                self._report(f"刷新日历失败: {e}")
+            if self._stop.wait(self.refresh_interval):
+                return
+
+    def _report(self, message):
+        if self.on_error:
+            self.on_error(message)
+
+    def calendar_files(self):
+        files = []
+        for path in self.paths:
+            if os.path.isdir(path):
+                files.extend(os.path.join(path, name) for name in sorted(os.listdir(path))
+                             if name.lower().endswith(".ics"))
+            elif os.path.exists(path):
+                files.append(path)
+        return files
+
+    def refresh(self, now=None):
+        """重新解析变化了的文件；有任何变化或时间窗口滚动时替换索引，返回是否替换"""
+        started = time.perf_counter()
+        now = time.time() if now is None else now
+        window_start = now - 86400
+        # 窗口每天滚动一次：已解析的事件不用重新解析，只需重新展开
+        rolled = self.window_start is None or window_start - self.window_start >= 86400
+        if rolled:
+            self.window_start = window_start
+        window_end = self.window_start + 86400 + self.horizon
+
+        changed = False
+        current = set()
+        for path in self.calendar_files():
+            current.add(path)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            signature = (stat.st_mtime_ns, stat.st_size)
+            entry = self._files.get(path)
+            if entry is None or entry[0] != signature:
+                try:
+                    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                        events = parse_ics(f.read())
+                except OSError as e:
+                    self._report(f"无法读取日历 {path}: {e}")
+                    continue
+                self.parsed += 1
+                entry = self._files[path] = [signature, events, None]
+                changed = True
+            if entry[2] is None or rolled:
+                entry[2] = expand_events(entry[1], self.window_start, window_end)
+                changed = True
+        for path in set(self._files) - current:
+            del self._files[path]
+            changed = True
+
+        if changed:
+            intervals = []
+            for entry in self._files.values():
+                intervals.extend(entry[2])
+            self.index = BusyIndex(intervals)  # 引用赋值是原子的，查询方看到的总是完整的索引
+        self.build_seconds = time.perf_counter() - started
+        return changed
+
+    def busy_until(self, when):
+        return self.index.busy_until(when)
+
+    def delay_for(self, kind, when):
+        """提醒的处理方式：0 立即发送，正数表示推迟这么多秒，None 表示跳过
+
+        空闲时立即发送；忙碌时休息结束的提醒推迟到忙碌结束（不超过 MAX_DEFER），
+        微休息的提醒直接跳过（会议结束时它早就过时了）。
+        """
+        until = self.index.busy_until(when)
+        if until is None:
+            return 0.0
+        if kind == BREAK_END_ALERT and until - when <= MAX_DEFER:
+            self.deferred += 1
+            return until - when
+        self.suppressed += 1
+        return None
+
+
+def calendar_paths():
+    """FOCUS_TIMER_CALENDARS 中列出的路径；未设置时是存在的 calendars/ 目录"""
+    value = os.environ.get("FOCUS_TIMER_CALENDARS")
+    if value:
+        return [path for path in value.split(os.pathsep) if path]
+    return [CALENDAR_DIR] if os.path.isdir(CALENDAR_DIR) else []
+
+
+def open_calendar(on_error=None):
+    """配置了日历时创建并启动 CalendarIndex（第一次解析也在后台进行），否则返回 None"""
+    paths = calendar_paths()
+    if not paths:
+        return None
+    calendar = CalendarIndex(paths, on_error=on_error)
+    calendar.start()
+    return calendar
+
+
+def route_alert(calendar, scheduler, alert, send):
+    """在调度线程中调用：按日历立即 send(alert)、推迟到忙碌结束后再发送，或者跳过
+
+    推迟的提醒挂在本次会话的调度器上，会话停止时随之丢弃。
+    """
+    delay = calendar.delay_for(alert.kind, alert.timestamp) if calendar is not None else 0.0
+    if delay is None:
+        return
+    if delay:
+        scheduler.call_later(delay, send, alert._replace(timestamp=alert.timestamp + delay))
+    else:
+        send(alert)
@@ -0,0 +1,171 @@
+"""崩溃恢复：把正在进行的循环写入检查点文件，下次启动时提供从中断处继续
+
+检查点只记录 (轮次, 阶段, 剩余秒数, 是否暂停, 写入时的墙上时间)。写入合并到阶段
+变化（同一时刻的多个事件只写一次）和低频心跳上，从不按刻度写；每次写入都是
+临时文件 + fsync + 重命名，进程在任何时刻被杀掉都只会留下完整的旧版本或新版本。
+正常停止或退出时删除检查点，因此启动时存在检查点就说明上次是异常中断。
+
+恢复时按墙上时间计算中断时长：计时在中断期间照常流逝，专注阶段在中断期间结束的，
+超出的部分计入大休息；大休息也已结束的，从下一轮完整的专注开始。暂停中被中断的
+会话剩余时间不变。
+"""
+import json
+import os
+import time
+from collections import namedtuple
+
+from timer_core import CoalescingListener, FOCUS, BREAK
+
+CHECKPOINT_FILE = 'focus_checkpoint.json'
+CHECKPOINT_VERSION = 1
+HEARTBEAT_SECONDS = 60.0
+MAX_DOWNTIME = 12 * 3600  # 中断超过这么久的会话不再提供继续
+
+# 恢复点：从 phase 阶段（FOCUS 或 BREAK）还剩 remaining 秒处继续，downtime 是中断时长
+ResumePoint = namedtuple("ResumePoint", "cycle phase remaining downtime paused")
+
+
+class Checkpointer(CoalescingListener):
+    """作为 listener 挂在 FocusCycle 上，所有方法都在调度器线程中执行
+
+    阶段事件合并成一次写入（见 CoalescingListener）；微休息按专注保存，它的开始和结束
+    不改变检查点，不写。运行中每 heartbeat 秒再写一次，暂停时不写。
+    """
+
+    def __init__(self, path, scheduler, heartbeat=HEARTBEAT_SECONDS, wall_clock=time.time):
+        super().__init__(scheduler)
+        self.path = path
+        self.heartbeat = heartbeat
+        self.wall_clock = wall_clock
+        self.cycle = None
+        self.heartbeat_call = None
+        self.last_payload = None
+        self.writes = 0
+
+    def attach(self, cycle):
+        self.cycle = cycle
+
+    def snapshot(self):
+        """当前状态的字典；没有进行中的会话时返回 None"""
+        cycle = self.cycle
+        if cycle is None or cycle.phase is None:
+            return None
+        at = cycle.paused_at if cycle.paused_at is not None else self.scheduler.now()
+        if cycle.phase == BREAK:
+            phase, end = BREAK, cycle.phase_end
+        else:
+            # 微休息按专注保存：恢复时微休息已经没有意义，专注的结束时间才重要
+            plan = cycle.plan
+            phase, end = FOCUS, plan.origin + plan.offset + cycle.focus_end
+        return {
+            "version": CHECKPOINT_VERSION,
+            "cycle": cycle.cycle_count,
+            "phase": phase,
+            "remaining": round(max(end - at, 0.0), 3),
+            "paused": cycle.paused_at is not None,
+            "saved_at": self.wall_clock(),
+        }
+
+    def flush(self):
+        super().flush()
+        if self.heartbeat_call is not None:
+            self.scheduler.cancel(self.heartbeat_call)
+            self.heartbeat_call = None
+        state = self.snapshot()
+        if state is None:
+            return
+        self.write(state)
+        if not state["paused"]:
+            self.heartbeat_call = self.scheduler.call_later(self.heartbeat, self.flush)
+
+    def write(self, state):
+        payload = json.dumps(state, ensure_ascii=False).encode("utf-8")
+        if payload == self.last_payload:
+            return
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+        self.last_payload = payload
+        self.writes += 1
+
+    # --- CycleListener ---
+
+    def on_micro_break_start(self, seconds):
+        pass
+
+    def on_micro_break_end(self):
+        pass
+
+    def on_stop(self):
+        if self.heartbeat_call is not None:
+            self.scheduler.cancel(self.heartbeat_call)
+            self.heartbeat_call = None
+        self.cycle = None  # 之后还在排队的 flush 不再写入
+        remove_checkpoint(self.path)
+
+
+def load_checkpoint(path=CHECKPOINT_FILE):
+    """读取检查点；不存在、损坏或版本不符时返回 None"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (ValueError, OSError):
+        return None
+    if not isinstance(state, dict) or state.get("version") != CHECKPOINT_VERSION:
+        return None
+    try:
+        if state["phase"] not in (FOCUS, BREAK) or int(state["cycle"]) < 1:
+            return None
+        float(state["remaining"])
+        float(state["saved_at"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    return state
+
+
+def remove_checkpoint(path=CHECKPOINT_FILE):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def plan_resume(state, settings, now=None):
+    """按中断时长推算应从哪里继续，返回 ResumePoint；中断太久时返回 None"""
+    now = time.time() if now is None else now
+    downtime = max(now - float(state["saved_at"]), 0.0)
+    if downtime > MAX_DOWNTIME:
+        return None
+    cycle = int(state["cycle"])
+    phase = state["phase"]
+    remaining = float(state["remaining"])
+    paused = bool(state.get("paused"))
+    if not paused:
+        remaining -= downtime
+        if phase == FOCUS and remaining <= 0:
+            phase = BREAK
+            remaining += settings.break_minutes * 60
+        if phase == BREAK and remaining <= 0:
+            # 中断期间没有人在专注，不替用户补记整轮，直接开始下一轮
+            cycle += 1
+            phase = FOCUS
+            remaining = settings.focus_minutes * 60
+    full = settings.break_minutes * 60 if phase == BREAK else settings.focus_minutes * 60
+    return ResumePoint(cycle, phase, min(remaining, full), downtime, paused)
+
+
+def format_seconds(seconds):
+    minutes, seconds = divmod(int(seconds + 0.5), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes:02d}:{seconds:02d}"
+
+
+def describe_resume(point):
+    """给恢复提示用的说明文字"""
+    phase = "大休息" if point.phase == BREAK else "专注"
+    paused = "，恢复后保持暂停" if point.paused else ""
+    return (f"上次的会话在 {format_seconds(point.downtime)} 前意外中断。\n"
+            f"是否从第 {point.cycle} 轮{phase}继续（还剩 {format_seconds(point.remaining)}{paused}）？")
@@ -0,0 +1,389 @@
+"""会话历史的批量查询与列式导出
+
+查询接口都是生成器，按会话日志的顺序逐条产出，内存占用与历史长度无关：
+
+- iter_sessions(journals, since, until, where)：每个会话一行，包括轮数、专注/休息时长、
+  微休息触发与完成次数、暂停次数与时长，以及会话开始时的设置；
+- iter_events(journals, since, until, where, events)：每条日志记录一行，附带记录时生效的设置。
+
+journals 是 [(用户标签, 日志路径)]，多个用户（或多台机器）的日志一起查询时用户列是标签的下标。
+since/until 是墙钟时间戳：会话按开始时间、事件按记录时间落在 [since, until) 内的才产出；
+日志中查询窗口之前的部分通过二分查找跳过。where 是 {设置项: 值} 或 {设置项: (最小, 最大)}，
+只保留这些设置下进行的会话或事件（早期日志没有记录设置值，此时设置列为 NaN，不匹配任何条件）。
+
+export() 把任一查询的结果按 CHUNK_ROWS 行一块写成列式文件，每块在内存中只是几个定长数组：
+
+- npy：每列一个 NumPy .npy 文件（按 .npy 格式直接写出，不需要安装 NumPy），可用 numpy.load(mmap_mode="r") 打开；
+- csv：每列一个单列 CSV 文件；
+- arrow / parquet：一个 Arrow IPC 或 Parquet 文件，需要 pyarrow，每块是一个 record batch / row group。
+
+每次导出还会写出 columns.json，说明行数、各列类型、用户标签和事件/阶段/设置项的编码。
+
+用法: python history.py sessions|events [日志 | 标签=日志 ...] [--since 2026-01-01] [--until 2026-07-01]
+                        [--where focus_minutes=45] [--where random_interval_min=3..8] [--event micro_break]
+                        [--format npy|csv|arrow|parquet] [--output 目录]
+"""
+import json
+import math
+import os
+import struct
+import sys
+from array import array
+from collections import namedtuple
+from datetime import datetime
+
+from journal import (
+    BREAK, FOCUS, MICRO_BREAK, PHASE_CODES, PHASE_NAMES, SETTING_FIELDS,
+    PHASE_START, PHASE_END, MICRO_BREAK_FIRED, PAUSE, RESUME, STOP, SETTINGS_VERSION, SETTING_VALUE,
+    read_journal,
+)
+
+JOURNAL_FILE = 'focus_journal.bin'
+CHUNK_ROWS = 65536
+
+EVENT_NAMES = {
+    PHASE_START: "phase_start", PHASE_END: "phase_end", MICRO_BREAK_FIRED: "micro_break",
+    PAUSE: "pause", RESUME: "resume", STOP: "stop",
+    SETTINGS_VERSION: "settings_version", SETTING_VALUE: "setting_value",
+}
+EVENT_CODES = {name: code for code, name in EVENT_NAMES.items()}
+
+# (列名, 类型)；类型用 NumPy 的写法，u1/u2/u4 为无符号整数，f8 为双精度浮点
+SETTING_COLUMNS = tuple((name, "f8") for name in SETTING_FIELDS)
+SESSION_COLUMNS = (
+    ("user", "u2"), ("start", "f8"), ("end", "f8"), ("stopped", "u1"), ("cycles", "u4"),
+    ("focus_seconds", "f8"), ("break_seconds", "f8"), ("micro_breaks", "u4"),
+    ("micro_breaks_honored", "u4"), ("pauses", "u4"), ("pause_seconds", "f8"),
+) + SETTING_COLUMNS
+EVENT_COLUMNS = (
+    ("user", "u2"), ("timestamp", "f8"), ("event", "u1"), ("phase", "u1"), ("cycle", "u4"), ("value", "f8"),
+) + SETTING_COLUMNS
+
+SessionRecord = namedtuple("SessionRecord", [name for name, _ in SESSION_COLUMNS])
+EventRecord = namedtuple("EventRecord", [name for name, _ in EVENT_COLUMNS])
+
+TYPECODES = {"u1": "B", "u2": "H", "u4": "I", "f8": "d"}
+NPY_DESCR = {"u1": "|u1", "u2": "<u2", "u4": "<u4", "f8": "<f8"}
+NPY_HEADER_SIZE = 128  # 预留定长文件头，写完后原地填入行数
+
+NAN = math.nan
+# 会话累加器中各计数的下标（与 SESSION_COLUMNS 中 end 之后的列一一对应）
+_END, _STOPPED, _CYCLES, _FOCUS, _BREAK, _MICRO, _HONORED, _PAUSES, _PAUSE_SECONDS = range(2, 11)
+
+
+def compile_where(where):
+    """{设置项: 值或 (最小, 最大)} -> [(下标, 最小, 最大)]；未知的设置项抛出 ValueError"""
+    conditions = []
+    for name, wanted in (where or {}).items():
+        if name not in SETTING_FIELDS:
+            raise ValueError(f"不能按 {name} 过滤（可用: {', '.join(SETTING_FIELDS)}）")
+        low, high = wanted if isinstance(wanted, tuple) else (wanted, wanted)
+        conditions.append((SETTING_FIELDS.index(name), low, high))
+    return conditions
+
+
+def matches(settings, conditions):
+    # NaN（没有记录设置值）与任何数比较都是 False
+    return all(low <= settings[index] <= high for index, low, high in conditions)
+
+
+def _user_records(journals, since):
+    """每个用户的日志记录；给出 since 时跳过它所在会话之前的部分"""
+    for user, (_, path) in enumerate(journals):
+        yield user, read_journal(path, since)
+
+
+def iter_sessions(journals, since=None, until=None, where=None):
+    """逐个产出 SessionRecord；会话以轮次为 0 的设置版本记录开始，到停止记录或下一个会话为止"""
+    conditions = compile_where(where)
+    user_records = _user_records(journals, since)
+    since = -math.inf if since is None else since
+    until = math.inf if until is None else until
+    for user, records in user_records:
+        session = None
+        for event, phase, timestamp, cycle, value in records:
+            if session is None or (event == SETTINGS_VERSION and cycle == 0):
+                if session is not None and session[1] >= since and matches(session[11:], conditions):
+                    yield SessionRecord._make(session)
+                if timestamp >= until:
+                    break
+                session = [user, timestamp, timestamp, 0, 0, 0.0, 0.0, 0, 0, 0, 0.0] + [NAN] * len(SETTING_FIELDS)
+            session[_END] = timestamp
+            if event == PHASE_END:
+                if phase == PHASE_CODES[FOCUS]:
+                    session[_FOCUS] += value
+                elif phase == PHASE_CODES[BREAK]:
+                    session[_CYCLES] += 1
+                    session[_BREAK] += value
+                elif phase == PHASE_CODES[MICRO_BREAK]:
+                    session[_HONORED] += 1
+            elif event == MICRO_BREAK_FIRED:
+                session[_MICRO] += 1
+            elif event == PAUSE:
+                session[_PAUSES] += 1
+            elif event == RESUME:
+                session[_PAUSE_SECONDS] += value
+            elif event == SETTING_VALUE and 0 < phase <= len(SETTING_FIELDS):
+                slot = 10 + phase
+                if session[slot] != session[slot]:  # 只记会话开始时的设置
+                    session[slot] = value
+            elif event == STOP:
+                session[_STOPPED] = 1
+                if phase == PHASE_CODES[FOCUS]:
+                    session[_FOCUS] += value
+                elif phase == PHASE_CODES[BREAK]:
+                    session[_BREAK] += value
+        else:
+            if session is not None and session[1] >= since and matches(session[11:], conditions):
+                yield SessionRecord._make(session)
+
+
+def iter_events(journals, since=None, until=None, where=None, events=None):
+    """逐条产出 EventRecord；events 是要保留的事件编码集合，None 表示全部"""
+    conditions = compile_where(where)
+    user_records = _user_records(journals, since)
+    since = -math.inf if since is None else since
+    until = math.inf if until is None else until
+    for user, records in user_records:
+        settings = [NAN] * len(SETTING_FIELDS)
+        for event, phase, timestamp, cycle, value in records:
+            if event == SETTINGS_VERSION and cycle == 0:
+                settings = [NAN] * len(SETTING_FIELDS)  # 新会话：设置值紧跟在后面
+            elif event == SETTING_VALUE and 0 < phase <= len(SETTING_FIELDS):
+                settings[phase - 1] = value
+            if timestamp < since:
+                continue
+            if timestamp >= until:
+                break
+            if (events is None or event in events) and matches(settings, conditions):
+                yield EventRecord(user, timestamp, event, phase, cycle, value, *settings)
+
+
+# --- 列式导出 ---
+
+def _column_arrays(chunk, columns):
+    """把一块行（元组）转置成每列一个定长数组；转置由 zip 在 C 中完成"""
+    arrays = []
+    for (_, dtype), values in zip(columns, zip(*chunk)):
+        column = array(TYPECODES[dtype], values)
+        if sys.byteorder == "big":
+            column.byteswap()  # 文件中统一用小端
+        arrays.append(column)
+    return arrays
+
+
+class NpyColumns:
+    """每列一个 .npy 文件；文件头预留定长空间，关闭时写入最终行数"""
+
+    def __init__(self, directory, columns):
+        self.columns = columns
+        self.files = []
+        for name, dtype in columns:
+            f = open(os.path.join(directory, f"{name}.npy"), 'wb')
+            f.write(self.header(dtype, 0))
+            self.files.append(f)
+
+    @staticmethod
+    def header(dtype, rows):
+        text = f"{{'descr': '{NPY_DESCR[dtype]}', 'fortran_order': False, 'shape': ({rows},), }}"
+        prefix = b"\x93NUMPY\x01\x00"
+        size = NPY_HEADER_SIZE - len(prefix) - 2
+        return prefix + struct.pack("<H", size) + text.ljust(size - 1).encode("latin1") + b"\n"
+
+    def write(self, arrays):
+        for f, column in zip(self.files, arrays):
+            column.tofile(f)
+
+    def close(self, rows):
+        for f, (_, dtype) in zip(self.files, self.columns):
+            f.seek(0)
+            f.write(self.header(dtype, rows))
+            f.close()
+
+
+class CsvColumns:
+    """每列一个单列 CSV 文件（第一行是列名）"""
+
+    def __init__(self, directory, columns):
+        self.files = []
+        for name, _ in columns:
+            f = open(os.path.join(directory, f"{name}.csv"), 'w', encoding='utf-8', newline='')
+            f.write(name + "\n")
+            self.files.append(f)
+
+    def write(self, arrays):
+        for f, column in zip(self.files, arrays):
+            f.write("\n".join(map(repr, column.tolist())))
+            f.write("\n")
+
+    def close(self, rows):
+        for f in self.files:
+            f.close()
+
+
+class ArrowTable:
+    """Arrow IPC 文件或 Parquet 文件；每块直接引用数组的内存构造一个 record batch"""
+
+    def __init__(self, directory, columns, kind, fmt, metadata):
+        import pyarrow
+        self.pyarrow = pyarrow
+        types = {"u1": pyarrow.uint8(), "u2": pyarrow.uint16(), "u4": pyarrow.uint32(), "f8": pyarrow.float64()}
+        self.types = [types[dtype] for _, dtype in columns]
+        self.schema = pyarrow.schema(
+            [(name, arrow_type) for (name, _), arrow_type in zip(columns, self.types)],
+            metadata={"focus_timer": json.dumps(metadata, ensure_ascii=False)})
+        path = os.path.join(directory, f"{kind}.{fmt}")
+        if fmt == "parquet":
+            import pyarrow.parquet
+            self.writer = pyarrow.parquet.ParquetWriter(path, self.schema)
+        else:
+            import pyarrow.ipc
+            self.writer = pyarrow.ipc.new_file(path, self.schema)
+
+    def write(self, arrays):
+        pyarrow = self.pyarrow
+        batch = pyarrow.record_batch([
+            pyarrow.Array.from_buffers(arrow_type, len(column), [None, pyarrow.py_buffer(column)])
+            for arrow_type, column in zip(self.types, arrays)
+        ], schema=self.schema)
+        if hasattr(self.writer, "write_batch"):
+            self.writer.write_batch(batch)
+        else:
+            self.writer.write_table(pyarrow.Table.from_batches([batch]))
+
+    def close(self, rows):
+        self.writer.close()
+
+
+FORMATS = ("npy", "csv", "arrow", "parquet")
+
+
+def default_format():
+    """有 pyarrow 时导出为 Parquet，否则为每列一个 .npy 文件"""
+    try:
+        import pyarrow  # noqa: F401
+        return "parquet"
+    except ImportError:
+        return "npy"
+
+
+def export(rows, columns, directory, fmt=None, kind="table", users=(), chunk_rows=CHUNK_ROWS):
+    """把查询结果 rows 写成列式文件，返回行数；任意时刻内存中最多只有 chunk_rows 行"""
+    fmt = fmt or default_format()
+    if fmt not in FORMATS:
+        raise ValueError(f"未知的导出格式: {fmt}（可用: {', '.join(FORMATS)}）")
+    os.makedirs(directory, exist_ok=True)
+    metadata = {
+        "kind": kind,
+        "columns": [{"name": name, "dtype": dtype} for name, dtype in columns],
+        "users": list(users),
+        "events": {str(code): name for code, name in EVENT_NAMES.items()},
+        "phases": {str(code): name for code, name in PHASE_NAMES.items()},
+        "settings": {str(code): name for code, name in enumerate(SETTING_FIELDS, 1)},
+    }
+    if fmt in ("arrow", "parquet"):
+        writer = ArrowTable(directory, columns, kind, fmt, metadata)
+    elif fmt == "npy":
+        writer = NpyColumns(directory, columns)
+    else:
+        writer = CsvColumns(directory, columns)
+
+    total = 0
+    chunk = []
+    try:
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= chunk_rows:
+                writer.write(_column_arrays(chunk, columns))
+                total += len(chunk)
+                chunk = []
+        if chunk:
+            writer.write(_column_arrays(chunk, columns))
+            total += len(chunk)
+    finally:
+        writer.close(total)
+    metadata["rows"] = total
+    metadata["format"] = fmt
+    with open(os.path.join(directory, "columns.json"), 'w', encoding='utf-8') as f:
+        json.dump(metadata, f, indent=2, ensure_ascii=False)
+    return total
+
+
+# --- 命令行 ---
+
+def parse_time(text):
+    """"2026-01-01" 或 "2026-01-01T09:30"（本地时间）-> 时间戳"""
+    try:
+        return datetime.fromisoformat(text).timestamp()
+    except ValueError:
+        raise ValueError(f"无效的时间: {text}") from None
+
+
+def parse_where(items):
+    """["focus_minutes=45", "random_interval_min=3..8"] -> {"focus_minutes": 45.0, ...}"""
+    where = {}
+    for item in items:
+        name, sep, value = item.partition("=")
+        if not sep:
+            raise ValueError(f"过滤条件应写成 设置项=值 或 设置项=最小..最大: {item}")
+        try:
+            if ".." in value:
+                low, _, high = value.partition("..")
+                where[name] = (float(low), float(high))
+            else:
+                where[name] = float(value)
+        except ValueError:
+            raise ValueError(f"过滤条件中的值必须是数字: {item}") from None
+    compile_where(where)
+    return where
+
+
+def parse_journals(items):
+    """["alice=a.bin", "b.bin"] -> [("alice", "a.bin"), ("b.bin", "b.bin")]"""
+    journals = []
+    for item in items or [JOURNAL_FILE]:
+        label, sep, path = item.partition("=")
+        journals.append((label, path) if sep else (item, item))
+    return journals
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="查询会话历史并导出为列式文件")
+    parser.add_argument("kind", choices=("sessions", "events"), help="按会话汇总，或导出每条事件")
+    parser.add_argument("journals", nargs="*", help=f"会话日志，可写成 标签=路径（默认 {JOURNAL_FILE}）")
+    parser.add_argument("--since", help="开始时间（含），例如 2026-01-01")
+    parser.add_argument("--until", help="结束时间（不含）")
+    parser.add_argument("--where", action="append", default=[], help="按设置过滤，例如 focus_minutes=45 或 random_interval_min=3..8")
+    parser.add_argument("--event", action="append", choices=sorted(EVENT_CODES), help="只导出这些事件（仅 events）")
+    parser.add_argument("--format", choices=FORMATS, help="默认：有 pyarrow 时为 parquet，否则为 npy")
+    parser.add_argument("--output", help="输出目录（默认 <kind>_export）")
+    args = parser.parse_args()
+
+    try:
+        since = parse_time(args.since) if args.since else None
+        until = parse_time(args.until) if args.until else None
+        where = parse_where(args.where)
+    except ValueError as e:
+        parser.error(str(e))
+    journals = parse_journals(args.journals)
+    if args.kind == "sessions":
+        rows, columns = iter_sessions(journals, since, until, where), SESSION_COLUMNS
+    else:
+        events = {EVENT_CODES[name] for name in args.event} if args.event else None
+        rows, columns = iter_events(journals, since, until, where, events), EVENT_COLUMNS
+    output = args.output or f"{args.kind}_export"
+    try:
+        total = export(rows, columns, output, args.format, kind=args.kind, users=[label for label, _ in journals])
+    except ImportError:
+        print("导出 Arrow/Parquet 需要 pyarrow：pip install pyarrow", file=sys.stderr)
+        sys.exit(1)
+    except (OSError, ValueError) as e:
+        print(f"导出失败: {e}", file=sys.stderr)
+        sys.exit(1)
+    print(f"已导出 {total} 行到 {output}（{args.format or default_format()}）")
+
+
+if __name__ == '__main__':
+    main()
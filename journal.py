@@ -0,0 +1,313 @@
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from collections import namedtuple
+
+from timer_core import CycleListener, FOCUS, MICRO_BREAK, BREAK
+
+# 文件头
+MAGIC = b"FTJ1"
+
+# 事件类型
+PHASE_START = 1
+PHASE_END = 2
+MICRO_BREAK_FIRED = 3
+PAUSE = 4
+RESUME = 5
+STOP = 6
+SETTINGS_VERSION = 7
+SETTING_VALUE = 8
+
+# 随 SETTING_VALUE 记录下来的设置项，编码（存放在阶段字段中）是下标 + 1
+SETTING_FIELDS = ("focus_minutes", "break_minutes", "micro_break_seconds",
+                  "random_interval_min", "random_interval_max")
+
+# 阶段编码
+PHASE_CODES = {FOCUS: 1, MICRO_BREAK: 2, BREAK: 3}
+PHASE_NAMES = {code: name for name, code in PHASE_CODES.items()}
+
+# 每条记录：<I 负载长度> <负载> <I 负载的 CRC32>
+# 负载：事件类型 u8、阶段 u8、墙钟时间戳 f64、轮次 u32、数值 f64
+# 数值的含义随事件而定：阶段结束/停止时为有效时长（秒，不含暂停），继续时为暂停时长，
+# 微休息时为计划的秒数，设置版本记录为版本号，设置项记录为该项的值。
+# 每个会话以轮次为 0 的设置版本记录开始，紧跟着各个设置项的记录。
+_LENGTH = struct.Struct("<I")
+_PAYLOAD = struct.Struct("<BBdId")
+_CRC = struct.Struct("<I")
+RECORD_SIZE = _LENGTH.size + _PAYLOAD.size + _CRC.size
+
+JournalRecord = namedtuple("JournalRecord", "event phase timestamp cycle value")
+
+
+def pack_record(event, phase=0, timestamp=0.0, cycle=0, value=0.0):
+    payload = _PAYLOAD.pack(event, phase, timestamp, cycle, value)
+    return _LENGTH.pack(len(payload)) + payload + _CRC.pack(zlib.crc32(payload))
+
+
+def scan_records(buffer, offset=len(MAGIC)):
+    """从 buffer 中逐条解析记录，产出 (结束偏移, JournalRecord)
+
+    遇到长度越界或校验失败（写到一半的尾部）时停止。
+    未知的更长负载只解析已知的前缀，便于以后追加字段。
+    """
+    end = len(buffer)
+    while offset + _LENGTH.size <= end:
+        (length,) = _LENGTH.unpack_from(buffer, offset)
+        payload_start = offset + _LENGTH.size
+        record_end = payload_start + length + _CRC.size
+        if length < _PAYLOAD.size or record_end > end:
+            return
+        (crc,) = _CRC.unpack_from(buffer, payload_start + length)
+        if zlib.crc32(buffer[payload_start:payload_start + length]) != crc:
+            return
+        yield record_end, JournalRecord._make(_PAYLOAD.unpack_from(buffer, payload_start))
+        offset = record_end
+
+
+def session_offset(buffer, since):
+    """返回包含时间 since 的会话开头的偏移
+
+    日志按时间顺序追加、记录定长，所以先按下标二分查找第一条时间戳不早于 since 的记录，
+    再向前退到所在会话开头的设置版本记录，查询窗口之前的历史不用逐条解析。
+    文件长度没有按记录对齐（例如正在写入的尾部）时退回到从头扫描。
+    """
+    count, rest = divmod(len(buffer) - len(MAGIC), RECORD_SIZE)
+    if rest:
+        return len(MAGIC)
+
+    def payload(index):
+        return _PAYLOAD.unpack_from(buffer, len(MAGIC) + index * RECORD_SIZE + _LENGTH.size)
+
+    low, high = 0, count
+    while low < high:
+        middle = (low + high) // 2
+        if payload(middle)[2] < since:
+            low = middle + 1
+        else:
+            high = middle
+    index = min(low, count - 1)
+    while index > 0:
+        event, _, _, cycle, _ = payload(index)
+        if event == SETTINGS_VERSION and cycle == 0:
+            break
+        index -= 1
+    return len(MAGIC) + max(index, 0) * RECORD_SIZE
+
+
+def read_journal(path, since=None):
+    """通过内存映射读取全部完整记录；文件不存在或为空时什么也不产出
+
+    给出 since 时从包含该时间的会话开头读起（见 session_offset）。
+    """
+    try:
+        f = open(path, 'rb')
+    except FileNotFoundError:
+        return
+    with f:
+        if os.fstat(f.fileno()).st_size <= len(MAGIC):
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            if buffer[:len(MAGIC)] != MAGIC:
+                raise ValueError(f"{path} 不是会话日志文件")
+            offset = len(MAGIC) if since is None else session_offset(buffer, since)
+            for _, record in scan_records(buffer, offset):
+                yield record
+
+
+def _tail_is_intact(f, size):
+    """目前所有记录都是定长的：长度对齐且最后一条校验通过时，整个文件就是完整的"""
+    if size == len(MAGIC):
+        return True
+    if (size - len(MAGIC)) % RECORD_SIZE:
+        return False
+    f.seek(size - RECORD_SIZE)
+    tail = f.read(RECORD_SIZE)
+    return next(scan_records(tail, 0), None) is not None
+
+
+def recover(path):
+    """截掉写到一半的尾部记录，返回有效数据的长度；文件不存在时创建并写入文件头"""
+    if not os.path.exists(path) or os.path.getsize(path) < len(MAGIC):
+        with open(path, 'wb') as f:
+            f.write(MAGIC)
+            f.flush()
+            os.fsync(f.fileno())
+        return len(MAGIC)
+
+    with open(path, 'r+b') as f:
+        size = os.fstat(f.fileno()).st_size
+        if _tail_is_intact(f, size):
+            return size # 快速路径：不必在每次启动时扫描多年的历史
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            if buffer[:len(MAGIC)] != MAGIC:
+                raise ValueError(f"{path} 不是会话日志文件")
+            valid_end = len(MAGIC)
+            for valid_end, _ in scan_records(buffer):
+                pass
+        if valid_end < size:
+            f.truncate(valid_end)
+            f.flush()
+            os.fsync(f.fileno())
+    return valid_end
+
+
+class JournalWriter:
+    """只追加的会话日志
+
+    record() 只在调用线程里打包一条定长记录并放进内存缓冲区；后台线程把第一条记录之后
+    flush_interval 秒内的记录攒成一批写入文件，写入的数据最迟 fsync_interval 秒后 fsync，
+    没有记录时一直睡眠。close() 时写完并 fsync 剩余数据。打开文件时会自动修复崩溃留下的残缺尾部。
+    """
+
+    def __init__(self, path, flush_interval=1.0, fsync_interval=10.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        self.records_written = 0
+        recover(path)
+        self._file = open(path, 'ab')
+        self._pending = []
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="JournalWriter", daemon=True)
+        self._thread.start()
+
+    def record(self, event, phase=None, cycle=0, value=0.0, timestamp=None):
+        data = pack_record(
+            event,
+            PHASE_CODES.get(phase, phase or 0),  # 设置项记录直接传入编码
+            time.time() if timestamp is None else timestamp,
+            cycle,
+            value,
+        )
+        with self._cond:
+            self._pending.append(data)
+            if len(self._pending) == 1:
+                self._cond.notify()  # 唤醒空闲的写入线程；攒批期间不必重复唤醒
+
+    def _take_pending(self):
+        batch = self._pending
+        self._pending = []
+        return batch
+
+    def _run(self):
+        last_fsync = time.monotonic()
+        unsynced = False
+        while True:
+            with self._cond:
+                if not self._pending and not self._closed:
+                    # 空闲时不定时醒来；只有写入的数据还没 fsync 时才等到下一次 fsync 的时间
+                    self._cond.wait(max(last_fsync + self.fsync_interval - time.monotonic(), 0.0)
+                                    if unsynced else None)
+                if self._pending and not self._closed:
+                    self._cond.wait(self.flush_interval)  # 把这段时间内的记录攒成一批
+                batch = self._take_pending()
+                closed = self._closed
+            if batch:
+                self._file.write(b"".join(batch))
+                self._file.flush()
+                self.records_written += len(batch)
+                unsynced = True
+            now = time.monotonic()
+            if unsynced and (closed or now - last_fsync >= self.fsync_interval):
+                os.fsync(self._file.fileno())
+                last_fsync = now
+                unsynced = False
+            if closed:
+                self._file.close()
+                return
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+
+
+class TeeRecorder:
+    """把 JournalListener 产生的记录同时交给多个接收者（日志文件、统计……）"""
+
+    def __init__(self, *recorders):
+        self.recorders = list(recorders)
+
+    def record(self, event, phase=None, cycle=0, value=0.0, timestamp=None):
+        for recorder in self.recorders:
+            recorder.record(event, phase, cycle, value, timestamp)
+
+
+class JournalListener(CycleListener):
+    """把 FocusCycle 的事件写入会话日志，并计算每个阶段不含暂停的有效时长"""
+
+    def __init__(self, writer, clock, wall_clock=time.time):
+        self.writer = writer
+        self.clock = clock
+        self.wall_clock = wall_clock
+        self.cycle_count = 0
+        self.open_phases = {}  # 阶段 -> [开始时间, 累计暂停时长]
+        self.paused_at = None
+
+    def _record(self, event, phase=None, value=0.0):
+        self.writer.record(event, phase, self.cycle_count, value, timestamp=self.wall_clock())
+
+    def _open(self, phase):
+        self.open_phases[phase] = [self.clock.now(), 0.0]
+        self._record(PHASE_START, phase)
+
+    def _active_seconds(self, phase):
+        started, paused = self.open_phases[phase]
+        return self.clock.now() - started - paused
+
+    def _close(self, phase):
+        if phase in self.open_phases:
+            self._record(PHASE_END, phase, self._active_seconds(phase))
+            del self.open_phases[phase]
+
+    def on_settings(self, settings):
+        self._record(SETTINGS_VERSION, value=settings.version)
+        timestamp = self.wall_clock()
+        for code, name in enumerate(SETTING_FIELDS, 1):
+            self.writer.record(SETTING_VALUE, code, self.cycle_count, getattr(settings, name), timestamp=timestamp)
+
+    def on_focus_start(self, cycle_count):
+        self.cycle_count = cycle_count
+        self._open(FOCUS)
+
+    def on_micro_break_start(self, seconds):
+        self._record(MICRO_BREAK_FIRED, MICRO_BREAK, seconds)
+        self._open(MICRO_BREAK)
+
+    def on_micro_break_end(self):
+        self._close(MICRO_BREAK)
+
+    def on_break_start(self, cycle_count):
+        self.cycle_count = cycle_count  # 从检查点恢复到大休息时没有 on_focus_start
+        self._close(FOCUS)
+        self._open(BREAK)
+
+    def on_break_end(self, cycle_count):
+        self._close(BREAK)
+
+    def on_pause(self):
+        self.paused_at = self.clock.now()
+        self._record(PAUSE)
+
+    def on_resume(self, paused_for):
+        for phase_state in self.open_phases.values():
+            phase_state[1] += paused_for
+        self.paused_at = None
+        self._record(RESUME, value=paused_for)
+
+    def on_stop(self):
+        # 停止时记录最外层阶段（专注或大休息）已经进行的有效时长
+        if self.paused_at is not None:
+            self.on_resume(self.clock.now() - self.paused_at)
+        for phase in (FOCUS, BREAK):
+            if phase in self.open_phases:
+                self._record(STOP, phase, self._active_seconds(phase))
+                break
+        else:
+            self._record(STOP)
+        self.open_phases.clear()
@@ -1,246 +1,91 @@
-import tkinter as tk
-from tkinter import ttk, messagebox
-import threading
 import time
-import random
-import queue
-
-try:
-    from playsound import playsound
-except ImportError:
-    messagebox.showerror("依赖缺失", "错误：'playsound' 库未安装。\n请在终端运行 'pip install playsound==1.2.2'")
-    exit()
-
-# --- 全局参数配置 ---
-FOCUS_MINUTES = 90
-BREAK_MINUTES = 20
-MICRO_BREAK_SECONDS = 10
-RANDOM_INTERVAL_MIN = 3
-RANDOM_INTERVAL_MAX = 5
-SOUND_FILE = 'alert.mp3'
-
-class FocusApp:
-    def __init__(self, root):
-        self.root = root
-        self.root.title("专注时钟")
-        self.root.geometry("400x250") # 窗口大小
-
-        # 线程控制
-        self.timer_thread = None
-        self.is_running = threading.Event()
-        self.is_paused = threading.Event()
-        self.update_queue = queue.Queue()
-
-        # GUI 元素
-        self.status_var = tk.StringVar(value="准备就绪")
-        self.timer_var = tk.StringVar(value=f"{FOCUS_MINUTES:02d}:00")
-        
-        # 样式
-        style = ttk.Style()
-        style.configure("TLabel", font=("Helvetica", 12))
-        style.configure("Status.TLabel", font=("Helvetica", 16, "bold"))
-        style.configure("Timer.TLabel", font=("Helvetica", 48, "bold"))
-        style.configure("TButton", font=("Helvetica", 12))
-
-        # 布局
-        main_frame = ttk.Frame(root, padding="20")
-        main_frame.pack(expand=True, fill="both")
-
-        ttk.Label(main_frame, textvariable=self.status_var, style="Status.TLabel").pack(pady=5)
-        ttk.Label(main_frame, textvariable=self.timer_var, style="Timer.TLabel").pack(pady=10)
-
-        button_frame = ttk.Frame(main_frame)
-        button_frame.pack(pady=15)
-
-        self.start_button = ttk.Button(button_frame, text="开始专注", command=self.start_timer)
-        self.start_button.pack(side="left", padx=5)
-
-        self.pause_button = ttk.Button(button_frame, text="暂停", command=self.toggle_pause, state="disabled")
-        self.pause_button.pack(side="left", padx=5)
-
-        self.stop_button = ttk.Button(button_frame, text="停止", command=self.stop_timer, state="disabled")
-        self.stop_button.pack(side="left", padx=5)
-        
-        # 启动队列处理器和窗口关闭协议
-        self.process_queue()
-        self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
-
-    def start_timer(self):
-        self.is_running.set()
-        self.is_paused.clear()
-        
-        self.start_button.config(state="disabled")
-        self.pause_button.config(state="normal", text="暂停")
-        self.stop_button.config(state="normal")
-        
-        self.timer_thread = threading.Thread(target=self.main_loop, daemon=True)
-        self.timer_thread.start()
-
-    def toggle_pause(self):
-        if self.is_paused.is_set(): # 当前是暂停状态 -> 恢复
-            self.is_paused.clear()
-            self.pause_button.config(text="暂停")
-            self.update_queue.put(("status", self.last_status))
-        else: # 当前是运行状态 -> 暂停
-            self.is_paused.set()
-            self.pause_button.config(text="继续")
-            self.last_status = self.status_var.get()
-            self.update_queue.put(("status", "已暂停"))
-
-    def stop_timer(self):
-        if self.timer_thread and self.timer_thread.is_alive():
-            self.is_running.clear() # 发送停止信号
-            self.is_paused.clear()  # 如果在暂停状态，需要唤醒它才能结束
-            self.timer_thread.join(timeout=1) # 等待线程结束
-
-        self.reset_ui()
-
-    def reset_ui(self):
-        self.status_var.set("准备就绪")
-        self.timer_var.set(f"{FOCUS_MINUTES:02d}:00")
-        self.start_button.config(state="normal")
-        self.pause_button.config(state="disabled", text="暂停")
-        self.stop_button.config(state="disabled")
+STARTED_AT = time.perf_counter() # 用于启动耗时探针，必须在其他导入之前
 
-    def main_loop(self):
-        cycle_count = 1
-        while self.is_running.is_set():
-            self.update_queue.put(("status", f"第 {cycle_count} 轮：专注"))
-            self.run_focus_session()
-            if not self.is_running.is_set(): break
-
-            self.update_queue.put(("status", "大休息"))
-            self.run_countdown(BREAK_MINUTES, "🧘‍♀️ 大休息时间到！")
-            if not self.is_running.is_set(): break
-            cycle_count += 1
-        
-        # 线程结束时，重置UI
-        self.update_queue.put(("reset", None))
-
-    def run_focus_session(self):
-        session_end_time = time.time() + FOCUS_MINUTES * 60
-        while time.time() < session_end_time and self.is_running.is_set():
-            self.check_pause()
-            
-            interval = random.randint(RANDOM_INTERVAL_MIN * 60, RANDOM_INTERVAL_MAX * 60)
-            micro_break_time = time.time() + interval
-            
-            while time.time() < micro_break_time and time.time() < session_end_time and self.is_running.is_set():
-                self.check_pause()
-                remaining = session_end_time - time.time()
-                self.update_queue.put(("timer", f"{int(remaining//60):02d}:{int(remaining%60):02d}"))
-                time.sleep(1)
-
-            if time.time() < session_end_time and self.is_running.is_set():
-                self.play_sound()
-                self.update_queue.put(("status", "微休息 (10秒)"))
-                self.run_countdown(MICRO_BREAK_SECONDS / 60, "", is_micro=True)
-                self.update_queue.put(("status", "专注中..."))
-    
-    def run_countdown(self, duration_minutes, end_message, is_micro=False):
-        total_seconds = int(duration_minutes * 60)
-        end_time = time.time() + total_seconds
-        
-        while time.time() < end_time and self.is_running.is_set():
-            self.check_pause()
-            remaining = end_time - time.time()
-            if is_micro:
-                self.update_queue.put(("timer", f"{int(remaining):02d}秒"))
-            else:
-                self.update_queue.put(("timer", f"{int(remaining//60):02d}:{int(remaining%60):02d}"))
-            time.sleep(1)
-        
-        if self.is_running.is_set() and end_message:
-            self.play_sound()
-            self.play_sound()
+import os
+import sys
 
-    def check_pause(self):
-        while self.is_paused.is_set() and self.is_running.is_set():
-            time.sleep(0.5)
+# 设置了该环境变量时，首帧绘制完成后打印启动耗时并退出（见 benchmarks/startup_report.py）
+STARTUP_PROBE = os.environ.get("FOCUS_TIMER_STARTUP_PROBE")
 
-    def play_sound(self):
-        try:
-            threading.Thread(target=playsound, args=(SOUND_FILE,), daemon=True).start()
-        except Exception as e:
-            self.update_queue.put(("error", f"无法播放声音: {e}"))
-            
-    def process_queue(self):
-        try:
-            while True:
-                message_type, value = self.update_queue.get_nowait()
-                if message_type == "status":
-                    self.status_var.set(value)
-                elif message_type == "timer":
-                    self.timer_var.set(value)
-                elif message_type == "reset":
-                    self.reset_ui()
-                elif message_type == "error":
-                    messagebox.showwarning("音频错误", value)
-        except queue.Empty:
-            pass
-        finally:
-            self.root.after(100, self.process_queue)
+if __name__ == '__main__' and not STARTUP_PROBE:
+    # 已有实例在运行时把命令（例如 pause）转交给它并立即退出，不再加载 Tk 和其余模块
+    import single_instance
+    COMMAND_ARGV = single_instance.command_from_argv(sys.argv[1:])
+    INSTANCE_LOCK = single_instance.claim_or_forward(COMMAND_ARGV)
 
-    def on_closing(self):
-        if messagebox.askokcancel("退出", "你确定要退出吗？"):
-            self.is_running.clear()
-            self.is_paused.clear()
-            if self.timer_thread and self.timer_thread.is_alive():
-                self.timer_thread.join(timeout=1)
-            self.root.destroy()
-
-if __name__ == '__main__':
-    root = tk.Tk()
-    app = FocusApp(root)
-    root.mainloop()
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk
 import threading
-import time
-import random
-import queue
-import sys
-import os
-
-try:
-    from playsound import playsound
-except ImportError:
-    messagebox.showerror("依赖缺失", "错误：'playsound' 库未安装。")
-    exit()
 
-# 导入新的模块
+# 只导入首帧需要的模块；音频库、设置/统计窗口、对话框在第一次用到时才导入
+import metrics
+import tracing
+from audio import AudioPlayer, default_backend, resolve_sound_path
 from settings_manager import SettingsManager
-from settings_window import SettingsWindow
+from timer_engine import DeadlineScheduler
+from timer_core import CycleListener, FocusCycle, MulticastListener, BREAK
+from session_plan import MICRO_START, BREAK_START, BREAK_END
+from notify import AlertDispatcher, AudioSink, load_sinks, make_alert, MICRO_BREAK_ALERT, BREAK_END_ALERT
+from calendar_index import open_calendar, route_alert
+from checkpoint import CHECKPOINT_FILE, Checkpointer, describe_resume, load_checkpoint, plan_resume, remove_checkpoint
+from journal import JournalListener, JournalWriter, TeeRecorder, read_journal
+from stats import StatsStore
+from ui_mailbox import UiMailbox, STATUS, TIMER, PREVIEW, RESET, ERROR, COMMAND
+
+# 预先格式化好的两位数字，刻度回调只做查表，不再每秒格式化新字符串
+DIGITS = tuple(sys.intern(f"{i:02d}") for i in range(100))
 
 
-def resource_path(relative_path):
-    """ 获取资源的绝对路径，对开发和PyInstaller打包都有效 """
-    try:
-        base_path = sys._MEIPASS
-    except Exception:
-        base_path = os.path.abspath(".")
-    return os.path.join(base_path, relative_path)
+def timer_parts(seconds, is_micro):
+    """倒计时显示拆成 (分, 分隔符, 秒, 单位) 四段，界面只更新发生变化的那一段"""
+    if is_micro:
+        return ("", "", DIGITS[seconds] if seconds < 100 else str(seconds), "秒")
+    minutes, seconds = divmod(seconds, 60)
+    return (DIGITS[minutes] if minutes < 100 else str(minutes), ":", DIGITS[seconds], "")
 
 
-class FocusApp:
+class FocusApp(CycleListener):
     def __init__(self, root):
         self.root = root
         self.settings_manager = SettingsManager()
+        self.journal = JournalWriter('focus_journal.bin')
+        self.stats = StatsStore('focus_stats.bin')
+        if self.stats.is_empty():
+            # 第一次启用统计：从已有的会话日志一次性聚合
+            self.stats.rebuild(read_journal(self.journal.path))
+        self.closing = False
+        self.control = None  # 单实例的控制端口，由入口创建
+        self.shared_state = None  # 共享内存中的状态，第一次开始计时时创建
 
         self.root.title("专注时钟")
-        self.root.geometry("400x280")
+        self.root.geometry("400x330")
 
         self.timer_thread = None
         self.is_running = threading.Event()
         self.is_paused = threading.Event()
-        self.update_queue = queue.Queue()
+        self.mailbox = UiMailbox(self.wake_ui)
+        self.audio = AudioPlayer(default_backend, on_error=lambda message: self.alerts.errors.record("audio", message))
+        self.sound_path = None
+        self.alerts = self.create_dispatcher()
+        # 配置了日历时在后台建立忙碌时间索引，开会时跳过或推迟提醒
+        self.calendar = open_calendar(on_error=lambda message: self.alerts.errors.record("calendar", message))
 
         self.setup_styles()
         self.create_widgets()
         
         self.on_settings_changed() # 初始化UI
-        self.process_queue()
+        # 计时线程只在有新内容时通过虚拟事件唤醒 Tk，空闲时不再轮询
+        self.root.bind("<<UiMailbox>>", lambda event: self.process_queue())
+        self.drain_time = metrics.histogram("focus_timer_ui_drain_seconds", "Tk 线程每次处理信箱消息的耗时")
+        metrics.add_collector(self.collect_metrics)
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
+        # 窗口最小化或隐藏时停掉每秒刻度，恢复时从引擎状态一次性重算显示
+        self.window_visible = True
+        self.root.bind("<Unmap>", lambda event: self.on_window_mapped(event, False))
+        self.root.bind("<Map>", lambda event: self.on_window_mapped(event, True))
+        if not STARTUP_PROBE:
+            # 首帧绘制之后再检查上次是否意外中断，不拖慢启动
+            self.root.after_idle(self.offer_resume)
 
     def setup_styles(self):
         style = ttk.Style()
@@ -254,10 +99,19 @@ class FocusApp:
         main_frame.pack(expand=True, fill="both")
 
         self.status_var = tk.StringVar(value="准备就绪")
-        self.timer_var = tk.StringVar()
+        self.timer_vars = tuple(tk.StringVar() for _ in range(4)) # 分、分隔符、秒、单位
+        self.timer_parts = ("", "", "", "")
+        self.preview_var = tk.StringVar()
         
         ttk.Label(main_frame, textvariable=self.status_var, style="Status.TLabel").pack(pady=5)
-        ttk.Label(main_frame, textvariable=self.timer_var, style="Timer.TLabel").pack(pady=10)
+        timer_frame = ttk.Frame(main_frame)
+        timer_frame.pack(pady=(10, 0))
+        for var in self.timer_vars:
+            ttk.Label(timer_frame, textvariable=var, style="Timer.TLabel").pack(side="left")
+        ttk.Label(main_frame, textvariable=self.preview_var).pack()
+        # 提醒接收端的错误摘要显示在这里，不弹出模态对话框打断专注
+        self.error_var = tk.StringVar()
+        ttk.Label(main_frame, textvariable=self.error_var, foreground="firebrick", wraplength=360).pack()
 
         button_frame = ttk.Frame(main_frame)
         button_frame.pack(pady=15)
@@ -271,171 +125,382 @@ class FocusApp:
         self.stop_button = ttk.Button(button_frame, text="停止", command=self.stop_timer, state="disabled")
         self.stop_button.pack(side="left", padx=5)
 
-        # 设置按钮
-        settings_button = ttk.Button(main_frame, text="⚙️ 设置", command=self.open_settings)
-        settings_button.pack(pady=10)
+        # 设置和统计按钮
+        extra_frame = ttk.Frame(main_frame)
+        extra_frame.pack(pady=10)
+        ttk.Button(extra_frame, text="⚙️ 设置", command=self.open_settings).pack(side="left", padx=5)
+        ttk.Button(extra_frame, text="📊 统计", command=self.open_stats).pack(side="left", padx=5)
+
+    def create_dispatcher(self):
+        """提示音总是第一个接收端；notifications.json 中配置的接收端追加在后面"""
+        sinks = [AudioSink(self.audio)]
+        try:
+            extra = load_sinks()
+        except ValueError as e:
+            extra = []
+            self.mailbox.post(ERROR, str(e))
+        return AlertDispatcher(sinks + extra, on_errors=lambda summary: self.mailbox.post(ERROR, summary))
 
     def on_settings_changed(self):
         """当设置更改后，更新UI和相关状态"""
+        self.update_sound_path()
         if not self.is_running.is_set():
             self.reset_ui()
 
+    def current_settings(self):
+        """计时线程在阶段切换时调用：廉价地检查 config.json 是否被外部修改过"""
+        if self.settings_manager.reload_if_changed():
+            self.update_sound_path()
+        return self.settings_manager.settings
+
+    def update_sound_path(self):
+        settings = self.settings_manager.settings
+        self.sound_path = self.resolve_sound_path()
+        # 只有内容或引用的提示音文件变化的音型才会重新编译；计时进行中时在后台提前编译
+        self.audio.set_pattern(MICRO_BREAK_ALERT, settings.micro_break_pattern, self.sound_path)
+        self.audio.set_pattern(BREAK_END_ALERT, settings.break_end_pattern, self.sound_path)
+        if self.is_running.is_set():
+            self.preload_alerts()
+
+    def preload_alerts(self):
+        self.audio.preload_pattern(MICRO_BREAK_ALERT)
+        self.audio.preload_pattern(BREAK_END_ALERT)
+
     def open_settings(self):
         """打开设置窗口"""
         if self.is_running.is_set():
+            from tkinter import messagebox
             messagebox.showwarning("提示", "请先停止当前的计时器再进行设置。")
             return
+        from settings_window import SettingsWindow
         SettingsWindow(self.root, self.settings_manager, self)
 
-    def start_timer(self):
-        # ... (这部分逻辑和之前基本一样, 但现在会从settings_manager获取值) ...
+    def open_stats(self):
+        """打开统计窗口"""
+        from stats_window import StatsWindow
+        StatsWindow(self.root, self.stats)
+
+    def offer_resume(self):
+        """上次的会话意外中断（检查点还在）时，询问是否从中断处继续"""
+        state = load_checkpoint(CHECKPOINT_FILE)
+        if state is None:
+            return
+        point = plan_resume(state, self.settings_manager.settings)
+        if point is not None:
+            from tkinter import messagebox
+            if messagebox.askyesno("继续上次的会话", describe_resume(point)) and not self.is_running.is_set():
+                # 对话框可能停留了一段时间，按回答时的时间重新计算
+                point = plan_resume(state, self.settings_manager.settings)
+                if point is not None:
+                    self.start_timer(resume=point)
+                    return
+        remove_checkpoint(CHECKPOINT_FILE)
+
+    def start_timer(self, resume=None):
         self.is_running.set()
         self.is_paused.clear()
         
         self.start_button.config(state="disabled")
         self.pause_button.config(state="normal", text="暂停")
+        self.error_var.set("")
         self.stop_button.config(state="normal")
         
-        self.timer_thread = threading.Thread(target=self.main_loop, daemon=True)
+        # 第一次开始计时时才加载音频库并编译提示音型，离第一次提示还有好几分钟
+        self.preload_alerts()
+
+        # 每次开始都使用新的调度器，旧会话残留的截止时间不会干扰新会话
+        self.scheduler = DeadlineScheduler()
+        recorder = TeeRecorder(self.journal, self.stats) # 阶段结束时同时写日志并增量更新当天统计
+        checkpoint = Checkpointer(CHECKPOINT_FILE, self.scheduler) # 阶段变化和每分钟心跳时写检查点
+        listener = MulticastListener(self, JournalListener(recorder, self.scheduler.clock), checkpoint)
+        self.cycle = FocusCycle(self.scheduler, self.settings_manager.settings, listener=listener,
+                                ticks=self.window_visible, settings_provider=self.current_settings)
+        checkpoint.attach(self.cycle)
+        shared_state = self.open_shared_state()
+        if shared_state is not None:
+            listener.listeners.append(shared_state)
+            shared_state.attach(self.cycle)
+        if resume is not None:
+            self.scheduler.call_soon(self.cycle.restore, resume.cycle, resume.phase, resume.remaining)
+            if resume.paused:
+                # 检查点是暂停时写的：恢复后立即暂停，界面与按下“暂停”后一致
+                self.is_paused.set()
+                self.pause_button.config(text="继续")
+                self.last_status = "大休息" if resume.phase == BREAK else f"第 {resume.cycle} 轮：专注"
+                self.scheduler.call_soon(self.cycle.pause)
+                self.scheduler.call_soon(self.mailbox.post, STATUS, "已暂停") # 排在 restore 发出的状态之后
+        else:
+            self.scheduler.call_soon(self.cycle.start)
+        self.timer_thread = threading.Thread(target=self.run_scheduler, daemon=True)
         self.timer_thread.start()
 
+    def open_shared_state(self):
+        """把计时状态发布到共享内存，供其他进程（见 shared_state.py）显示；不可用时返回 None"""
+        if self.shared_state is None:
+            from shared_state import SharedStatePublisher
+            try:
+                self.shared_state = SharedStatePublisher()
+            except (OSError, ValueError) as e:
+                self.error_var.set(f"无法创建共享状态: {e}")
+        return self.shared_state
+
+    def on_window_mapped(self, event, visible):
+        # 子控件的 Map/Unmap 事件也会传到根窗口的绑定上，只关心根窗口本身
+        if event.widget is not self.root or visible == self.window_visible:
+            return
+        self.window_visible = visible
+        if self.is_running.is_set():
+            self.scheduler.call_soon(self.cycle.set_ticks, visible)
+
     def toggle_pause(self):
-        # ... (和之前一样) ...
         if self.is_paused.is_set():
             self.is_paused.clear()
             self.pause_button.config(text="暂停")
-            self.update_queue.put(("status", self.last_status))
+            self.scheduler.call_soon(self.cycle.resume)
+            self.mailbox.post(STATUS, self.last_status)
         else:
             self.is_paused.set()
             self.pause_button.config(text="继续")
+            self.scheduler.call_soon(self.cycle.pause)
             self.last_status = self.status_var.get()
-            self.update_queue.put(("status", "已暂停"))
+            self.mailbox.post(STATUS, "已暂停")
 
     def stop_timer(self):
-        # ... (和之前一样) ...
         if self.timer_thread and self.timer_thread.is_alive():
             self.is_running.clear()
             self.is_paused.clear()
-            self.timer_thread.join(timeout=1)
+            # 条件变量立即唤醒计时线程，它退出前会再投递一次 RESET；
+            # 这里不 join，避免 Tk 线程等待一个正在向 Tk 投递事件的线程。
+            # 投递时就绑定本会话的对象：命令执行前可能已经开始了新会话
+            self.scheduler.call_soon(self.stop_session, self.cycle, self.scheduler)
         self.reset_ui()
 
     def reset_ui(self):
         """重置UI到初始状态，使用当前设置"""
-        focus_minutes = self.settings_manager.get('focus_minutes')
+        focus_minutes = self.settings_manager.settings.focus_minutes
         self.status_var.set("准备就绪")
-        self.timer_var.set(f"{focus_minutes:02d}:00")
+        self.show_timer(timer_parts(focus_minutes * 60, False))
+        self.preview_var.set("")
+        self.mailbox.invalidate()
         self.start_button.config(state="normal")
         self.pause_button.config(state="disabled", text="暂停")
         self.stop_button.config(state="disabled")
 
-    def main_loop(self):
-        cycle_count = 1
-        while self.is_running.is_set():
-            self.update_queue.put(("status", f"第 {cycle_count} 轮：专注"))
-            self.run_focus_session()
-            if not self.is_running.is_set(): break
-
-            self.update_queue.put(("status", "大休息"))
-            self.run_countdown(self.settings_manager.get('break_minutes'), "🧘‍♀️ 大休息时间到！")
-            if not self.is_running.is_set(): break
-            cycle_count += 1
-        
-        self.update_queue.put(("reset", None))
+    def run_scheduler(self):
+        """计时线程：只在下一个真实事件（刻度、微休息、阶段结束、命令）到来时醒来"""
+        scheduler = self.scheduler
+        scheduler.run()
+        if self.scheduler is scheduler: # 用户已经重新开始时，不要重置新会话的界面
+            self.mailbox.post(RESET)
 
-    def run_focus_session(self):
-        focus_minutes = self.settings_manager.get('focus_minutes')
-        session_end_time = time.time() + focus_minutes * 60
-        
-        min_interval = self.settings_manager.get('random_interval_min') * 60
-        max_interval = self.settings_manager.get('random_interval_max') * 60
-
-        while time.time() < session_end_time and self.is_running.is_set():
-            self.check_pause()
-            
-            interval = random.randint(min_interval, max_interval)
-            micro_break_time = time.time() + interval
-            
-            while time.time() < micro_break_time and time.time() < session_end_time and self.is_running.is_set():
-                self.check_pause()
-                remaining = session_end_time - time.time()
-                self.update_queue.put(("timer", f"{int(remaining//60):02d}:{int(remaining%60):02d}"))
-                time.sleep(1)
-
-            if time.time() < session_end_time and self.is_running.is_set():
-                self.play_sound()
-                micro_break_sec = self.settings_manager.get('micro_break_seconds')
-                self.update_queue.put(("status", f"微休息 ({micro_break_sec}秒)"))
-                self.run_countdown(micro_break_sec / 60, "", is_micro=True)
-                self.update_queue.put(("status", "专注中..."))
-
-    def run_countdown(self, duration_minutes, end_message, is_micro=False):
-        # ... (和之前类似，但现在是健壮的) ...
-        total_seconds = int(duration_minutes * 60)
-        end_time = time.time() + total_seconds
-        
-        while time.time() < end_time and self.is_running.is_set():
-            self.check_pause()
-            remaining = end_time - time.time()
-            if is_micro:
-                self.update_queue.put(("timer", f"{int(remaining):02d}秒"))
-            else:
-                self.update_queue.put(("timer", f"{int(remaining//60):02d}:{int(remaining%60):02d}"))
-            time.sleep(1)
-        
-        if self.is_running.is_set() and end_message:
-            self.play_sound()
-            time.sleep(0.1) # 防止声音重叠
-            self.play_sound()
-            
-    def check_pause(self):
-        # ... (和之前一样) ...
-        while self.is_paused.is_set() and self.is_running.is_set():
-            time.sleep(0.5)
-
-    def play_sound(self):
-        sound_file = self.settings_manager.get('sound_file')
-        # 如果是默认的相对路径，使用 resource_path
-        if not os.path.isabs(sound_file):
-            sound_file = resource_path(sound_file)
-            
-        if not os.path.exists(sound_file):
-            self.update_queue.put(("error", f"找不到声音文件:\n{sound_file}"))
+    # --- 以下方法都在计时线程（调度器）中执行 ---
+
+    def stop_session(self, cycle, scheduler):
+        cycle.stop() # 让日志记下停止时的阶段和已进行的时长
+        scheduler.stop()
+
+    def post_preview(self):
+        """根据预编译的计划预览接下来的提示时间（在阶段切换完成后调用）"""
+        cycle = self.cycle
+        if cycle.phase is None or cycle.paused_at is not None:
+            self.mailbox.post(PREVIEW, "")
+            return
+        to_wall = time.time() - self.scheduler.now()
+        if cycle.phase == BREAK:
+            events = cycle.upcoming(1, (BREAK_END,))
+            text = f"下一轮 {time.strftime('%H:%M', time.localtime(events[0][0] + to_wall))}" if events else ""
+        else:
+            parts = []
+            for when, kind, _ in cycle.upcoming(2, (MICRO_START, BREAK_START)):
+                label = "下次微休息" if kind == MICRO_START else "大休息"
+                parts.append(f"{label} {time.strftime('%H:%M', time.localtime(when + to_wall))}")
+                if kind == BREAK_START:
+                    break
+            text = " · ".join(parts)
+        self.mailbox.post(PREVIEW, text)
+
+    def on_focus_start(self, cycle_count):
+        self.mailbox.post(STATUS, f"第 {cycle_count} 轮：专注")
+        # 回调时本轮计划还没有编译，等这次阶段切换完成后再预览
+        self.scheduler.call_soon(self.post_preview)
+
+    def on_micro_break_start(self, seconds):
+        route_alert(self.calendar, self.scheduler, make_alert(MICRO_BREAK_ALERT, f"微休息 {seconds} 秒"), self.alerts.dispatch)
+        self.mailbox.post(STATUS, f"微休息 ({seconds}秒)")
+        self.scheduler.call_soon(self.post_preview)
+
+    def on_micro_break_end(self):
+        self.mailbox.post(STATUS, "专注中...")
+        self.scheduler.call_soon(self.post_preview)
+
+    def on_break_start(self, cycle_count):
+        self.mailbox.post(STATUS, "大休息")
+        self.scheduler.call_soon(self.post_preview)
+
+    def on_pause(self):
+        self.mailbox.post(PREVIEW, "")
+
+    def on_resume(self, paused_for):
+        self.scheduler.call_soon(self.post_preview)
+
+    def on_break_end(self, cycle_count):
+        # 默认音型 "double" 把两声提示预混成一段连续播放
+        route_alert(self.calendar, self.scheduler,
+                    make_alert(BREAK_END_ALERT, f"第 {cycle_count} 轮结束，回来专注吧", repeat=2), self.alerts.dispatch)
+
+    def on_tick(self, seconds, is_micro):
+        self.mailbox.post(TIMER, timer_parts(seconds, is_micro))
+
+    def resolve_sound_path(self):
+        return resolve_sound_path(self.settings_manager.settings.sound_file)
+
+    def on_control_command(self, argv):
+        """在控制端口线程中调用，返回给转交命令一方的回复
+
+        设置直接在这里保存：SettingsManager 自带锁，而且整个系统只有这一个进程写 config.json；
+        其余命令交给 Tk 线程执行。
+        """
+        import single_instance
+        name = argv[0]
+        if name == "set":
+            try:
+                current = self.settings_manager.settings.to_dict()
+                values = single_instance.parse_assignments(argv[1:], known=current)
+                self.settings_manager.save_settings({**current, **values})
+            except (ValueError, OSError) as e: # 含 SettingsError
+                return f"错误: {e}"
+            self.mailbox.post(COMMAND, "settings")
+        else:
+            self.mailbox.post(COMMAND, name)
+        return "ok"
+
+    def run_command(self, name):
+        """在 Tk 线程中执行转交来的命令；与当前状态不符的命令（例如未运行时暂停）被忽略"""
+        if name == "show":
+            self.root.deiconify()
+            self.root.lift()
+            self.root.focus_force()
+        elif name == "start":
+            if not self.is_running.is_set():
+                self.start_timer()
+        elif name == "pause":
+            if self.is_running.is_set() and not self.is_paused.is_set():
+                self.toggle_pause()
+        elif name == "resume":
+            if self.is_paused.is_set():
+                self.toggle_pause()
+        elif name == "stop":
+            if self.is_running.is_set():
+                self.stop_timer()
+        elif name == "settings":
+            self.on_settings_changed()
+
+    def wake_ui(self):
+        """由信箱在有新消息时调用（可能在计时线程中），把处理推迟到 Tk 线程"""
+        if self.closing:
             return
-            
         try:
-            threading.Thread(target=playsound, args=(sound_file,), daemon=True).start()
-        except Exception as e:
-            self.update_queue.put(("error", f"无法播放声音: {e}"))
-            
+            self.root.event_generate("<<UiMailbox>>", when="tail")
+        except (tk.TclError, RuntimeError):
+            pass # 窗口已经销毁
+
+    def collect_metrics(self):
+        mailbox = self.mailbox.stats()
+        sinks = {"dropped": 0, "failed": 0, "slow": 0}
+        for stats in self.alerts.stats().values():
+            for key in sinks:
+                sinks[key] += stats[key]
+        return [
+            ("focus_timer_mailbox_posted_total", "counter", "投递到信箱的消息数", mailbox["posted"]),
+            ("focus_timer_mailbox_coalesced_total", "counter", "被更新的值覆盖、从未显示的消息数", mailbox["coalesced"]),
+            ("focus_timer_mailbox_dropped_total", "counter", "与当前显示值相同而被丢弃的消息数", mailbox["dropped"]),
+            ("focus_timer_alert_dropped_total", "counter", "播放队列已满而被丢弃的提示音数", self.audio.dropped),
+            ("focus_timer_sink_dropped_total", "counter", "接收端队列已满而被丢弃的提醒数", sinks["dropped"]),
+            ("focus_timer_sink_failed_total", "counter", "接收端发送失败的提醒数", sinks["failed"]),
+            ("focus_timer_sink_slow_total", "counter", "超过接收端超时时间的发送次数", sinks["slow"]),
+        ] + self.calendar_metrics()
+
+    def calendar_metrics(self):
+        calendar = self.calendar
+        if calendar is None:
+            return []
+        return [
+            ("focus_timer_calendar_busy_intervals", "gauge", "日历索引中合并后的忙碌区间数", len(calendar.index)),
+            ("focus_timer_calendar_parsed_files_total", "counter", "重新解析过的日历文件数", calendar.parsed),
+            ("focus_timer_calendar_suppressed_total", "counter", "开会时跳过的提醒数", calendar.suppressed),
+            ("focus_timer_calendar_deferred_total", "counter", "推迟到会议结束的提醒数", calendar.deferred),
+        ]
+
+    def show_timer(self, parts):
+        """只给内容真正变化的标签赋值；大多数刻度只改变秒数"""
+        for var, old, new in zip(self.timer_vars, self.timer_parts, parts):
+            if old != new:
+                var.set(new)
+        self.timer_parts = parts
+
     def process_queue(self):
-        # ... (和之前一样) ...
-        try:
-            while True:
-                message_type, value = self.update_queue.get_nowait()
-                if message_type == "status":
-                    self.status_var.set(value)
-                elif message_type == "timer":
-                    self.timer_var.set(value)
-                elif message_type == "reset":
-                    self.reset_ui()
-                elif message_type == "error":
-                    messagebox.showwarning("音频错误", value)
-        except queue.Empty:
-            pass
-        finally:
-            self.root.after(100, self.process_queue)
+        """在 Tk 线程中一次性处理信箱里的全部最新消息"""
+        started = time.perf_counter()
+        for message_type, value in self.mailbox.drain():
+            if message_type == STATUS:
+                self.status_var.set(value)
+            elif message_type == TIMER:
+                self.show_timer(value)
+            elif message_type == PREVIEW:
+                self.preview_var.set(value)
+            elif message_type == RESET:
+                self.reset_ui()
+            elif message_type == ERROR:
+                self.error_var.set(value)
+            elif message_type == COMMAND:
+                self.run_command(value)
+        if self.drain_time is not None:
+            self.drain_time.observe(time.perf_counter() - started)
 
     def on_closing(self):
         # ... (和之前一样) ...
+        from tkinter import messagebox
         if messagebox.askokcancel("退出", "你确定要退出吗？"):
             self.is_running.clear()
             self.is_paused.clear()
+            self.closing = True
             if self.timer_thread and self.timer_thread.is_alive():
+                self.scheduler.call_soon(self.stop_session, self.cycle, self.scheduler)
                 self.timer_thread.join(timeout=1)
+            self.journal.close()
+            self.stats.close()
+            if self.shared_state is not None:
+                self.shared_state.close()
+            if self.calendar is not None:
+                self.calendar.close()
+            self.alerts.close()
+            self.audio.close()
+            if self.control is not None:
+                self.control.close()
             self.root.destroy()
 
 
+def report_first_frame(root):
+    """启动探针：首帧绘制完成后打印耗时（毫秒）和已加载的模块数，然后退出"""
+    root.update_idletasks()
+    elapsed_ms = (time.perf_counter() - STARTED_AT) * 1000
+    print(f"FIRST_FRAME_MS {elapsed_ms:.1f} MODULES {len(sys.modules)}", flush=True)
+    root.destroy()
+
+
 if __name__ == '__main__':
+    metrics.configure_from_env()
+    tracing.configure(tracing.trace_path_from_argv(sys.argv))
+    tracing.instrument(FocusApp, "process_queue", "ui")
     root = tk.Tk()
     app = FocusApp(root)
+    if STARTUP_PROBE:
+        root.after_idle(report_first_frame, root)
+    else:
+        app.control = single_instance.ControlServer(app.on_control_command)
+        app.control.start()
+        if COMMAND_ARGV:
+            reply = app.control.dispatch(COMMAND_ARGV)
+            if reply != "ok":
+                app.error_var.set(reply)
     root.mainloop()
\ No newline at end of file
@@ -0,0 +1,197 @@
+"""进程内指标：计数器和固定分桶的延迟直方图，可导出为 Prometheus 文本格式
+
+默认关闭。设置环境变量 FOCUS_TIMER_METRICS 后启用：
+  - 值为文件路径时，每隔 FOCUS_TIMER_METRICS_INTERVAL 秒（默认 15）原子地重写该文件，
+    可交给 node_exporter 的 textfile 收集器；
+  - 值为 ":端口" 或 "主机:端口" 时，在本地提供 HTTP /metrics。
+
+埋点处在构造时通过 counter() / histogram() 取得指标对象；未启用时得到 None，
+热路径上只多一次 `is not None` 判断。每个直方图只应由一个线程写入。
+"""
+import bisect
+import os
+import threading
+
+# 秒；覆盖从亚毫秒级的调度抖动到秒级的卡顿
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+DEPTH_BUCKETS = (1, 2, 3, 4, 6, 8, 16, 32)
+
+REGISTRY = None
+
+
+class Counter:
+    __slots__ = ("name", "help", "value")
+
+    kind = "counter"
+
+    def __init__(self, name, help):
+        self.name = name
+        self.help = help
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def samples(self):
+        yield self.name, "", self.value
+
+
+class Histogram:
+    """累计分桶直方图；observe 只做一次二分查找和三次加法"""
+
+    __slots__ = ("name", "help", "buckets", "counts", "sum", "count")
+
+    kind = "histogram"
+
+    def __init__(self, name, help, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # 最后一项是 +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """按分桶上界估算分位数（超出最后一个桶时返回 inf）"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return float("inf")
+
+    def samples(self):
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            yield self.name + "_bucket", f'{{le="{bound:g}"}}', cumulative
+        yield self.name + "_bucket", '{le="+Inf"}', self.count
+        yield self.name + "_sum", "", self.sum
+        yield self.name + "_count", "", self.count
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+        self._collectors = []
+
+    def _get(self, cls, name, help, *args):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help, *args)
+            return metric
+
+    def counter(self, name, help):
+        return self._get(Counter, name, help)
+
+    def histogram(self, name, help, buckets=LATENCY_BUCKETS):
+        return self._get(Histogram, name, help, buckets)
+
+    def add_collector(self, collect):
+        """collect() 在导出时调用，返回 [(名称, 类型, 说明, 值)]，用于导出已有的统计字段"""
+        with self._lock:
+            self._collectors.append(collect)
+
+    def render(self):
+        """生成 Prometheus 文本格式"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {value:g}")
+        for collect in collectors:
+            for name, kind, help, value in collect():
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                lines.append(f"{name} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def write_file(self, path):
+        """原子地写入文件，收集器不会读到写了一半的内容"""
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(self.render())
+        os.replace(temp_path, path)
+
+    def start_file_writer(self, path, interval):
+        stop = threading.Event()
+
+        def run():
+            while not stop.wait(interval):
+                try:
+                    self.write_file(path)
+                except OSError:
+                    pass # 导出失败不影响计时
+        threading.Thread(target=run, name="MetricsWriter", daemon=True).start()
+        return stop
+
+    def serve(self, host, port):
+        """在后台线程中提供 GET /metrics，返回 HTTPServer 以便关闭"""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = registry.render().encode("utf-8")
+                self.send_response(200 if self.path in ("/", "/metrics") else 404)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, name="MetricsServer", daemon=True).start()
+        return server
+
+
+def enable():
+    """启用全局注册表（幂等）；必须在创建被埋点的对象之前调用"""
+    global REGISTRY
+    if REGISTRY is None:
+        REGISTRY = MetricsRegistry()
+    return REGISTRY
+
+
+def counter(name, help):
+    return REGISTRY.counter(name, help) if REGISTRY is not None else None
+
+
+def histogram(name, help, buckets=LATENCY_BUCKETS):
+    return REGISTRY.histogram(name, help, buckets) if REGISTRY is not None else None
+
+
+def add_collector(collect):
+    if REGISTRY is not None:
+        REGISTRY.add_collector(collect)
+
+
+def configure_from_env():
+    """按 FOCUS_TIMER_METRICS 启用并启动导出；未设置时什么都不做，返回 None"""
+    target = os.environ.get("FOCUS_TIMER_METRICS")
+    if not target:
+        return None
+    registry = enable()
+    host, sep, port = target.rpartition(":")
+    if sep and port.isdigit() and os.sep not in target:
+        registry.serve(host or "127.0.0.1", int(port))
+    else:
+        interval = float(os.environ.get("FOCUS_TIMER_METRICS_INTERVAL", "15"))
+        registry.start_file_writer(target, interval)
+    return registry
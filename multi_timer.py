@@ -0,0 +1,117 @@
+import random
+import threading
+
+from timer_core import CycleListener, FocusCycle
+from timer_engine import DeadlineScheduler
+
+
+class BoundListener(CycleListener):
+    """把某个计时器的事件转发为 callback(timer_id, 事件名, *参数)"""
+
+    __slots__ = ("callback", "timer_id")
+
+    def __init__(self, callback, timer_id):
+        self.callback = callback
+        self.timer_id = timer_id
+
+    def on_focus_start(self, cycle_count):
+        self.callback(self.timer_id, "focus_start", cycle_count)
+
+    def on_micro_break_start(self, seconds):
+        self.callback(self.timer_id, "micro_break_start", seconds)
+
+    def on_micro_break_end(self):
+        self.callback(self.timer_id, "micro_break_end")
+
+    def on_break_start(self, cycle_count):
+        self.callback(self.timer_id, "break_start", cycle_count)
+
+    def on_break_end(self, cycle_count):
+        self.callback(self.timer_id, "break_end", cycle_count)
+
+    def on_tick(self, seconds, is_micro):
+        self.callback(self.timer_id, "tick", seconds, is_micro)
+
+    def on_pause(self):
+        self.callback(self.timer_id, "pause")
+
+    def on_resume(self, paused_for):
+        self.callback(self.timer_id, "resume", paused_for)
+
+    def on_stop(self):
+        self.callback(self.timer_id, "stop")
+
+
+class TimerManager:
+    """在一个调度线程上驱动大量相互独立的专注计时器
+
+    每个计时器只是一个 FocusCycle 状态对象（带 __slots__），任一时刻在共享的截止时间堆里
+    只有两三项；线程数不随计时器数量增长。默认不产生每秒刻度，需要显示倒计时的
+    计时器可以单独打开 ticks。所有公开方法都是线程安全的：命令通过 call_soon
+    交给调度线程执行。on_event(timer_id, 事件名, *参数) 在调度线程中调用。
+    """
+
+    def __init__(self, on_event=None, clock=None, rng=None):
+        self.scheduler = DeadlineScheduler(clock)
+        self.on_event = on_event
+        # 未指定种子的计时器共用一个随机数生成器，避免每个计时器各带一份 ~2.5 KB 的状态
+        self.rng = rng or random.Random()
+        self.timers = {}
+        self._thread = None
+
+    def __len__(self):
+        return len(self.timers)
+
+    def add(self, timer_id, settings, seed=None, ticks=False, start=True):
+        """创建一个计时器；settings 是 Settings 快照，多个计时器可以共享同一份"""
+        rng = self.rng if seed is None else random.Random(seed)
+        listener = BoundListener(self.on_event, timer_id) if self.on_event else None
+        cycle = FocusCycle(self.scheduler, settings, listener, rng=rng, ticks=ticks)
+        self.scheduler.call_soon(self._add, timer_id, cycle, start)
+
+    def _add(self, timer_id, cycle, start):
+        old = self.timers.pop(timer_id, None)
+        if old is not None:
+            old.stop()
+        self.timers[timer_id] = cycle
+        if start:
+            cycle.start()
+
+    def _command(self, timer_id, action):
+        cycle = self.timers.get(timer_id)
+        if cycle is not None:
+            getattr(cycle, action)()
+
+    def start(self, timer_id):
+        self.scheduler.call_soon(self._command, timer_id, "start")
+
+    def pause(self, timer_id):
+        self.scheduler.call_soon(self._command, timer_id, "pause")
+
+    def resume(self, timer_id):
+        self.scheduler.call_soon(self._command, timer_id, "resume")
+
+    def stop(self, timer_id):
+        self.scheduler.call_soon(self._command, timer_id, "stop")
+
+    def remove(self, timer_id):
+        self.scheduler.call_soon(self._remove, timer_id)
+
+    def _remove(self, timer_id):
+        cycle = self.timers.pop(timer_id, None)
+        if cycle is not None:
+            cycle.stop()
+
+    def run(self, until=None):
+        """在当前线程中运行调度器（使用 VirtualClock 做模拟时配合 until）"""
+        self.scheduler.run(until)
+
+    def start_thread(self):
+        self._thread = threading.Thread(target=self.scheduler.run, name="TimerManager", daemon=True)
+        self._thread.start()
+
+    def shutdown(self, timeout=1):
+        self.scheduler.stop()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
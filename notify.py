@@ -0,0 +1,248 @@
+"""提醒通知：把一次提醒同时发送到多个接收端（提示音、桌面通知、日志文件、本地 webhook、外部脚本）
+
+每个接收端有自己的线程和有界队列。dispatch() 只做 put_nowait，从不阻塞计时线程；
+某个接收端慢或出错时只会让它自己的队列积压并丢弃新提醒（计数），不影响其他接收端。
+错误不逐条弹窗，而是由 ErrorAggregator 合并，最多每隔一段时间报告一次摘要。
+
+额外的接收端在 notifications.json 中配置（可选），例如:
+    [
+        {"type": "desktop"},
+        {"type": "log", "path": "alerts.log"},
+        {"type": "webhook", "url": "http://127.0.0.1:8080/alert", "timeout": 2},
+        {"type": "command", "argv": ["./light.sh"], "timeout": 5}
+    ]
+"""
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from collections import namedtuple
+
+# 提醒类型
+MICRO_BREAK_ALERT = "micro_break"
+BREAK_END_ALERT = "break_end"
+
+Alert = namedtuple("Alert", "kind message timestamp repeat")
+
+
+def make_alert(kind, message, repeat=1):
+    return Alert(kind, message, time.time(), repeat)
+
+
+class NotificationSink:
+    """接收端接口：send() 在接收端自己的线程中调用，可以阻塞，但应当遵守 timeout（秒）"""
+
+    name = "sink"
+    timeout = 5.0
+
+    def send(self, alert):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class AudioSink(NotificationSink):
+    """播放与提醒类型同名的音型（由 AudioPlayer.set_pattern 声明，重复次数已经包含在音型里）
+
+    AudioPlayer 自己有播放线程和有界队列，这里不会阻塞。
+    """
+
+    name = "audio"
+
+    def __init__(self, player):
+        self.player = player
+
+    def send(self, alert):
+        self.player.play_pattern(alert.kind)
+
+
+class LogFileSink(NotificationSink):
+    name = "log"
+
+    def __init__(self, path):
+        self.path = path
+
+    def send(self, alert):
+        stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(alert.timestamp))
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(f"{stamp}\t{alert.kind}\t{alert.message}\n")
+
+
+class WebhookSink(NotificationSink):
+    """向本地 HTTP 端点 POST 一个 JSON"""
+
+    name = "webhook"
+
+    def __init__(self, url, timeout=2.0):
+        self.url = url
+        self.timeout = timeout
+
+    def send(self, alert):
+        import urllib.request
+        body = json.dumps(alert._asdict(), ensure_ascii=False).encode("utf-8")
+        request = urllib.request.Request(self.url, data=body, headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+class CommandSink(NotificationSink):
+    """运行外部脚本（例如控制智能灯），提醒内容通过环境变量传入"""
+
+    name = "command"
+
+    def __init__(self, argv, timeout=5.0):
+        self.argv = list(argv)
+        self.timeout = timeout
+
+    def command(self, alert):
+        return self.argv
+
+    def send(self, alert):
+        import subprocess
+        env = dict(os.environ, FOCUS_ALERT_KIND=alert.kind, FOCUS_ALERT_MESSAGE=alert.message,
+                   FOCUS_ALERT_REPEAT=str(alert.repeat))
+        subprocess.run(self.command(alert), env=env, timeout=self.timeout, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+class DesktopSink(CommandSink):
+    """系统桌面通知：Linux 用 notify-send，macOS 用 osascript"""
+
+    name = "desktop"
+
+    def __init__(self, timeout=5.0):
+        super().__init__([], timeout)
+
+    def command(self, alert):
+        title = "专注时钟"
+        if sys.platform == "darwin":
+            script = f'display notification {json.dumps(alert.message)} with title {json.dumps(title)}'
+            return ["osascript", "-e", script]
+        return ["notify-send", "--app-name", title, title, alert.message]
+
+
+SINK_TYPES = {
+    "log": lambda config: LogFileSink(config["path"]),
+    "webhook": lambda config: WebhookSink(config["url"], config.get("timeout", 2.0)),
+    "command": lambda config: CommandSink(config["argv"], config.get("timeout", 5.0)),
+    "desktop": lambda config: DesktopSink(config.get("timeout", 5.0)),
+}
+
+
+def load_sinks(path='notifications.json'):
+    """读取额外接收端的配置；文件不存在时返回 []，内容无效时抛出 ValueError"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            configs = json.load(f)
+    except FileNotFoundError:
+        return []
+    if not isinstance(configs, list):
+        raise ValueError(f"{path} 的顶层必须是数组")
+    sinks = []
+    for config in configs:
+        try:
+            sinks.append(SINK_TYPES[config["type"]](config))
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"{path} 中的接收端配置无效: {config!r} ({e})") from None
+    return sinks
+
+
+class ErrorAggregator:
+    """合并各接收端的错误：第一条立即报告，之后每 interval 秒最多报告一次摘要"""
+
+    def __init__(self, report, interval=60.0):
+        self.report = report  # report(摘要文本)，可能在任意线程中调用
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._pending = {}  # (接收端, 消息) -> 次数
+        self._last_report = None
+
+    def record(self, sink_name, message):
+        with self._lock:
+            key = (sink_name, message)
+            self._pending[key] = self._pending.get(key, 0) + 1
+        self.flush()
+
+    def flush(self, force=False):
+        now = time.monotonic()
+        with self._lock:
+            if not self._pending:
+                return
+            if not force and self._last_report is not None and now - self._last_report < self.interval:
+                return
+            pending, self._pending = self._pending, {}
+            self._last_report = now
+        lines = []
+        for (sink_name, message), count in pending.items():
+            suffix = f"（{count} 次）" if count > 1 else ""
+            lines.append(f"{sink_name}: {message}{suffix}")
+        self.report("\n".join(lines))
+
+
+class SinkWorker:
+    """一个接收端的线程、有界队列和计数"""
+
+    def __init__(self, sink, errors, max_pending):
+        self.sink = sink
+        self.errors = errors
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.sent = 0
+        self.dropped = 0
+        self.failed = 0
+        self.slow = 0  # 超过接收端 timeout 的发送次数
+        self.thread = threading.Thread(target=self.run, name=f"Sink-{sink.name}", daemon=True)
+        self.thread.start()
+
+    def submit(self, alert):
+        try:
+            self.queue.put_nowait(alert)
+        except queue.Full:
+            self.dropped += 1
+
+    def run(self):
+        while True:
+            alert = self.queue.get()
+            if alert is None:
+                self.sink.close()
+                return
+            started = time.monotonic()
+            try:
+                self.sink.send(alert)
+                self.sent += 1
+            except Exception as e:
+                self.failed += 1
+                self.errors.record(self.sink.name, str(e) or type(e).__name__)
+            if time.monotonic() - started > self.sink.timeout:
+                self.slow += 1
+
+    def stats(self):
+        return {"sent": self.sent, "dropped": self.dropped, "failed": self.failed,
+                "slow": self.slow, "pending": self.queue.qsize()}
+
+
+class AlertDispatcher:
+    """把提醒扇出到所有接收端；dispatch() 的开销只是每个接收端一次 put_nowait"""
+
+    def __init__(self, sinks, on_errors=None, max_pending=8, error_interval=60.0):
+        self.errors = ErrorAggregator(on_errors or (lambda summary: None), error_interval)
+        self.workers = [SinkWorker(sink, self.errors, max_pending) for sink in sinks]
+
+    def dispatch(self, alert):
+        for worker in self.workers:
+            worker.submit(alert)
+        self.errors.flush() # 报告上一个间隔内积压的错误摘要
+
+    def stats(self):
+        return {worker.sink.name: worker.stats() for worker in self.workers}
+
+    def close(self):
+        """让各接收端处理完已排队的提醒后退出（不等待）"""
+        for worker in self.workers:
+            try:
+                worker.queue.put_nowait(None)
+            except queue.Full:
+                pass # 守护线程，进程退出时随之结束
+        self.errors.flush(force=True)
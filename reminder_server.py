@@ -0,0 +1,286 @@
+"""无界面的提醒服务：运行一个专注/休息循环，把状态广播给任意数量的本地客户端
+
+协议：每行一个 JSON（UTF-8）。服务端在每次状态变化时推送最新状态；
+客户端发送一行命令（start / pause / resume / stop，或 {"command": "pause"}）控制计时器。
+
+用法: python reminder_server.py [--unix /tmp/focus-timer.sock | --port 8765] [--no-autostart] [--trace trace.json]
+"""
+import asyncio
+import json
+import os
+import socket
+import threading
+
+import metrics
+import tracing
+from timer_core import CycleListener, FocusCycle, FOCUS, MICRO_BREAK, BREAK
+from timer_engine import DeadlineScheduler
+
+COMMANDS = ("start", "pause", "resume", "stop")
+MAX_SUBSCRIBERS = 1000
+LAG_BYTES = 64 * 1024  # 写缓冲区超过这么多时视为慢客户端，不再直接写入
+
+
+class StateListener(CycleListener):
+    """在调度线程中维护最新状态；每个事件只编码一次，与订阅者数量无关"""
+
+    def __init__(self, service):
+        self.service = service
+        self.state = {
+            "running": False,
+            "paused": False,
+            "phase": None,
+            "cycle": 0,
+            "remaining": None,
+            "micro_breaks": 0,
+            "event": "idle",
+        }
+
+    def publish(self, event, **changes):
+        self.state.update(changes, event=event)
+        self.service.publish_threadsafe(self.state)
+
+    def on_focus_start(self, cycle_count):
+        self.publish("focus_start", running=True, phase=FOCUS, cycle=cycle_count)
+
+    def on_micro_break_start(self, seconds):
+        self.publish("micro_break", phase=MICRO_BREAK, micro_breaks=self.state["micro_breaks"] + 1)
+
+    def on_micro_break_end(self):
+        self.publish("micro_break_end", phase=FOCUS)
+
+    def on_break_start(self, cycle_count):
+        self.publish("break_start", phase=BREAK)
+
+    def on_break_end(self, cycle_count):
+        self.publish("break_end")
+
+    def on_tick(self, seconds, is_micro):
+        self.publish("tick", remaining=seconds)
+
+    def on_pause(self):
+        self.publish("pause", paused=True)
+
+    def on_resume(self, paused_for):
+        self.publish("resume", paused=False)
+
+    def on_stop(self):
+        self.publish("stop", running=False, paused=False, phase=None, remaining=None)
+
+
+class ReminderService:
+    """计时器运行在自己的调度线程里，事件循环只负责扇出
+
+    生产者（调度线程）每个事件只编码一次状态，按顺序放进待发送队列；阶段和提醒事件一个都
+    不丢，只有连续的刻度合并成最新的一个。事件循环还没来得及处理队列时不再重复提交，
+    一次回调把队列中的全部消息拼成一段，依次写进所有订阅者的传输缓冲区，不为每个订阅者
+    唤醒一个任务；写缓冲区超过 LAG_BYTES 的慢客户端先被跳过，由一个追赶任务在缓冲区排空后
+    只补发当时的最新状态。
+
+    扇出仍然在同一个进程里、与计时线程共用 GIL：每个事件在事件循环中的工作量与订阅者数量
+    成正比（每个订阅者约几微秒），这段时间里计时线程最多要等一个 GIL 切换间隔
+    （sys.getswitchinterval()，默认 5 ms）才能运行。订阅者在一千个以内时对刻度的影响
+    可以忽略；更多的显示端应使用共享内存（shared_state.py），它完全不经过本进程。
+    max_subscribers 限制同时连接的订阅者数，超出的连接直接关闭。
+    """
+
+    def __init__(self, settings, settings_provider=None, autostart=True, max_subscribers=MAX_SUBSCRIBERS):
+        self.scheduler = DeadlineScheduler()
+        self.listener = StateListener(self)
+        self.cycle = FocusCycle(self.scheduler, settings, self.listener, settings_provider=settings_provider)
+        self.autostart = autostart
+        self.max_subscribers = max_subscribers
+        self.loop = None
+        self.latest = b""
+        self.latest_version = 0  # 事件循环已经扇出的版本
+        self.version = 0  # 生产者已经发布的版本
+        self._pending = []  # (版本, 消息, 是否刻度)，事件循环尚未扇出的消息
+        self._pending_lock = threading.Lock()
+        self._clients = {}  # StreamWriter -> 已发送的版本
+        self._lagging = set()  # 正由追赶任务负责的慢客户端
+        self._thread = None
+        self.rejected = 0
+        self.coalesced = 0
+        self.sent = 0
+        metrics.add_collector(self.collect_metrics)
+
+    @property
+    def subscribers(self):
+        return len(self._clients)
+
+    # --- 生产者侧（调度线程） ---
+
+    def publish_threadsafe(self, state):
+        payload = json.dumps(state, ensure_ascii=False).encode("utf-8") + b"\n"
+        tick = state["event"] == "tick"
+        with self._pending_lock:
+            scheduled = bool(self._pending)
+            if tick and scheduled and self._pending[-1][2]:
+                # 还没发出的刻度被新的刻度取代；阶段和提醒事件必须按顺序全部送达
+                self._pending[-1] = (self._pending[-1][0], payload, True)
+                self.coalesced += 1
+            else:
+                self.version += 1
+                self._pending.append((self.version, payload, tick))
+        if not scheduled:
+            self.loop.call_soon_threadsafe(self._publish)
+
+    def command(self, name):
+        """线程安全地执行控制命令"""
+        if name == "start":
+            self.scheduler.call_soon(self._start)
+        elif name in ("pause", "resume", "stop"):
+            self.scheduler.call_soon(getattr(self.cycle, name))
+        else:
+            raise ValueError(f"未知命令: {name}")
+
+    def _start(self):
+        if self.cycle.phase is None:
+            self.cycle.start()
+
+    # --- 事件循环侧 ---
+
+    def _publish(self):
+        with self._pending_lock:
+            entries, self._pending = self._pending, []
+        if not entries:
+            return
+        first_version = entries[0][0]
+        version = entries[-1][0]
+        payload = b"".join(entry[1] for entry in entries)
+        self.latest = entries[-1][1]
+        self.latest_version = version
+        clients = self._clients
+        lagging = self._lagging
+        for writer in clients:
+            if writer in lagging or writer.transport.is_closing():
+                continue
+            if writer.transport.get_write_buffer_size() > LAG_BYTES:
+                lagging.add(writer)
+                self.loop.create_task(self._catch_up(writer))
+                continue
+            writer.write(payload)
+            self.coalesced += first_version - clients[writer] - 1
+            clients[writer] = version
+            self.sent += len(entries)
+
+    async def _catch_up(self, writer):
+        """慢客户端：等缓冲区排空后只发送当时的最新版本，直到它跟上为止"""
+        try:
+            while writer in self._clients:
+                await writer.drain()
+                sent_version = self._clients.get(writer)
+                if sent_version is None or sent_version == self.latest_version:
+                    return
+                self.coalesced += self.latest_version - sent_version - 1
+                writer.write(self.latest)
+                self.sent += 1
+                self._clients[writer] = self.latest_version
+                if writer.transport.get_write_buffer_size() <= LAG_BYTES:
+                    return
+        except ConnectionError:
+            pass
+        finally:
+            self._lagging.discard(writer)
+
+    async def _read_commands(self, reader):
+        try:
+            async for line in reader:
+                text = line.decode("utf-8", "replace").strip()
+                if not text:
+                    continue
+                if text.startswith("{"):
+                    try:
+                        text = json.loads(text).get("command", "")
+                    except (ValueError, AttributeError):
+                        continue
+                if text in COMMANDS:
+                    self.command(text)
+        except ConnectionError:
+            pass
+
+    async def _handle_client(self, reader, writer):
+        if len(self._clients) >= self.max_subscribers:
+            self.rejected += 1
+            writer.close()
+            return
+        self._clients[writer] = self.latest_version
+        try:
+            if self.latest:
+                writer.write(self.latest)
+                self.sent += 1
+            await self._read_commands(reader)  # 对端关闭连接时返回
+        except asyncio.CancelledError:
+            pass  # 服务关闭
+        finally:
+            self._clients.pop(writer, None)
+            writer.close()
+
+    async def serve(self, unix_path=None, host="127.0.0.1", port=8765, ready=None):
+        self.loop = asyncio.get_running_loop()
+        if unix_path and hasattr(socket, "AF_UNIX"):
+            if os.path.exists(unix_path):
+                os.unlink(unix_path)
+            server = await asyncio.start_unix_server(self._handle_client, unix_path)
+        else:
+            server = await asyncio.start_server(self._handle_client, host, port)
+
+        self._thread = threading.Thread(target=self.scheduler.run, name="ReminderService", daemon=True)
+        self._thread.start()
+        self.listener.publish("idle")
+        if self.autostart:
+            self.command("start")
+        if ready is not None:
+            ready.set_result(server)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.scheduler.stop()
+
+    def collect_metrics(self):
+        return [
+            ("focus_timer_subscribers", "gauge", "当前连接的订阅者数", self.subscribers),
+            ("focus_timer_published_total", "counter", "发布的状态版本数", self.version),
+            ("focus_timer_sent_total", "counter", "实际发送给订阅者的消息数", self.sent),
+            ("focus_timer_coalesced_total", "counter", "合并掉的刻度和慢订阅者跳过的版本数", self.coalesced),
+            ("focus_timer_rejected_total", "counter", "超过订阅者上限而被拒绝的连接数", self.rejected),
+        ]
+
+    def stats(self):
+        return {
+            "subscribers": self.subscribers,
+            "version": self.version,
+            "sent": self.sent,
+            "coalesced": self.coalesced,
+            "rejected": self.rejected,
+        }
+
+
+def main():
+    import argparse
+    from settings_manager import SettingsManager
+
+    parser = argparse.ArgumentParser(description="无界面的专注提醒服务")
+    parser.add_argument("--unix", help="Unix 套接字路径（不支持时退回 TCP）")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--no-autostart", action="store_true", help="等待客户端发送 start 命令")
+    parser.add_argument("--max-subscribers", type=int, default=MAX_SUBSCRIBERS,
+                        help="同时连接的订阅者上限（扇出与计时线程共用 GIL，见 ReminderService）")
+    parser.add_argument("--trace", help="把热路径追踪写入该文件（Chrome trace 格式）")
+    args = parser.parse_args()
+
+    metrics.configure_from_env()
+    tracing.configure(args.trace)
+    settings_manager = SettingsManager()
+    service = ReminderService(settings_manager.settings, settings_provider=settings_manager.current,
+                              autostart=not args.no_autostart, max_subscribers=args.max_subscribers)
+    try:
+        asyncio.run(service.serve(args.unix, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""预编译的会话计划：把一轮（或一整天）的专注、微休息、大休息时间点一次性算出来
+
+计划保存在紧凑的 array 中（每个事件 8 字节时间 + 1 字节类型 + 4 字节轮次），
+时间是相对计划起点的秒数。暂停只需累加一个偏移量，O(1) 地整体后移剩余事件，
+不需要重建计划；界面可以随时预览接下来的提示时间。
+"""
+import random
+from array import array
+
+# 事件类型
+FOCUS_START = 0
+MICRO_START = 1
+MICRO_END = 2
+BREAK_START = 3
+BREAK_END = 4
+
+EVENT_NAMES = {
+    FOCUS_START: "focus_start",
+    MICRO_START: "micro_break_start",
+    MICRO_END: "micro_break_end",
+    BREAK_START: "break_start",
+    BREAK_END: "break_end",
+}
+
+
+class SessionPlan:
+    """按时间排序的事件数组，加上一个执行位置 index 和暂停偏移 offset"""
+
+    __slots__ = ("origin", "offset", "index", "times", "kinds", "cycles")
+
+    def __init__(self, origin=0.0):
+        self.origin = origin   # 计划起点的绝对时间（调度器时钟）
+        self.offset = 0.0      # 累计暂停时长，加到所有尚未执行的事件上
+        self.index = 0         # 下一个要执行的事件
+        self.times = array('d')
+        self.kinds = array('B')
+        self.cycles = array('I')
+
+    def __len__(self):
+        return len(self.times)
+
+    def append(self, relative, kind, cycle):
+        self.times.append(relative)
+        self.kinds.append(kind)
+        self.cycles.append(cycle)
+
+    def truncate(self, index):
+        """丢弃 index 及之后的事件（设置变化后从当前位置重新编译）"""
+        del self.times[index:]
+        del self.kinds[index:]
+        del self.cycles[index:]
+
+    def time_at(self, index):
+        return self.origin + self.offset + self.times[index]
+
+    def shift(self, seconds):
+        """暂停恢复：剩余事件整体后移"""
+        self.offset += seconds
+
+    def next_kind(self):
+        return self.kinds[self.index] if self.index < len(self.kinds) else None
+
+    def next_time(self):
+        return self.time_at(self.index)
+
+    def upcoming(self, limit=None, kinds=None):
+        """返回尚未执行的事件 [(绝对时间, 类型, 轮次)]，可按类型过滤"""
+        events = []
+        for index in range(self.index, len(self.times)):
+            if kinds is None or self.kinds[index] in kinds:
+                events.append((self.time_at(index), self.kinds[index], self.cycles[index]))
+                if limit is not None and len(events) >= limit:
+                    break
+        return events
+
+
+def extend_cycle(plan, settings, rng, cycle, start, phase=FOCUS_START, focus_end=None):
+    """把一轮剩余的事件追加到 plan（时间均为相对计划起点的秒数）
+
+    phase 表示从哪里开始编译：FOCUS_START 从专注开始；MICRO_START 表示微休息在 start
+    时刻刚刚开始（专注在 focus_end 结束）；MICRO_END 表示专注在 start 时刻正在进行
+    （微休息刚结束，或从检查点恢复），从这里抽取下一次间隔；BREAK_START 表示大休息
+    在 start 时刻刚刚开始。微休息跨过专注结束时间时，大休息在微休息结束后才开始，
+    与逐个抽取间隔时完全一致。
+    """
+    min_interval = settings.random_interval_min * 60
+    max_interval = settings.random_interval_max * 60
+    micro_seconds = settings.micro_break_seconds
+    t = start
+
+    if phase == FOCUS_START:
+        plan.append(t, FOCUS_START, cycle)
+        focus_end = t + settings.focus_minutes * 60
+        phase = MICRO_END
+
+    while phase != BREAK_START:
+        if phase == MICRO_END:
+            t += rng.randint(min_interval, max_interval)
+            if t >= focus_end:
+                t = focus_end
+                plan.append(t, BREAK_START, cycle)
+                break
+            plan.append(t, MICRO_START, cycle)
+        t += micro_seconds
+        plan.append(t, MICRO_END, cycle)
+        if t >= focus_end:
+            plan.append(t, BREAK_START, cycle)
+            break
+        phase = MICRO_END
+
+    plan.append(t + settings.break_minutes * 60, BREAK_END, cycle)
+    return plan
+
+
+def compile_plan(settings, cycles=1, seed=None, rng=None, origin=0.0, first_cycle=1):
+    """编译连续 cycles 轮（例如一整天）的完整计划"""
+    rng = rng or random.Random(seed)
+    plan = SessionPlan(origin)
+    t = 0.0
+    for cycle in range(first_cycle, first_cycle + cycles):
+        extend_cycle(plan, settings, rng, cycle, t)
+        t = plan.times[-1]
+    return plan
+
+
+def cycles_for(settings, seconds):
+    """覆盖 seconds 秒（例如一个工作日）大约需要的轮数"""
+    cycle_seconds = (settings.focus_minutes + settings.break_minutes) * 60
+    return max(1, -(-int(seconds) // cycle_seconds))
+
+
+def main():
+    import argparse
+    import sys
+    from settings_manager import SettingsManager
+
+    parser = argparse.ArgumentParser(description="预编译并打印一天的专注/微休息/大休息计划")
+    parser.add_argument("--hours", type=float, default=8, help="计划覆盖的时长（小时）")
+    parser.add_argument("--seed", type=int, default=None, help="随机种子")
+    args = parser.parse_args()
+
+    settings = SettingsManager().settings
+    plan = compile_plan(settings, cycles_for(settings, args.hours * 3600), seed=args.seed)
+    for index in range(len(plan)):
+        seconds = int(plan.times[index])
+        print(f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}  "
+              f"第 {plan.cycles[index]} 轮  {EVENT_NAMES[plan.kinds[index]]}")
+    size = sum(sys.getsizeof(column) for column in (plan.times, plan.kinds, plan.cycles))
+    print(f"{len(plan)} 个事件，约 {size} 字节")
+
+
+if __name__ == '__main__':
+    main()
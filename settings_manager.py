@@ -1,42 +1,156 @@
 import json
 import os
+import threading
+from dataclasses import asdict, dataclass, field, fields
+
+from sound_patterns import parse_pattern
+
+
+class SettingsError(ValueError):
+    """设置内容无效"""
+
+
+@dataclass(frozen=True, slots=True)
+class Settings:
+    """一份经过校验的、不可变的设置快照
+
+    计时会话在阶段开始时取一次快照并一直使用它，设置窗口或热重载替换的只是
+    SettingsManager 上的引用，不会在会话中途改变已经取到的值。
+    """
+    focus_minutes: int = 90
+    break_minutes: int = 20
+    micro_break_seconds: int = 10
+    random_interval_min: int = 3
+    random_interval_max: int = 5
+    sound_file: str = "alert.mp3"
+    # 提示音型（见 sound_patterns），可以是预设名或音型字符串
+    micro_break_pattern: str = "single"
+    break_end_pattern: str = "double"
+    # 每次保存或重载后递增，不参与比较，也不写入文件
+    version: int = field(default=0, compare=False)
+
+    @classmethod
+    def from_dict(cls, data, version=0):
+        """从字典创建快照，缺失的键使用默认值，无效的值抛出 SettingsError"""
+        if not isinstance(data, dict):
+            raise SettingsError("设置文件的顶层必须是对象")
+        values = {}
+        for f in fields(cls):
+            if f.name == "version" or f.name not in data:
+                continue
+            value = data[f.name]
+            if f.type is int:
+                if isinstance(value, bool) or not isinstance(value, int):
+                    raise SettingsError(f"{f.name} 必须是整数")
+                if value <= 0:
+                    raise SettingsError(f"{f.name} 必须大于 0")
+            elif not isinstance(value, str) or not value:
+                raise SettingsError(f"{f.name} 必须是非空字符串")
+            if f.name.endswith("_pattern"):
+                try:
+                    parse_pattern(value)
+                except ValueError as e:
+                    raise SettingsError(str(e)) from None
+            values[f.name] = value
+        settings = cls(version=version, **values)
+        if settings.random_interval_min >= settings.random_interval_max:
+            raise SettingsError("最小间隔必须小于最大间隔。")
+        return settings
+
+    def to_dict(self):
+        data = asdict(self)
+        del data["version"]
+        return data
+
+    def get(self, key):
+        return getattr(self, key, None)
+
 
 class SettingsManager:
     def __init__(self, config_file='config.json'):
         self.config_file = config_file
+        self._file_signature = None
+        self._lock = threading.Lock() # 串行化保存与热重载（Tk 线程和计时线程都可能调用）
+        self.version = 0
         self.settings = self._load_settings()
 
-    def _get_default_settings(self):
-        """返回默认设置"""
-        return {
-            "focus_minutes": 90,
-            "break_minutes": 20,
-            "micro_break_seconds": 10,
-            "random_interval_min": 3,
-            "random_interval_max": 5,
-            "sound_file": "alert.mp3"
-        }
+    def _stat_signature(self):
+        """文件的 (mtime_ns, size)，用于廉价地判断文件是否被修改过"""
+        try:
+            stat = os.stat(self.config_file)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
 
     def _load_settings(self):
         """从 JSON 文件加载设置，如果文件不存在或无效则创建/使用默认设置"""
         if not os.path.exists(self.config_file):
-            default_settings = self._get_default_settings()
+            default_settings = Settings()
             self.save_settings(default_settings)
-            return default_settings
-        
+            return self.settings
+
+        self._file_signature = self._stat_signature()
         try:
             with open(self.config_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except (json.JSONDecodeError, IOError):
-            # 文件损坏或无法读取，返回默认值
-            return self._get_default_settings()
+                return Settings.from_dict(json.load(f), version=self.version)
+        except (ValueError, OSError):
+            # 文件损坏（JSON 语法错误、非 UTF-8 内容、无效的值）或无法读取，返回默认值
+            return Settings(version=self.version)
 
     def save_settings(self, settings_data):
-        """将设置保存到 JSON 文件"""
-        self.settings = settings_data
-        with open(self.config_file, 'w', encoding='utf-8') as f:
-            json.dump(self.settings, f, indent=4, ensure_ascii=False)
+        """校验后将设置原子地保存到 JSON 文件（先写临时文件再重命名），失败时抛出 SettingsError"""
+        if isinstance(settings_data, Settings):
+            settings_data = settings_data.to_dict()
+        with self._lock:
+            self._write_settings(Settings.from_dict(settings_data, version=self.version + 1))
+
+    def _write_settings(self, settings):
+        import tempfile # 只有保存时才需要，不放在启动路径上
+        directory = os.path.dirname(os.path.abspath(self.config_file))
+        fd, temp_path = tempfile.mkstemp(prefix=".config-", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(settings.to_dict(), f, indent=4, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.config_file)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+        self.version = settings.version
+        self.settings = settings
+        self._file_signature = self._stat_signature()
+
+    def reload_if_changed(self):
+        """文件的修改时间或大小变化时重新加载，返回是否加载了新设置
+
+        只做一次 os.stat，文件未变化时不读取也不解析；新内容无效时保留当前设置。
+        """
+        signature = self._stat_signature()
+        if signature is None or signature == self._file_signature:
+            return False
+        with self._lock:
+            return self._reload(signature)
+
+    def _reload(self, signature):
+        self._file_signature = signature
+        try:
+            with open(self.config_file, 'r', encoding='utf-8') as f:
+                settings = Settings.from_dict(json.load(f), version=self.version + 1)
+        except (ValueError, OSError): # 含 JSONDecodeError、UnicodeDecodeError 和 SettingsError
+            return False
+        if settings == self.settings:
+            return False
+        self.version = settings.version
+        self.settings = settings
+        return True
+
+    def current(self):
+        """检查热重载后返回当前的设置快照"""
+        self.reload_if_changed()
+        return self.settings
 
     def get(self, key):
         """获取一个设置项"""
-        return self.settings.get(key)
\ No newline at end of file
+        return self.settings.get(key)
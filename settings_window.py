@@ -1,11 +1,14 @@
 import tkinter as tk
-from tkinter import ttk, filedialog, messagebox
+from tkinter import ttk, messagebox
+
+from settings_manager import SettingsError
+from sound_patterns import PRESETS, parse_pattern
 
 class SettingsWindow(tk.Toplevel):
     def __init__(self, parent, settings_manager, app_instance):
         super().__init__(parent)
         self.title("设置")
-        self.geometry("450x300")
+        self.geometry("450x380")
         self.resizable(False, False)
 
         self.settings_manager = settings_manager
@@ -55,7 +58,24 @@ class SettingsWindow(tk.Toplevel):
         sound_entry.pack(side="left", expand=True, fill="x")
         browse_button = ttk.Button(sound_frame, text="浏览...", command=self.browse_sound_file)
         browse_button.pack(side="left", padx=5)
-        
+        row_num += 1
+
+        # 提示音型：可以选预设，也可以直接输入音型字符串（语法见 sound_patterns.py）
+        pattern_fields = {
+            "micro_break_pattern": "微休息提示音型:",
+            "break_end_pattern": "休息结束提示音型:",
+        }
+        self.pattern_vars = {}
+        for key, text in pattern_fields.items():
+            ttk.Label(frame, text=text).grid(row=row_num, column=0, sticky="w", pady=5, padx=5)
+            var = tk.StringVar()
+            pattern_frame = ttk.Frame(frame)
+            pattern_frame.grid(row=row_num, column=1, sticky="ew")
+            ttk.Combobox(pattern_frame, textvariable=var, values=list(PRESETS)).pack(side="left", expand=True, fill="x")
+            ttk.Button(pattern_frame, text="试听", command=lambda var=var: self.preview_pattern(var.get())).pack(side="left", padx=5)
+            self.pattern_vars[key] = var
+            row_num += 1
+
         # 按钮
         button_frame = ttk.Frame(self, padding="10")
         button_frame.pack(fill="x")
@@ -68,8 +88,23 @@ class SettingsWindow(tk.Toplevel):
         for key, entry in self.entries.items():
             entry.insert(0, str(self.settings_manager.get(key)))
         self.sound_file_var.set(self.settings_manager.get("sound_file"))
+        for key, var in self.pattern_vars.items():
+            var.set(self.settings_manager.get(key))
+
+    def preview_pattern(self, spec):
+        """用当前（尚未保存的）音型和提示音文件试听；只编译这一个试听音型"""
+        from audio import resolve_sound_path
+        try:
+            parse_pattern(spec)
+        except ValueError as e:
+            messagebox.showerror("输入错误", str(e))
+            return
+        audio = self.app.audio
+        audio.set_pattern("preview", spec, resolve_sound_path(self.sound_file_var.get()))
+        audio.play_pattern("preview")
 
     def browse_sound_file(self):
+        from tkinter import filedialog # 只在点击“浏览...”时才需要
         filepath = filedialog.askopenfilename(
             title="选择提示音文件",
             filetypes=[("音频文件", "*.mp3 *.wav"), ("所有文件", "*.*")]
@@ -85,6 +120,8 @@ class SettingsWindow(tk.Toplevel):
                 new_settings[key] = int(entry.get())
             
             new_settings["sound_file"] = self.sound_file_var.get()
+            for key, var in self.pattern_vars.items():
+                new_settings[key] = var.get().strip()
             
             # 简单验证
             if new_settings["random_interval_min"] >= new_settings["random_interval_max"]:
@@ -95,6 +132,13 @@ class SettingsWindow(tk.Toplevel):
             messagebox.showerror("输入错误", "所有时长和间隔必须是整数。")
             return
         
-        self.settings_manager.save_settings(new_settings)
+        try:
+            self.settings_manager.save_settings(new_settings)
+        except SettingsError as e:
+            messagebox.showerror("输入错误", str(e))
+            return
+        except OSError as e:
+            messagebox.showerror("保存失败", f"无法写入设置文件: {e}")
+            return
         self.app.on_settings_changed() # 通知主应用设置已更改
         self.destroy()
\ No newline at end of file
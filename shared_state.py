@@ -0,0 +1,225 @@
+"""共享内存中的计时状态：一个计时引擎，任意多个本地显示端（挂墙屏幕、托盘、终端状态栏）
+
+引擎在阶段变化、暂停和恢复时把状态写进一块固定布局的共享内存，每秒的倒计时由读取方
+根据单调时钟上的截止时间自己计算，所以读取方不需要 IPC 往返、序列化，也不会唤醒引擎。
+
+布局（小端，共 64 字节）：
+    0   4s  魔数 b"FTS1"
+    8   Q   序号：写入前后各加一，奇数表示正在写（seqlock）
+    16  B   阶段（0 未运行，1 专注，2 微休息，3 大休息）
+    17  B   是否暂停
+    20  I   轮次
+    24  d   当前阶段的截止时间（time.monotonic，全系统共享的单调时钟）
+    32  d   暂停时的剩余秒数
+    40  d   下一次微休息开始的单调时间（没有时为 NaN）
+    48  d   大休息开始的单调时间（没有时为 NaN）
+    56  I   写入方的进程号
+
+用法（读取方）: python shared_state.py [--once]
+"""
+import math
+import os
+import struct
+import sys
+import time
+from collections import namedtuple
+
+from session_plan import MICRO_START, BREAK_START
+from timer_core import CoalescingListener, FOCUS, MICRO_BREAK, BREAK
+
+BLOCK_NAME = "focus_timer_state"  # 实际的块名后面加上用户，见 block_name()
+MAGIC = b"FTS1"
+SIZE = 64
+SEQ = struct.Struct("<Q")
+SEQ_OFFSET = 8
+PAYLOAD = struct.Struct("<BBxxIddddI")
+PAYLOAD_OFFSET = 16
+
+PHASE_CODES = {None: 0, FOCUS: 1, MICRO_BREAK: 2, BREAK: 3}
+PHASE_NAMES = {code: phase for phase, code in PHASE_CODES.items()}
+
+# 读取方看到的状态；时间都已换算成距现在的秒数
+TimerState = namedtuple("TimerState", "phase cycle paused remaining next_micro_in break_in pid version")
+
+
+def block_name():
+    """当前用户的共享内存块名：POSIX 上的共享内存名字是全系统共用的，不同用户的计时器不能撞名"""
+    if hasattr(os, "getuid"):
+        return f"{BLOCK_NAME}_{os.getuid()}"
+    import getpass
+    return f"{BLOCK_NAME}_{getpass.getuser()}"
+
+
+class SharedStatePublisher(CoalescingListener):
+    """作为 listener 挂在 FocusCycle 上，所有方法都在调度器线程中执行
+
+    阶段事件合并成一次写入（见 CoalescingListener）；刻度不写共享内存。
+    """
+
+    def __init__(self, name=None):
+        from multiprocessing import shared_memory
+        super().__init__()
+        name = name or block_name()
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=SIZE)
+        except FileExistsError:
+            # 上一个实例崩溃时留下的块可以复用；写入方还活着时两个写入方会破坏 seqlock，拒绝复用
+            self.shm = shared_memory.SharedMemory(name=name)
+            if self.shm.size < SIZE:
+                self.shm.close()
+                raise OSError(f"共享内存块 {name} 的大小不对")
+            pid = PAYLOAD.unpack_from(self.shm.buf, PAYLOAD_OFFSET)[-1]
+            if bytes(self.shm.buf[:4]) == MAGIC and pid and pid != os.getpid() and writer_alive(pid):
+                from multiprocessing import resource_tracker
+                resource_tracker.unregister(self.shm._name, "shared_memory")  # 不要在退出时删掉别人的块
+                self.shm.close()
+                raise OSError(f"共享内存块 {name} 正由进程 {pid} 写入")
+        self.shm.buf[:4] = MAGIC
+        self.seq = SEQ.unpack_from(self.shm.buf, SEQ_OFFSET)[0] & ~1
+        self.cycle = None
+        self.writes = 0
+        self.write(0, False, 0, math.nan, 0.0, math.nan, math.nan)
+
+    def attach(self, cycle):
+        """每次开始计时都会换新的调度器和 FocusCycle"""
+        self.cycle = cycle
+        self.scheduler = cycle.scheduler
+
+    def write(self, phase, paused, cycle, deadline, remaining, next_micro, next_break):
+        buf = self.shm.buf
+        SEQ.pack_into(buf, SEQ_OFFSET, self.seq + 1)
+        PAYLOAD.pack_into(buf, PAYLOAD_OFFSET, phase, paused, cycle, deadline, remaining,
+                          next_micro, next_break, os.getpid())
+        self.seq += 2
+        SEQ.pack_into(buf, SEQ_OFFSET, self.seq)
+        self.writes += 1
+
+    def flush(self):
+        super().flush()
+        cycle = self.cycle
+        if cycle is None or cycle.phase is None:
+            self.write(0, False, 0, math.nan, 0.0, math.nan, math.nan)
+            return
+        paused = cycle.paused_at is not None
+        deadline = cycle.phase_end
+        remaining = deadline - (cycle.paused_at if paused else self.scheduler.now())
+        micro = cycle.upcoming(1, (MICRO_START,))
+        focus_end = cycle.upcoming(1, (BREAK_START,))
+        self.write(PHASE_CODES[cycle.phase], paused, cycle.cycle_count, deadline, remaining,
+                   micro[0][0] if micro else math.nan, focus_end[0][0] if focus_end else math.nan)
+
+    def close(self):
+        self.cycle = None
+        self.write(0, False, 0, math.nan, 0.0, math.nan, math.nan)
+        self.shm.close()
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+    # --- CycleListener ---
+
+    def on_stop(self):
+        # 停止后调度器马上退出，来不及执行 call_soon，直接写
+        self.cycle = None
+        self.write(0, False, 0, math.nan, 0.0, math.nan, math.nan)
+
+
+class SharedStateReader:
+    """只读地映射共享内存；read() 只解包几个标量，不复制整块内存，也不与引擎通信"""
+
+    def __init__(self, name=None):
+        from multiprocessing import resource_tracker, shared_memory
+        name = name or block_name()
+        self.shm = shared_memory.SharedMemory(name=name)  # 块不存在时抛出 FileNotFoundError
+        # 读取方不拥有这块内存：不要让 resource_tracker 在退出时把它删掉
+        resource_tracker.unregister(self.shm._name, "shared_memory")
+        if bytes(self.shm.buf[:4]) != MAGIC:
+            self.shm.close()
+            raise ValueError(f"共享内存块 {name} 的格式不对")
+
+    def read(self, retries=1000):
+        """按 seqlock 协议读取一份一致的快照；返回 TimerState，没有进行中的会话时 phase 为 None"""
+        buf = self.shm.buf
+        for _ in range(retries):
+            before = SEQ.unpack_from(buf, SEQ_OFFSET)[0]
+            if before & 1:
+                time.sleep(0)  # 写入方正在写，让出 CPU
+                continue
+            phase, paused, cycle, deadline, remaining, next_micro, next_break, pid = \
+                PAYLOAD.unpack_from(buf, PAYLOAD_OFFSET)
+            if SEQ.unpack_from(buf, SEQ_OFFSET)[0] == before:
+                break
+        else:
+            raise TimeoutError("共享内存一直处于写入中")
+        now = time.monotonic()
+        if not paused:
+            remaining = deadline - now
+        return TimerState(PHASE_NAMES.get(phase), cycle, bool(paused), max(remaining, 0.0),
+                          next_micro - now if next_micro == next_micro else None,
+                          next_break - now if next_break == next_break else None,
+                          pid, before)
+
+    def close(self):
+        self.shm.close()
+
+
+def writer_alive(pid):
+    """写入方是否还活着（只在 POSIX 上检查；Windows 上 os.kill 会结束进程，不能这样用）"""
+    if os.name == "nt" or not pid:
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def format_state(state):
+    if state.phase is None or not writer_alive(state.pid):
+        return "计时器未运行"
+    minutes, seconds = divmod(math.ceil(state.remaining), 60)
+    label = {FOCUS: "专注", MICRO_BREAK: "微休息", BREAK: "大休息"}[state.phase]
+    text = f"第 {state.cycle} 轮 {label} {minutes:02d}:{seconds:02d}"
+    if state.paused:
+        text += "（已暂停）"
+    elif state.next_micro_in is not None and state.phase == FOCUS:
+        text += f"  下次微休息 {math.ceil(state.next_micro_in / 60)} 分钟后"
+    return text
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="从共享内存读取正在运行的专注时钟并显示")
+    parser.add_argument("--once", action="store_true", help="打印一次状态后退出（适合托盘或状态栏脚本）")
+    parser.add_argument("--name", default=None, help="共享内存块的名字（默认按当前用户命名）")
+    args = parser.parse_args()
+
+    try:
+        reader = SharedStateReader(args.name)
+    except FileNotFoundError:
+        print("计时器未运行")
+        sys.exit(1)
+    interactive = sys.stdout.isatty() and not args.once
+    try:
+        while True:
+            state = reader.read()
+            text = format_state(state)
+            if args.once:
+                print(text)
+                return
+            sys.stdout.write(("\r\x1b[2K" + text) if interactive else text + "\n")
+            sys.stdout.flush()
+            # 只在显示的秒数变化时醒来；读取完全在本进程内完成
+            time.sleep(state.remaining % 1.0 + 0.005 if state.phase and not state.paused else 1.0)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        reader.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,216 @@
+"""单实例：第一个启动的主程序持有锁并监听本地控制端口，之后的启动把命令转交给它后立即退出
+
+锁是对 focus_timer.lock 的 flock（Windows 上是 msvcrt.locking），进程退出或崩溃时由系统
+释放，不会留下失效的锁。控制端口只监听 127.0.0.1，端口号和随机令牌写在只有当前用户
+可读的 focus_timer.instance 中，连接时必须带上令牌。这两个文件都放在每个用户一个的
+运行时目录（见 runtime_dir）中，从哪个目录启动都是同一个实例。
+
+协议：客户端发送一行 JSON {"token": ..., "argv": [...]}，服务端回复一行文本，"ok" 表示成功，
+其他内容是错误说明。转交命令的一方只导入标准库里的 socket/json，不加载 Tk 和应用的其他模块。
+"""
+import json
+import os
+import secrets
+import socket
+import sys
+import threading
+import time
+
+LOCK_FILE = 'focus_timer.lock'
+INFO_FILE = 'focus_timer.instance'
+COMMANDS = ("show", "start", "pause", "resume", "stop", "set")
+CONNECT_TIMEOUT = 2.0  # 主实例可能还在启动，等它开始监听的最长时间
+MAX_REQUEST = 64 * 1024
+
+
+def runtime_dir():
+    """当前用户的运行时目录：XDG_RUNTIME_DIR 或 LOCALAPPDATA 下的 focus_timer，都没有时用临时目录"""
+    base = os.environ.get("XDG_RUNTIME_DIR") or os.environ.get("LOCALAPPDATA")
+    if base and os.path.isdir(base):
+        path = os.path.join(base, "focus_timer")
+    else:
+        import getpass
+        import tempfile
+        user = os.getuid() if hasattr(os, "getuid") else getpass.getuser()
+        path = os.path.join(tempfile.gettempdir(), f"focus_timer-{user}")
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    # 公共临时目录里的同名目录可能是别的用户预先建好的
+    if hasattr(os, "getuid") and os.stat(path).st_uid != os.getuid():
+        raise PermissionError(f"运行时目录不属于当前用户: {path}")
+    return path
+
+
+def runtime_path(name):
+    return os.path.join(runtime_dir(), name)
+
+
+class InstanceLock:
+    """进程生命周期内持有的排他锁"""
+
+    def __init__(self, path=None):
+        self.path = path or runtime_path(LOCK_FILE)
+        self.fd = None
+
+    def acquire(self):
+        """不阻塞地尝试加锁，成功返回 True；另一个进程持有锁时返回 False"""
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if os.name == "nt":
+                import msvcrt
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self.fd = fd
+        return True
+
+    def release(self):
+        if self.fd is not None:
+            os.close(self.fd)  # 关闭文件即释放锁
+            self.fd = None
+
+
+class ControlServer:
+    """在守护线程中接受转交来的命令；handler(argv) 返回回复文本，在本线程中调用"""
+
+    def __init__(self, handler, info_path=None):
+        self.handler = handler
+        self.info_path = info_path or runtime_path(INFO_FILE)
+        self.token = secrets.token_hex(16)
+        self.sock = None
+        self.thread = None
+
+    def start(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.listen(8)
+        self.write_info()
+        self.thread = threading.Thread(target=self._serve, name="ControlServer", daemon=True)
+        self.thread.start()
+
+    def write_info(self):
+        info = {"port": self.sock.getsockname()[1], "token": self.token, "pid": os.getpid()}
+        temp_path = f"{self.info_path}.tmp"
+        fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(info, f)
+        os.replace(temp_path, self.info_path)
+
+    def _serve(self):
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return  # close() 关闭了监听套接字
+            with conn:
+                try:
+                    conn.settimeout(1.0)
+                    conn.sendall((self._handle(read_line(conn)) + "\n").encode("utf-8"))
+                except OSError:
+                    pass
+
+    def _handle(self, line):
+        try:
+            request = json.loads(line)
+            token, argv = request["token"], request["argv"]
+        except (ValueError, TypeError, KeyError):
+            return "错误: 无效的请求"
+        if not isinstance(token, str) or not secrets.compare_digest(token, self.token):
+            return "错误: 令牌不匹配"
+        return self.dispatch(argv)
+
+    def dispatch(self, argv):
+        """校验并执行一条命令（也用于主实例自己启动时命令行上的命令）"""
+        if not isinstance(argv, list) or not argv or not all(isinstance(arg, str) for arg in argv):
+            return "错误: 无效的命令"
+        if argv[0] not in COMMANDS:
+            return f"错误: 未知命令 {argv[0]}（可用: {' '.join(COMMANDS)}）"
+        return self.handler(argv)
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+        try:
+            os.unlink(self.info_path)
+        except OSError:
+            pass
+
+
+def read_line(conn):
+    data = b""
+    while not data.endswith(b"\n") and len(data) < MAX_REQUEST:
+        chunk = conn.recv(4096)
+        if not chunk:
+            break
+        data += chunk
+    return data.decode("utf-8", "replace")
+
+
+def send_command(argv, info_path=None, timeout=CONNECT_TIMEOUT):
+    """把命令交给正在运行的实例并返回它的回复；在 timeout 内都连不上时抛出 OSError"""
+    info_path = info_path or runtime_path(INFO_FILE)
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with open(info_path, 'r', encoding='utf-8') as f:
+                info = json.load(f)
+            with socket.create_connection(("127.0.0.1", info["port"]), timeout=timeout) as conn:
+                request = json.dumps({"token": info["token"], "argv": argv}, ensure_ascii=False)
+                conn.sendall(request.encode("utf-8") + b"\n")
+                return read_line(conn).strip()
+        except (OSError, ValueError, KeyError) as e:
+            # 主实例刚拿到锁、还没写出端口，或者信息文件是上一个崩溃的实例留下的
+            if time.monotonic() >= deadline:
+                raise OSError(f"无法连接正在运行的实例: {e}") from None
+            time.sleep(0.02)
+
+
+def parse_assignments(args, known=None):
+    """把 ["focus_minutes=45", "sound_file=bell.wav"] 解析为字典，数字转成 int
+
+    给出 known（全部设置项的名字）时，任何一个键不在其中都抛出 ValueError，一项也不返回。
+    """
+    values = {}
+    for arg in args:
+        key, sep, value = arg.partition("=")
+        if not sep or not key:
+            raise ValueError(f"设置项应写成 键=值: {arg}")
+        values[key] = int(value) if value.lstrip("-").isdigit() else value
+    if known is not None:
+        unknown = [key for key in values if key not in known]
+        if unknown:
+            raise ValueError(f"未知的设置项: {', '.join(unknown)}（可用: {' '.join(known)}）")
+    return values
+
+
+def command_from_argv(argv):
+    """命令行中去掉 --trace 路径之后的部分，例如 ["pause"] 或 ["set", "focus_minutes=45"]"""
+    argv = list(argv)
+    if "--trace" in argv:
+        index = argv.index("--trace")
+        del argv[index:index + 2]
+    return argv
+
+
+def claim_or_forward(argv):
+    """主程序在导入 Tk 之前调用
+
+    成为唯一实例时返回持有的 InstanceLock；已有实例在运行时把 argv（为空时是 show）
+    交给它，然后以 0（成功）或 1（失败）退出进程。
+    """
+    lock = InstanceLock()
+    if lock.acquire():
+        return lock
+    try:
+        reply = send_command(argv or ["show"])
+    except OSError as e:
+        print(f"已有专注时钟在运行，但{e}", file=sys.stderr)
+        sys.exit(1)
+    if reply != "ok":
+        print(reply, file=sys.stderr)
+        sys.exit(1)
+    sys.exit(0)
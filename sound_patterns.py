@@ -0,0 +1,249 @@
+"""提示音型：在设置中声明一次提示由哪些声音组成，编译一次成为一段预混好的 PCM
+
+音型是一个字符串：用 ";" 分隔依次播放的段，段内用 "+" 叠加同时发声的层。每一层是
+    file                 设置中的提示音文件
+    file:路径            另一个声音文件（例如录好的语音提示）
+    tone:频率:秒[:音量]   正弦音，例如 tone:880:0.15
+    sweep:起始频率:结束频率:秒[:音量]  滑音，例如 sweep:440:880:0.5
+    rest:秒              静音
+也可以直接写 PRESETS 中的名字，例如 "double"。
+
+整个音型被渲染成一段 16 位 PCM，作为一个连续的流播放：段与段之间的间隔精确到采样点，
+不再依赖线程调度，文件也只解码一次。有 NumPy 时用向量化运算混音，没有时退回纯 Python
+（结果相同，只是编译慢一些；编译只在音型或提示音文件变化时进行）。
+"""
+import math
+from array import array
+
+from audio import DecodedSound
+
+DEFAULT_SAMPLE_RATE = 44100
+DEFAULT_GAIN = 0.3
+FADE_SECONDS = 0.005  # 合成音的淡入淡出，避免起止处的爆音
+MAX_SECONDS = 30.0
+
+PRESETS = {
+    "single": "file",
+    "double": "file;rest:0.1;file",
+    "chime": "tone:880:0.15;rest:0.05;tone:1320:0.3",
+    "rising": "sweep:440:880:0.6",
+    "triad": "tone:523:0.6+tone:659:0.6+tone:784:0.6",
+}
+
+
+def parse_pattern(spec):
+    """把音型字符串解析为 ((层, ...), ...)；无效时抛出 ValueError"""
+    spec = PRESETS.get(spec.strip(), spec)
+    segments = []
+    total = 0.0
+    for segment_text in spec.split(";"):
+        layers = []
+        for text in segment_text.split("+"):
+            text = text.strip()
+            kind, _, rest = text.partition(":")
+            if kind == "file":
+                layers.append(("file", rest.strip() or None))
+                continue
+            try:
+                args = tuple(float(value) for value in rest.split(":")) if rest else ()
+            except ValueError:
+                raise ValueError(f"音型中的数字无效: {text}") from None
+            if kind == "rest" and len(args) == 1:
+                layer = ("sweep", 0.0, 0.0, args[0], 0.0)
+            elif kind == "tone" and len(args) in (2, 3):
+                layer = ("sweep", args[0], args[0], args[1], args[2] if len(args) == 3 else DEFAULT_GAIN)
+            elif kind == "sweep" and len(args) in (3, 4):
+                layer = ("sweep",) + args[:3] + ((args[3] if len(args) == 4 else DEFAULT_GAIN),)
+            else:
+                raise ValueError(f"无法识别的音型片段: {text or '（空）'}")
+            if layer[3] <= 0 or layer[1] < 0 or layer[2] < 0 or not 0 <= layer[4] <= 1:
+                raise ValueError(f"音型片段的时长、频率或音量超出范围: {text}")
+            total += layer[3]
+            layers.append(layer)
+        segments.append(tuple(layers))
+    if total > MAX_SECONDS:
+        raise ValueError(f"合成音总时长不能超过 {MAX_SECONDS:.0f} 秒")
+    return tuple(segments)
+
+
+def decode_pcm(path):
+    """把声音文件解码为 16 位 PCM；没有 miniaudio 时只支持 16 位 WAV"""
+    try:
+        import miniaudio
+    except ImportError:
+        miniaudio = None
+    if miniaudio is not None:
+        decoded = miniaudio.decode_file(path, output_format=miniaudio.SampleFormat.SIGNED16)
+        return DecodedSound(path, decoded.samples, decoded.nchannels, decoded.sample_rate)
+    import wave
+    try:
+        with wave.open(path, 'rb') as f:
+            if f.getsampwidth() != 2:
+                raise ValueError("只支持 16 位 WAV")
+            samples = array('h')
+            samples.frombytes(f.readframes(f.getnframes()))
+            return DecodedSound(path, samples, f.getnchannels(), f.getframerate())
+    except (wave.Error, EOFError, ValueError) as e:
+        raise ValueError(f"没有安装 miniaudio 时音型只能使用 16 位 WAV 文件: {path} ({e})") from None
+
+
+def file_steps(spec, sound_path):
+    """只由整段文件和静音组成的音型（例如 "single"、"double"）返回依次播放的 (路径或静音秒数, ...)；否则返回 None"""
+    steps = []
+    for layers in parse_pattern(spec):
+        if len(layers) != 1:
+            return None
+        layer = layers[0]
+        if layer[0] == "file":
+            steps.append(layer[1] or sound_path)
+        elif layer[1] == layer[2] == layer[4] == 0:
+            steps.append(layer[3])
+        else:
+            return None
+    return tuple(steps)
+
+
+class NumpyMixer:
+    """缓冲区是 (声道, 帧) 的 float32 数组"""
+
+    def __init__(self, np, channels, sample_rate):
+        self.np = np
+        self.channels = channels
+        self.sample_rate = sample_rate
+
+    def sweep(self, start_hz, end_hz, seconds, gain):
+        np = self.np
+        frames = int(round(seconds * self.sample_rate))
+        frequency = np.linspace(start_hz, end_hz, frames, dtype=np.float64)
+        wave = np.sin(np.cumsum(frequency) * (2 * math.pi / self.sample_rate)) * gain
+        fade = min(int(FADE_SECONDS * self.sample_rate), frames // 2)
+        if fade:
+            ramp = np.linspace(0.0, 1.0, fade)
+            wave[:fade] *= ramp
+            wave[frames - fade:] *= ramp[::-1]
+        return np.tile(wave.astype(np.float32), (self.channels, 1))
+
+    def pcm(self, sound):
+        np = self.np
+        data = np.frombuffer(sound.samples, dtype=np.int16).astype(np.float32) / 32768.0
+        data = data.reshape(-1, sound.channels).T
+        if sound.sample_rate != self.sample_rate:
+            frames = int(data.shape[1] * self.sample_rate / sound.sample_rate)
+            positions = np.arange(frames) * (sound.sample_rate / self.sample_rate)
+            source = np.arange(data.shape[1])
+            data = np.stack([np.interp(positions, source, channel) for channel in data]).astype(np.float32)
+        if data.shape[0] < self.channels:
+            data = np.concatenate([data] + [data[:1]] * (self.channels - data.shape[0]))
+        return data[:self.channels]
+
+    def mix(self, layers):
+        np = self.np
+        mixed = np.zeros((self.channels, max(layer.shape[1] for layer in layers)), dtype=np.float32)
+        for layer in layers:
+            mixed[:, :layer.shape[1]] += layer
+        return mixed
+
+    def to_samples(self, segments):
+        np = self.np
+        buffer = np.concatenate(segments, axis=1)
+        pcm = (np.clip(buffer, -1.0, 1.0) * 32767.0).astype(np.int16)
+        return array('h', pcm.T.tobytes())
+
+
+class PythonMixer:
+    """没有 NumPy 时的实现：缓冲区是每个声道一个 float 列表"""
+
+    def __init__(self, channels, sample_rate):
+        self.channels = channels
+        self.sample_rate = sample_rate
+
+    def sweep(self, start_hz, end_hz, seconds, gain):
+        frames = int(round(seconds * self.sample_rate))
+        fade = min(int(FADE_SECONDS * self.sample_rate), frames // 2)
+        step = (end_hz - start_hz) / (frames - 1) if frames > 1 else 0.0
+        scale = 2 * math.pi / self.sample_rate
+        wave = []
+        phase = 0.0
+        for i in range(frames):
+            phase += (start_hz + step * i) * scale
+            value = math.sin(phase) * gain
+            if i < fade:
+                value *= i / (fade - 1) if fade > 1 else 0.0
+            elif i >= frames - fade:
+                value *= (frames - 1 - i) / (fade - 1) if fade > 1 else 0.0
+            wave.append(value)
+        return [wave] + [list(wave) for _ in range(self.channels - 1)]
+
+    def pcm(self, sound):
+        channels = [[value / 32768.0 for value in sound.samples[c::sound.channels]]
+                    for c in range(sound.channels)]
+        if sound.sample_rate != self.sample_rate:
+            ratio = sound.sample_rate / self.sample_rate
+            resampled = []
+            for channel in channels:
+                last = len(channel) - 1
+                out = []
+                for i in range(int(len(channel) / ratio)):
+                    position = i * ratio
+                    index = int(position)
+                    fraction = position - index
+                    nxt = channel[index + 1] if index < last else channel[index]
+                    out.append(channel[index] + (nxt - channel[index]) * fraction)
+                resampled.append(out)
+            channels = resampled
+        while len(channels) < self.channels:
+            channels.append(list(channels[0]))
+        return channels[:self.channels]
+
+    def mix(self, layers):
+        frames = max(len(layer[0]) for layer in layers)
+        mixed = [[0.0] * frames for _ in range(self.channels)]
+        for layer in layers:
+            for target, source in zip(mixed, layer):
+                for i, value in enumerate(source):
+                    target[i] += value
+        return mixed
+
+    def to_samples(self, segments):
+        samples = array('h')
+        for segment in segments:
+            for frame in zip(*segment):
+                for value in frame:
+                    samples.append(int(max(-1.0, min(1.0, value)) * 32767.0))
+        return samples
+
+
+def make_mixer(channels, sample_rate):
+    try:
+        import numpy
+    except ImportError:
+        return PythonMixer(channels, sample_rate)
+    return NumpyMixer(numpy, channels, sample_rate)
+
+
+def render(spec, sound_path, name=None, decode=decode_pcm):
+    """把音型编译为一个 DecodedSound（整段预混好的交错 PCM）
+
+    输出格式跟随第一个声音文件（声道数取所有文件中最多的）；只有合成音时为 44.1 kHz 单声道。
+    同一个文件在音型中出现多次也只解码一次。
+    """
+    segments = parse_pattern(spec)
+    sounds = {}
+    for layers in segments:
+        for layer in layers:
+            if layer[0] == "file":
+                path = layer[1] or sound_path
+                if path not in sounds:
+                    sounds[path] = decode(path)
+    first = next(iter(sounds.values()), None)
+    sample_rate = first.sample_rate if first is not None else DEFAULT_SAMPLE_RATE
+    channels = min(max((sound.channels for sound in sounds.values()), default=1), 2)
+    mixer = make_mixer(channels, sample_rate)
+
+    converted = {path: mixer.pcm(sound) for path, sound in sounds.items()}
+    rendered = []
+    for layers in segments:
+        buffers = [converted[layer[1] or sound_path] if layer[0] == "file" else mixer.sweep(*layer[1:])
+                   for layer in layers]
+        rendered.append(buffers[0] if len(buffers) == 1 else mixer.mix(buffers))
+    return DecodedSound(name or spec, mixer.to_samples(rendered), channels, sample_rate)
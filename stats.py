@@ -0,0 +1,202 @@
+import datetime
+import os
+import struct
+import threading
+
+from journal import (
+    BREAK, FOCUS, MICRO_BREAK, PHASE_NAMES,
+    MICRO_BREAK_FIRED, PHASE_END, RESUME, STOP,
+)
+
+# 文件头：魔数 + 第一天的日期序号（date.toordinal()）
+MAGIC = b"FTS1"
+_HEADER = struct.Struct("<4sI")
+# 每天一个定长桶：专注秒数、完成轮数、触发的微休息、完成的微休息、暂停秒数
+_BUCKET = struct.Struct("<dIIId")
+
+
+class DayStats:
+    """一天（或一段时间）的聚合统计"""
+
+    __slots__ = ("focus_seconds", "cycles", "micro_breaks", "micro_breaks_honored", "pause_seconds")
+
+    def __init__(self, focus_seconds=0.0, cycles=0, micro_breaks=0, micro_breaks_honored=0, pause_seconds=0.0):
+        self.focus_seconds = focus_seconds
+        self.cycles = cycles
+        self.micro_breaks = micro_breaks
+        self.micro_breaks_honored = micro_breaks_honored
+        self.pause_seconds = pause_seconds
+
+    def add(self, other):
+        self.focus_seconds += other.focus_seconds
+        self.cycles += other.cycles
+        self.micro_breaks += other.micro_breaks
+        self.micro_breaks_honored += other.micro_breaks_honored
+        self.pause_seconds += other.pause_seconds
+
+    def pack(self):
+        return _BUCKET.pack(self.focus_seconds, self.cycles, self.micro_breaks,
+                            self.micro_breaks_honored, self.pause_seconds)
+
+    @classmethod
+    def unpack_from(cls, buffer, offset=0):
+        return cls(*_BUCKET.unpack_from(buffer, offset))
+
+    def __repr__(self):
+        return (f"DayStats(focus_seconds={self.focus_seconds}, cycles={self.cycles}, "
+                f"micro_breaks={self.micro_breaks}, micro_breaks_honored={self.micro_breaks_honored}, "
+                f"pause_seconds={self.pause_seconds})")
+
+
+def delta_for(event, phase, value):
+    """一条日志记录对当天统计的增量；与统计无关的记录返回 None"""
+    delta = DayStats()
+    if event == PHASE_END and phase == FOCUS:
+        delta.focus_seconds = value
+    elif event == PHASE_END and phase == BREAK:
+        delta.cycles = 1
+    elif event == PHASE_END and phase == MICRO_BREAK:
+        delta.micro_breaks_honored = 1
+    elif event == MICRO_BREAK_FIRED:
+        delta.micro_breaks = 1
+    elif event == RESUME:
+        delta.pause_seconds = value
+    elif event == STOP and phase == FOCUS:
+        delta.focus_seconds = value
+    else:
+        return None
+    return delta
+
+
+class StatsStore:
+    """按天预聚合的统计数据，保存在一个定长桶数组文件中
+
+    第 N 天的桶位于 文件头 + (N - 第一天) * 桶大小，这个偏移就是索引：
+    范围查询只需一次 seek 和一次连续读取，与历史总长度无关。
+    record() 与 JournalWriter.record() 签名相同，可以直接接在 JournalListener 后面，
+    在每个阶段结束时增量更新当天的桶。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        if not os.path.exists(path) or os.path.getsize(path) < _HEADER.size:
+            self._file = open(path, 'w+b')
+            self.first_day = None
+            self.day_count = 0
+        else:
+            self._file = open(path, 'r+b')
+            magic, first_day = _HEADER.unpack(self._file.read(_HEADER.size))
+            if magic != MAGIC:
+                raise ValueError(f"{path} 不是统计文件")
+            self.first_day = first_day
+            self.day_count = (os.path.getsize(path) - _HEADER.size) // _BUCKET.size
+
+    def is_empty(self):
+        return self.first_day is None
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    # --- 写入 ---
+
+    def _offset(self, day):
+        return _HEADER.size + (day - self.first_day) * _BUCKET.size
+
+    def _ensure_day(self, day):
+        """保证 day 有对应的桶；早于第一天时把已有数据整体后移（只在导入旧数据时发生）"""
+        if self.first_day is None:
+            self.first_day = day
+            self._file.seek(0)
+            self._file.write(_HEADER.pack(MAGIC, day))
+        elif day < self.first_day:
+            self._file.seek(_HEADER.size)
+            existing = self._file.read()
+            self._file.seek(0)
+            self._file.write(_HEADER.pack(MAGIC, day))
+            self._file.write(bytes(_BUCKET.size * (self.first_day - day)))
+            self._file.write(existing)
+            self.day_count += self.first_day - day
+            self.first_day = day
+        if day >= self.first_day + self.day_count:
+            self._file.seek(0, os.SEEK_END)
+            self._file.write(bytes(_BUCKET.size * (day - self.first_day - self.day_count + 1)))
+            self.day_count = day - self.first_day + 1
+
+    def _update(self, day, delta):
+        self._ensure_day(day)
+        offset = self._offset(day)
+        self._file.seek(offset)
+        bucket = DayStats.unpack_from(self._file.read(_BUCKET.size))
+        bucket.add(delta)
+        self._file.seek(offset)
+        self._file.write(bucket.pack())
+
+    def record(self, event, phase=None, cycle=0, value=0.0, timestamp=None):
+        delta = delta_for(event, phase, value)
+        if delta is None:
+            return
+        day = datetime.date.fromtimestamp(timestamp).toordinal()
+        with self._lock:
+            self._update(day, delta)
+            self._file.flush()
+
+    def rebuild(self, records):
+        """从会话日志记录（JournalRecord）重新聚合全部数据，用于首次启用统计"""
+        days = {}
+        for record in records:
+            delta = delta_for(record.event, PHASE_NAMES.get(record.phase), record.value)
+            if delta is None:
+                continue
+            day = datetime.date.fromtimestamp(record.timestamp).toordinal()
+            bucket = days.get(day)
+            if bucket is None:
+                days[day] = delta
+            else:
+                bucket.add(delta)
+
+        with self._lock:
+            self._file.seek(0)
+            self._file.truncate()
+            self.first_day = None
+            self.day_count = 0
+            if not days:
+                return
+            first, last = min(days), max(days)
+            empty = DayStats().pack()
+            self._file.write(_HEADER.pack(MAGIC, first))
+            self._file.write(b"".join(days[day].pack() if day in days else empty
+                                      for day in range(first, last + 1)))
+            self._file.flush()
+            self.first_day = first
+            self.day_count = last - first + 1
+
+    # --- 查询 ---
+
+    def query(self, start, end):
+        """返回 [start, end] 之间每一天的 (date, DayStats)，只读取这些天的桶"""
+        start_day, end_day = start.toordinal(), end.toordinal()
+        result = []
+        with self._lock:
+            if self.first_day is not None:
+                first = max(start_day, self.first_day)
+                last = min(end_day, self.first_day + self.day_count - 1)
+                if first <= last:
+                    self._file.seek(self._offset(first))
+                    data = self._file.read((last - first + 1) * _BUCKET.size)
+                    for i in range(last - first + 1):
+                        result.append((first + i, DayStats.unpack_from(data, i * _BUCKET.size)))
+        stored = dict(result)
+        return [(datetime.date.fromordinal(day), stored.get(day) or DayStats())
+                for day in range(start_day, end_day + 1)]
+
+    def weekly(self, start, end):
+        """按 ISO 周（周一开始）聚合 [start, end]，返回 [(周一日期, DayStats)]"""
+        start = start - datetime.timedelta(days=start.weekday())
+        weeks = []
+        for day, stats in self.query(start, end):
+            if day.weekday() == 0:
+                weeks.append((day, DayStats()))
+            weeks[-1][1].add(stats)
+        return weeks
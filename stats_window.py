@@ -0,0 +1,69 @@
+import datetime
+import tkinter as tk
+from tkinter import ttk
+
+
+def format_minutes(seconds):
+    return f"{seconds / 60:.0f}"
+
+
+class StatsWindow(tk.Toplevel):
+    """按天、按周显示专注统计，只读取最近几周的预聚合桶"""
+
+    DAYS = 14
+    WEEKS = 8
+    COLUMNS = {
+        "period": ("日期", 100),
+        "focus": ("专注 (分钟)", 90),
+        "cycles": ("完成轮数", 70),
+        "micro": ("微休息 完成/触发", 120),
+        "pause": ("暂停 (分钟)", 90),
+    }
+
+    def __init__(self, parent, stats_store):
+        super().__init__(parent)
+        self.title("统计")
+        self.geometry("520x520")
+
+        self.stats_store = stats_store
+        self.transient(parent)
+
+        self.create_widgets()
+        self.load_stats()
+
+    def create_widgets(self):
+        frame = ttk.Frame(self, padding="10")
+        frame.pack(expand=True, fill="both")
+
+        ttk.Label(frame, text=f"最近 {self.DAYS} 天").pack(anchor="w")
+        self.daily_tree = self.create_table(frame, self.DAYS)
+        ttk.Label(frame, text=f"最近 {self.WEEKS} 周").pack(anchor="w", pady=(10, 0))
+        self.weekly_tree = self.create_table(frame, self.WEEKS)
+
+        ttk.Button(self, text="关闭", command=self.destroy).pack(side="right", padx=10, pady=10)
+
+    def create_table(self, parent, rows):
+        tree = ttk.Treeview(parent, columns=list(self.COLUMNS), show="headings", height=min(rows, 8))
+        for column, (text, width) in self.COLUMNS.items():
+            tree.heading(column, text=text)
+            tree.column(column, width=width, anchor="center")
+        tree.pack(expand=True, fill="both")
+        return tree
+
+    def insert_row(self, tree, label, stats):
+        tree.insert("", "end", values=(
+            label,
+            format_minutes(stats.focus_seconds),
+            stats.cycles,
+            f"{stats.micro_breaks_honored}/{stats.micro_breaks}",
+            format_minutes(stats.pause_seconds),
+        ))
+
+    def load_stats(self):
+        today = datetime.date.today()
+        for day, stats in reversed(self.stats_store.query(today - datetime.timedelta(days=self.DAYS - 1), today)):
+            self.insert_row(self.daily_tree, day.strftime("%m-%d %a"), stats)
+
+        first_week = today - datetime.timedelta(weeks=self.WEEKS - 1)
+        for monday, stats in reversed(self.stats_store.weekly(first_week, today)):
+            self.insert_row(self.weekly_tree, f"{monday:%Y-%m-%d} 周", stats)
@@ -0,0 +1,266 @@
+"""终端版专注时钟：与 FocusApp 相同的专注/微休息/大休息循环，但从不导入 tkinter
+
+适合瘦客户端和 SSH 会话。倒计时用 ANSI 控制序列在同一行原地刷新；提示默认使用
+终端响铃，--alert sound/both 时改用（或同时使用）音频后端；notifications.json 中配置的
+额外接收端（桌面通知、webhook 等）和日历感知的提醒（calendar_index.py）同样生效。上次的会话意外中断时，启动时询问是否继续。按 p 或空格暂停/继续，按 q 退出。
+标准输出不是终端时不刷新倒计时，只逐行打印阶段变化。
+
+用法: python terminal_app.py [--alert bell|sound|both] [--no-journal] [--trace trace.json]
+"""
+import os
+import sys
+import threading
+
+import metrics
+import tracing
+from audio import AudioPlayer, default_backend, resolve_sound_path
+from notify import AlertDispatcher, AudioSink, load_sinks, make_alert, MICRO_BREAK_ALERT, BREAK_END_ALERT
+from calendar_index import open_calendar, route_alert
+from checkpoint import CHECKPOINT_FILE, Checkpointer, describe_resume, load_checkpoint, plan_resume, remove_checkpoint
+from journal import JournalListener, JournalWriter, TeeRecorder, read_journal
+from settings_manager import SettingsManager
+from stats import StatsStore
+from timer_engine import DeadlineScheduler
+from timer_core import CycleListener, FocusCycle, MulticastListener
+
+CLEAR_LINE = "\r\x1b[2K"
+BELL = "\a"
+
+
+class TerminalApp(CycleListener):
+    """所有回调都在主线程的调度器中执行；键盘输入由一个守护线程读取后通过 call_soon 转交"""
+
+    def __init__(self, settings_manager, alert="bell", journal=True, stream=None):
+        self.settings_manager = settings_manager
+        self.stream = stream or sys.stdout
+        self.interactive = self.stream.isatty()
+        self.alert = alert
+        self.status = "准备就绪"
+        self.resume_status = self.status
+        self.timer_text = ""
+        self.last_line = None
+        self.audio = None
+        sinks = []
+        if alert != "bell":
+            self.audio = AudioPlayer(default_backend, on_error=lambda message: self.alerts.errors.record("audio", message))
+            sinks.append(AudioSink(self.audio))
+            self.update_patterns()
+        try:
+            sinks.extend(load_sinks())
+        except ValueError as e:
+            self.show_error(str(e))
+        self.alerts = AlertDispatcher(sinks, on_errors=self.show_error)
+        self.calendar = open_calendar(on_error=lambda message: self.alerts.errors.record("calendar", message))
+
+        self.journal = self.stats = None
+        if journal:
+            self.journal = JournalWriter('focus_journal.bin')
+            self.stats = StatsStore('focus_stats.bin')
+            if self.stats.is_empty():
+                self.stats.rebuild(read_journal(self.journal.path))
+
+        self.scheduler = DeadlineScheduler()
+        self.checkpoint = Checkpointer(CHECKPOINT_FILE, self.scheduler)
+        listeners = [self, self.checkpoint]
+        if self.journal is not None:
+            recorder = TeeRecorder(self.journal, self.stats)
+            listeners.append(JournalListener(recorder, self.scheduler.clock))
+        # 非终端输出时不需要每秒刻度，调度线程只在阶段边界醒来
+        self.cycle = FocusCycle(self.scheduler, settings_manager.settings, listener=MulticastListener(*listeners),
+                                ticks=self.interactive, settings_provider=self.current_settings)
+        self.checkpoint.attach(self.cycle)
+
+    def current_settings(self):
+        if self.settings_manager.reload_if_changed() and self.audio is not None:
+            self.update_patterns()
+            self.preload_patterns()
+        return self.settings_manager.settings
+
+    def update_patterns(self):
+        """只有内容或引用的提示音文件变化的音型才会重新编译"""
+        settings = self.settings_manager.settings
+        sound_path = resolve_sound_path(settings.sound_file)
+        self.audio.set_pattern(MICRO_BREAK_ALERT, settings.micro_break_pattern, sound_path)
+        self.audio.set_pattern(BREAK_END_ALERT, settings.break_end_pattern, sound_path)
+
+    def preload_patterns(self):
+        self.audio.preload_pattern(MICRO_BREAK_ALERT)
+        self.audio.preload_pattern(BREAK_END_ALERT)
+
+    # --- 输出 ---
+
+    def render(self):
+        line = f"{self.status}  {self.timer_text}" if self.timer_text else self.status
+        if line == self.last_line:
+            return
+        self.last_line = line
+        if self.interactive:
+            self.stream.write(CLEAR_LINE + line)
+        else:
+            self.stream.write(line + "\n")
+        self.stream.flush()
+
+    def set_status(self, status):
+        self.status = status
+        if not self.interactive:
+            self.timer_text = ""
+        self.render()
+
+    def show_error(self, message):
+        # 可能在接收端线程中调用；另起一行，避免与倒计时交错
+        self.stream.write("\n" + message.replace("\n", "; ") + "\n")
+        self.stream.flush()
+        self.last_line = None
+
+    def play_alert(self, alert):
+        # 响铃就是写终端本身，直接在调度线程里完成；其余接收端交给派发器
+        if self.alert in ("bell", "both"):
+            self.stream.write(BELL * alert.repeat)
+            self.stream.flush()
+        self.alerts.dispatch(alert)
+
+    # --- CycleListener ---
+
+    def on_focus_start(self, cycle_count):
+        self.set_status(f"第 {cycle_count} 轮：专注")
+
+    def on_micro_break_start(self, seconds):
+        route_alert(self.calendar, self.scheduler, make_alert(MICRO_BREAK_ALERT, f"微休息 {seconds} 秒"), self.play_alert)
+        self.set_status(f"微休息 ({seconds}秒)")
+
+    def on_micro_break_end(self):
+        self.set_status("专注中...")
+
+    def on_break_start(self, cycle_count):
+        self.set_status("大休息")
+
+    def on_break_end(self, cycle_count):
+        route_alert(self.calendar, self.scheduler,
+                    make_alert(BREAK_END_ALERT, f"第 {cycle_count} 轮结束，回来专注吧", repeat=2), self.play_alert)
+
+    def on_tick(self, seconds, is_micro):
+        if is_micro:
+            self.timer_text = f"{seconds:02d}秒"
+        else:
+            self.timer_text = f"{seconds // 60:02d}:{seconds % 60:02d}"
+        self.render()
+
+    def on_pause(self):
+        self.resume_status = self.status
+        self.set_status("已暂停")
+
+    def on_resume(self, paused_for):
+        self.set_status(self.resume_status)
+
+    # --- 输入 ---
+
+    def toggle_pause(self):
+        if self.cycle.paused_at is None:
+            self.cycle.pause()
+        else:
+            self.cycle.resume()
+
+    def quit(self):
+        self.cycle.stop()
+        self.scheduler.stop()
+
+    def handle_key(self, key):
+        """在输入线程中调用"""
+        if key in ("p", " "):
+            self.scheduler.call_soon(self.toggle_pause)
+        elif key in ("q", "\x03", "\x04", ""):
+            self.scheduler.call_soon(self.quit)
+
+    def read_keys(self):
+        if not sys.stdin.isatty():
+            # 输入被重定向时按行读取命令；读到文件末尾就退出
+            for line in sys.stdin:
+                self.handle_key(line.strip()[:1])
+            self.handle_key("")
+            return
+        if os.name == "nt":
+            import msvcrt
+            read_key = msvcrt.getwch
+        else:
+            read_key = lambda: sys.stdin.read(1)
+        while True:
+            self.handle_key(read_key().lower())
+
+    def ask_resume(self):
+        """发现上次意外中断的会话时在终端里询问是否继续；输入不是终端时不继续"""
+        state = load_checkpoint(CHECKPOINT_FILE)
+        if state is None:
+            return None
+        settings = self.settings_manager.settings
+        point = plan_resume(state, settings)
+        if point is not None and self.interactive and sys.stdin.isatty():
+            answer = input(f"{describe_resume(point)} [Y/n] ").strip().lower()
+            if answer in ("", "y", "yes"):
+                return plan_resume(state, settings) # 按回答时的时间重新计算
+        remove_checkpoint(CHECKPOINT_FILE)
+        return None
+
+    def run(self):
+        resume = self.ask_resume()
+        restore = enter_cbreak_mode()
+        if self.interactive:
+            self.stream.write("p/空格 暂停·继续    q 退出\n")
+        if self.audio is not None:
+            self.preload_patterns()
+        threading.Thread(target=self.read_keys, name="TerminalInput", daemon=True).start()
+        if resume is not None:
+            self.scheduler.call_soon(self.cycle.restore, resume.cycle, resume.phase, resume.remaining)
+            if resume.paused:
+                self.scheduler.call_soon(self.cycle.pause) # 检查点是暂停时写的，恢复后保持暂停
+        else:
+            self.scheduler.call_soon(self.cycle.start)
+        try:
+            self.scheduler.run()
+        except KeyboardInterrupt:
+            self.cycle.stop() # 让日志记下停止时的阶段和已进行的时长
+        finally:
+            if restore is not None:
+                restore()
+            self.stream.write("\n")
+            self.stream.flush()
+            if self.journal is not None:
+                self.journal.close()
+                self.stats.close()
+            if self.calendar is not None:
+                self.calendar.close()
+            self.alerts.close()
+            if self.audio is not None:
+                self.audio.close()
+
+
+def enter_cbreak_mode():
+    """让按键不必回车即可读取；返回恢复终端设置的函数（不适用时返回 None）"""
+    if os.name == "nt" or not sys.stdin.isatty():
+        return None
+    import termios
+    import tty
+    fd = sys.stdin.fileno()
+    saved = termios.tcgetattr(fd)
+    tty.setcbreak(fd)
+    return lambda: termios.tcsetattr(fd, termios.TCSADRAIN, saved)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="终端版专注时钟（不依赖 Tk）")
+    parser.add_argument("--alert", choices=("bell", "sound", "both"), default="bell",
+                        help="提示方式：终端响铃、提示音或两者")
+    parser.add_argument("--no-journal", action="store_true", help="不写会话日志和统计")
+    parser.add_argument("--trace", help="把热路径追踪写入该文件（Chrome trace 格式）")
+    args = parser.parse_args()
+
+    metrics.configure_from_env()
+    tracing.configure(args.trace)
+    tracing.instrument(TerminalApp, "render", "ui")
+    app = TerminalApp(SettingsManager(), alert=args.alert, journal=not args.no_journal)
+    app.run()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,443 @@
+import math
+import random
+import time
+
+from session_plan import SessionPlan, extend_cycle, FOCUS_START, MICRO_START, MICRO_END, BREAK_START, BREAK_END
+from settings_manager import Settings
+from timer_engine import DeadlineScheduler, VirtualClock
+
+# 阶段名称
+FOCUS = "focus"
+MICRO_BREAK = "micro"
+BREAK = "break"
+
+
+class CycleListener:
+    """FocusCycle 的事件接收者，按需覆盖感兴趣的方法即可
+
+    所有方法都在调度器线程中被调用，实现时不要做耗时操作。
+    """
+
+    __slots__ = ()
+
+    def on_focus_start(self, cycle_count):
+        pass
+
+    def on_micro_break_start(self, seconds):
+        pass
+
+    def on_micro_break_end(self):
+        pass
+
+    def on_break_start(self, cycle_count):
+        pass
+
+    def on_break_end(self, cycle_count):
+        pass
+
+    def on_tick(self, seconds, is_micro):
+        pass
+
+    def on_pause(self):
+        pass
+
+    def on_resume(self, paused_for):
+        pass
+
+    def on_stop(self):
+        pass
+
+    def on_settings(self, settings):
+        """会话开始或阶段边界取到了新的设置快照"""
+        pass
+
+
+class CoalescingListener(CycleListener):
+    """阶段变化、暂停和恢复时把状态标记为待写，通过 call_soon 合并成一次 flush()
+
+    同一时刻接连发生的事件（例如轮次交替时的 on_break_end 和 on_focus_start）只写一次，
+    而且写入发生在回调之后，新一轮的计划已经编译好。子类实现 flush()，按需覆盖 on_stop()；
+    self.scheduler 要在第一个事件之前设置好。
+    """
+
+    def __init__(self, scheduler=None):
+        self.scheduler = scheduler
+        self.flush_pending = False
+
+    def mark_dirty(self):
+        if not self.flush_pending:
+            self.flush_pending = True
+            self.scheduler.call_soon(self.flush)
+
+    def flush(self):
+        self.flush_pending = False
+
+    def on_focus_start(self, cycle_count):
+        self.mark_dirty()
+
+    def on_micro_break_start(self, seconds):
+        self.mark_dirty()
+
+    def on_micro_break_end(self):
+        self.mark_dirty()
+
+    def on_break_start(self, cycle_count):
+        self.mark_dirty()
+
+    def on_pause(self):
+        self.mark_dirty()
+
+    def on_resume(self, paused_for):
+        self.mark_dirty()
+
+
+class MulticastListener(CycleListener):
+    """把事件依次转发给多个 listener"""
+
+    def __init__(self, *listeners):
+        self.listeners = list(listeners)
+
+    def on_focus_start(self, cycle_count):
+        for listener in self.listeners:
+            listener.on_focus_start(cycle_count)
+
+    def on_micro_break_start(self, seconds):
+        for listener in self.listeners:
+            listener.on_micro_break_start(seconds)
+
+    def on_micro_break_end(self):
+        for listener in self.listeners:
+            listener.on_micro_break_end()
+
+    def on_break_start(self, cycle_count):
+        for listener in self.listeners:
+            listener.on_break_start(cycle_count)
+
+    def on_break_end(self, cycle_count):
+        for listener in self.listeners:
+            listener.on_break_end(cycle_count)
+
+    def on_tick(self, seconds, is_micro):
+        for listener in self.listeners:
+            listener.on_tick(seconds, is_micro)
+
+    def on_pause(self):
+        for listener in self.listeners:
+            listener.on_pause()
+
+    def on_resume(self, paused_for):
+        for listener in self.listeners:
+            listener.on_resume(paused_for)
+
+    def on_stop(self):
+        for listener in self.listeners:
+            listener.on_stop()
+
+    def on_settings(self, settings):
+        for listener in self.listeners:
+            listener.on_settings(settings)
+
+
+class FocusCycle:
+    """专注 / 微休息 / 大休息 状态机，不依赖任何 GUI
+
+    时间来自注入的调度器（真实时钟或 VirtualClock），随机间隔来自注入的
+    random.Random 实例，相同的种子会得到完全相同的微休息序列。
+    每轮开始时把整轮的事件预编译成一个 SessionPlan，之后只需按顺序执行计划；
+    暂停恢复时计划整体后移（O(1)），界面可以通过 upcoming() 预览接下来的提示。
+    settings 是一份 Settings 快照（也接受普通 dict）；若提供 settings_provider，
+    每次阶段切换时会调用它取新快照，快照变化时从当前位置重新编译本轮剩余的计划，
+    阶段进行中使用的值不会改变。
+    除构造函数外，所有方法都必须在调度器线程中调用。
+    """
+
+    # 一个进程里可能同时有上万个实例（见 multi_timer.TimerManager），不使用 __dict__
+    __slots__ = (
+        "scheduler", "settings", "settings_provider", "listener", "rng", "ticks",
+        "phase", "cycle_count", "plan", "focus_end", "phase_end_at",
+        "paused_at", "pending_calls", "tick_call",
+    )
+
+    def __init__(self, scheduler, settings, listener=None, rng=None, ticks=True, settings_provider=None):
+        self.scheduler = scheduler
+        if isinstance(settings, dict):
+            settings = Settings.from_dict(settings)
+        self.settings = settings
+        self.settings_provider = settings_provider
+        self.listener = listener or CycleListener()
+        self.rng = rng or random.Random()
+        self.ticks = ticks
+
+        self.phase = None
+        self.cycle_count = 0
+        self.plan = None
+        # 以下两个时间都相对计划起点，暂停偏移由计划统一处理
+        self.focus_end = 0.0      # 专注的名义结束时间（微休息可能跨过它）
+        self.phase_end_at = 0.0   # 当前阶段的结束时间，用于倒计时
+        self.paused_at = None
+        self.pending_calls = []
+        self.tick_call = None
+
+    @property
+    def phase_end(self):
+        """当前阶段的结束时间（绝对时间，已计入暂停）"""
+        plan = self.plan
+        return plan.origin + plan.offset + self.phase_end_at
+
+    def start(self, cycle_count=1):
+        self.listener.on_settings(self.settings)
+        self.begin_focus(cycle_count)
+
+    def restore(self, cycle_count, phase, remaining):
+        """从检查点继续：phase 是 FOCUS 或 BREAK，本阶段还剩 remaining 秒
+
+        计划起点前移到阶段“已经进行”的位置，倒计时和大休息时间与正常进行时一致；
+        恢复后的专注从现在起重新抽取微休息间隔。
+        """
+        self.listener.on_settings(self.settings)
+        self.cycle_count = cycle_count
+        settings = self.settings
+        now = self.scheduler.now()
+        if phase == BREAK:
+            full = settings.break_minutes * 60
+            plan = SessionPlan(now - (full - min(remaining, full)))
+            plan.append(0.0, BREAK_START, cycle_count)
+            extend_cycle(plan, settings, self.rng, cycle_count, 0.0, BREAK_START)
+            self.listener.on_break_start(cycle_count)
+        else:
+            full = settings.focus_minutes * 60
+            elapsed = full - min(remaining, full)
+            plan = SessionPlan(now - elapsed)
+            plan.append(0.0, FOCUS_START, cycle_count)
+            extend_cycle(plan, settings, self.rng, cycle_count, elapsed, MICRO_END, full)
+            self.listener.on_focus_start(cycle_count)
+            self.focus_end = full
+            phase = FOCUS
+        plan.index = 1
+        self.plan = plan
+        self.phase = phase
+        self.phase_end_at = full
+        self.arm_phase()
+
+    def stop(self):
+        if self.phase is None:
+            return
+        self.cancel_pending()
+        self.listener.on_stop()
+        self.phase = None
+        self.paused_at = None
+
+    def pause(self):
+        if self.phase is None or self.paused_at is not None:
+            return
+        self.paused_at = self.scheduler.now()
+        self.cancel_pending()
+        self.listener.on_pause()
+
+    def resume(self):
+        if self.paused_at is None:
+            return
+        # 暂停期间时钟照常前进，把计划中剩余的事件整体后移即可
+        paused_for = self.scheduler.now() - self.paused_at
+        self.paused_at = None
+        self.listener.on_resume(paused_for)
+        self.plan.shift(paused_for)
+        self.arm_phase()
+
+    def set_ticks(self, enabled):
+        """打开或关闭每秒刻度（例如窗口最小化时），重新打开时立即报告一次当前剩余时间"""
+        if enabled == self.ticks:
+            return
+        self.ticks = enabled
+        if not enabled:
+            if self.tick_call is not None:
+                self.scheduler.cancel(self.tick_call)
+                self.tick_call = None
+        elif self.phase is not None and self.paused_at is None:
+            self.schedule_tick(self.phase_end, self.phase == MICRO_BREAK)
+
+    def upcoming(self, limit=None, kinds=None):
+        """预览本轮接下来的事件 [(绝对时间, 类型, 轮次)]；暂停中返回按当前进度推算的时间"""
+        if self.plan is None or self.phase is None:
+            return []
+        events = self.plan.upcoming(limit, kinds)
+        if self.paused_at is not None:
+            paused_for = self.scheduler.now() - self.paused_at
+            events = [(when + paused_for, kind, cycle) for when, kind, cycle in events]
+        return events
+
+    def refresh_settings(self):
+        """阶段边界：取最新的设置快照，变化时返回 True"""
+        if self.settings_provider is not None:
+            settings = self.settings_provider()
+            if settings is not self.settings:
+                self.settings = settings
+                self.listener.on_settings(settings)
+                return True
+        return False
+
+    def replan(self, phase):
+        """设置变化后，丢弃本轮尚未执行的事件，从刚开始的阶段重新编译"""
+        plan = self.plan
+        start = plan.times[plan.index - 1]
+        plan.truncate(plan.index)
+        extend_cycle(plan, self.settings, self.rng, self.cycle_count, start, phase, self.focus_end)
+
+    def begin_focus(self, cycle_count):
+        self.refresh_settings()
+        self.cycle_count = cycle_count
+        self.listener.on_focus_start(cycle_count)
+        self.plan = extend_cycle(SessionPlan(self.scheduler.now()), self.settings, self.rng, cycle_count, 0.0)
+        self.plan.index = 1  # FOCUS_START 就是现在
+        self.phase = FOCUS
+        self.focus_end = self.phase_end_at = self.settings.focus_minutes * 60
+        self.arm_phase()
+
+    def arm_phase(self):
+        """只把计划中的下一个事件和倒计时刻度放入调度器"""
+        self.cancel_pending()
+        if self.phase is None:
+            return
+        self.schedule_tick(self.phase_end, self.phase == MICRO_BREAK)
+        self.schedule(self.plan.next_time(), self.run_next)
+
+    def run_next(self):
+        plan = self.plan
+        kind = plan.kinds[plan.index]
+        plan.index += 1
+        if kind == MICRO_START:
+            self.begin_micro_break()
+        elif kind == MICRO_END:
+            self.end_micro_break()
+        elif kind == BREAK_START:
+            self.end_focus()
+        elif kind == BREAK_END:
+            self.end_break()
+
+    def schedule(self, when, callback, *args):
+        self.pending_calls.append(self.scheduler.call_at(when, callback, *args))
+
+    def cancel_pending(self):
+        for call in self.pending_calls:
+            self.scheduler.cancel(call)
+        self.pending_calls = []
+        if self.tick_call is not None:
+            self.scheduler.cancel(self.tick_call)
+            self.tick_call = None
+
+    def schedule_tick(self, end_time, is_micro):
+        """立即报告剩余时间，并只在显示的秒数发生变化时安排下一次刻度"""
+        if not self.ticks:
+            return
+        remaining = end_time - self.scheduler.now()
+        self.tick(end_time, max(math.ceil(remaining) - 1, 0), is_micro)
+
+    def tick(self, end_time, seconds, is_micro):
+        self.listener.on_tick(seconds, is_micro)
+        if seconds > 0:
+            # 截止时间由 end_time 推算，而不是累加 sleep(1)，不会产生漂移
+            self.tick_call = self.scheduler.call_at(end_time - seconds, self.tick, end_time, seconds - 1, is_micro)
+
+    def begin_micro_break(self):
+        if self.refresh_settings():
+            self.replan(MICRO_START)
+        self.listener.on_micro_break_start(self.settings.micro_break_seconds)
+        self.phase = MICRO_BREAK
+        self.phase_end_at = self.plan.times[self.plan.index]  # 紧接着的 MICRO_END
+        self.arm_phase()
+
+    def end_micro_break(self):
+        self.listener.on_micro_break_end()
+        self.phase = FOCUS
+        plan = self.plan
+        if plan.next_kind() == BREAK_START and plan.next_time() <= self.scheduler.now():
+            # 微休息跨过了专注结束时间：直接进入大休息
+            plan.index += 1
+            self.end_focus()
+            return
+        self.phase_end_at = self.focus_end
+        self.arm_phase()
+
+    def end_focus(self):
+        if self.refresh_settings():
+            self.replan(BREAK_START)
+        self.listener.on_break_start(self.cycle_count)
+        self.phase = BREAK
+        self.phase_end_at = self.plan.times[self.plan.index]  # 紧接着的 BREAK_END
+        self.arm_phase()
+
+    def end_break(self):
+        self.cancel_pending()
+        self.listener.on_break_end(self.cycle_count)
+        self.begin_focus(self.cycle_count + 1)
+
+
+class RecordingListener(CycleListener):
+    """把事件按 (时间, 名称, 参数) 记录下来，供模拟和回归比较使用"""
+
+    def __init__(self, clock, max_cycles=None, scheduler=None):
+        self.clock = clock
+        self.max_cycles = max_cycles
+        self.scheduler = scheduler
+        self.events = []
+
+    def on_focus_start(self, cycle_count):
+        self.events.append((self.clock.now(), "focus_start", cycle_count))
+
+    def on_micro_break_start(self, seconds):
+        self.events.append((self.clock.now(), "micro_break_start", seconds))
+
+    def on_micro_break_end(self):
+        self.events.append((self.clock.now(), "micro_break_end", None))
+
+    def on_break_start(self, cycle_count):
+        self.events.append((self.clock.now(), "break_start", cycle_count))
+
+    def on_break_end(self, cycle_count):
+        self.events.append((self.clock.now(), "break_end", cycle_count))
+        if self.max_cycles is not None and cycle_count >= self.max_cycles:
+            self.scheduler.stop()
+
+
+def simulate(settings, cycles, seed=None, ticks=False):
+    """在虚拟时钟上跑完 cycles 轮完整的专注/休息循环，返回事件列表"""
+    clock = VirtualClock()
+    scheduler = DeadlineScheduler(clock)
+    listener = RecordingListener(clock, max_cycles=cycles, scheduler=scheduler)
+    cycle = FocusCycle(scheduler, settings, listener, rng=random.Random(seed), ticks=ticks)
+    scheduler.call_soon(cycle.start)
+    scheduler.run()
+    return listener.events
+
+
+def main():
+    import argparse
+    from settings_manager import SettingsManager
+
+    parser = argparse.ArgumentParser(description="在虚拟时钟上模拟专注/休息循环")
+    parser.add_argument("--cycles", type=int, default=1000, help="模拟的完整循环数")
+    parser.add_argument("--seed", type=int, default=None, help="随机种子，用于复现微休息序列")
+    parser.add_argument("--ticks", action="store_true", help="同时模拟每秒的刻度事件")
+    parser.add_argument("--trace", help="把热路径追踪写入该文件（Chrome trace 格式）")
+    args = parser.parse_args()
+
+    if args.trace:
+        import tracing
+        tracing.configure(args.trace)
+        # 作为脚本运行时这里的类属于 __main__，不是 tracing 包装的 timer_core 模块
+        for method_name in ("tick", "run_next"):
+            tracing.instrument(FocusCycle, method_name, "engine")
+
+    settings = SettingsManager().settings
+    started = time.perf_counter()
+    events = simulate(settings, args.cycles, seed=args.seed, ticks=args.ticks)
+    elapsed = time.perf_counter() - started
+
+    micro_breaks = sum(1 for event in events if event[1] == "micro_break_start")
+    simulated_hours = events[-1][0] / 3600 if events else 0
+    print(f"循环数: {args.cycles}  微休息: {micro_breaks}  模拟时长: {simulated_hours:.1f} 小时")
+    print(f"耗时: {elapsed:.3f} 秒  ({args.cycles / elapsed:.0f} 轮/秒)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+import collections
+import heapq
+import itertools
+import threading
+import time
+
+import metrics
+
+
+class MonotonicClock:
+    """真实时钟：使用 time.monotonic，不受系统时间调整（NTP 校时、手动改时间）影响"""
+
+    def now(self):
+        return time.monotonic()
+
+    def wait(self, condition, timeout):
+        """在条件变量上等待，timeout 为 None 时一直等到被唤醒"""
+        condition.wait(timeout)
+
+
+class VirtualClock:
+    """模拟时钟：wait 不真正睡眠，而是直接把时间拨到下一个截止时间
+
+    与 DeadlineScheduler.run(until=...) 配合，可以在一个线程里以远快于真实时间的
+    速度跑完整的专注/休息循环，适合回归测试和容量评估。
+    """
+
+    def __init__(self, start=0.0):
+        self._now = start
+
+    def now(self):
+        return self._now
+
+    def advance(self, seconds):
+        self._now += seconds
+
+    def wait(self, condition, timeout):
+        if timeout is None:
+            raise RuntimeError("虚拟时钟上没有待执行的截止时间，模拟无法继续")
+        if timeout > 0:
+            self._now += timeout
+
+
+class ScheduledCall:
+    """截止时间堆中的一项，可随时取消；执行后同样视为已取消"""
+
+    __slots__ = ("when", "seq", "callback", "args", "cancelled")
+
+    def __init__(self, when, seq, callback, args):
+        self.when = when
+        self.seq = seq
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def __lt__(self, other):
+        if self.when == other.when:
+            return self.seq < other.seq
+        return self.when < other.when
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class DeadlineScheduler:
+    """基于单调时钟截止时间堆的调度器
+
+    所有回调都在调用 run() 的线程中依次执行。线程一直睡到下一个截止时间，
+    其他线程通过 call_soon() / stop() 提交的命令会通过条件变量立即唤醒它，
+    因此暂停、继续、停止都能在毫秒级生效，而不必等待下一次轮询。
+    """
+
+    def __init__(self, clock=None):
+        self.clock = clock or MonotonicClock()
+        self._cond = threading.Condition()
+        self._heap = []
+        self._ready = collections.deque()
+        self._seq = itertools.count()
+        self._stopped = False
+        self._cancelled = 0 # 堆中已取消、尚未弹出的项数（近似值）
+        self.lateness = metrics.histogram(
+            "focus_timer_deadline_lateness_seconds", "截止时间（刻度、微休息、阶段切换）到期后回调实际开始执行的延迟")
+
+    def now(self):
+        return self.clock.now()
+
+    def call_at(self, when, callback, *args):
+        """在单调时间 when 到达时执行 callback，返回可取消的句柄"""
+        call = ScheduledCall(when, next(self._seq), callback, args)
+        with self._cond:
+            heapq.heappush(self._heap, call)
+            # 只有新的截止时间成为堆顶时才需要唤醒等待中的线程
+            if self._heap[0] is call:
+                self._cond.notify()
+        return call
+
+    def call_later(self, delay, callback, *args):
+        return self.call_at(self.clock.now() + delay, callback, *args)
+
+    def cancel(self, call):
+        """取消一个截止时间；已取消的项过多时压缩堆，保证大量计时器反复取消时内存有界"""
+        if call.cancelled:
+            return
+        call.cancel()
+        with self._cond:
+            self._cancelled += 1
+            heap = self._heap
+            if self._cancelled > 64 and self._cancelled * 2 > len(heap):
+                heap[:] = [item for item in heap if not item.cancelled]
+                heapq.heapify(heap)
+                self._cancelled = 0
+
+    def __len__(self):
+        return len(self._heap)
+
+    def call_soon(self, callback, *args):
+        """线程安全地提交一个命令，调度线程会立即被唤醒执行它"""
+        with self._cond:
+            self._ready.append((callback, args))
+            self._cond.notify()
+
+    def stop(self):
+        """让 run() 尽快返回，未执行的截止时间全部丢弃"""
+        with self._cond:
+            self._stopped = True
+            self._heap.clear()
+            self._ready.clear()
+            self._cond.notify()
+
+    @property
+    def stopped(self):
+        return self._stopped
+
+    def _next_callback(self, until):
+        """阻塞直到有命令或到期的截止时间，返回 (callback, args)；停止或到达 until 时返回 None"""
+        with self._cond:
+            while True:
+                if self._stopped:
+                    return None
+                if self._ready:
+                    return self._ready.popleft()
+
+                heap = self._heap
+                while heap and heap[0].cancelled:
+                    heapq.heappop(heap)
+                    if self._cancelled:
+                        self._cancelled -= 1
+
+                now = self.clock.now()
+                if heap and heap[0].when <= now:
+                    call = heapq.heappop(heap)
+                    call.cancelled = True # 已执行的项之后再取消是空操作
+                    if self.lateness is not None:
+                        self.lateness.observe(now - call.when)
+                    return call.callback, call.args
+                if until is not None and now >= until:
+                    return None
+
+                deadline = heap[0].when if heap else None
+                if until is not None and (deadline is None or deadline > until):
+                    deadline = until
+                self.clock.wait(self._cond, None if deadline is None else deadline - now)
+
+    def run(self, until=None):
+        """调度主循环，直到 stop() 被调用；给定 until 时在时钟到达 until 后返回"""
+        while True:
+            item = self._next_callback(until)
+            if item is None:
+                return
+            callback, args = item
+            callback(*args)
@@ -0,0 +1,137 @@
+"""按需开启的热路径追踪，输出 Chrome trace-event JSON（chrome://tracing 或 ui.perfetto.dev 打开）
+
+用户报告“计时卡了一下”或“提示音来晚了”时，用它区分是计时线程、Tk 事件循环、
+音频播放还是设置读写占用了时间。通过环境变量 FOCUS_TIMER_TRACE=路径 或命令行
+--trace 路径 开启，进程退出时写出文件。
+
+追踪是在开启时给选定的方法换上计时包装实现的：关闭时被追踪的代码原样运行，
+没有任何额外判断。事件保存在有界的环形缓冲里，长时间运行只保留最近的部分。
+"""
+import atexit
+import collections
+import functools
+import json
+import os
+import threading
+import time
+
+# 每个事件在缓冲里约 160 字节；五万个事件约 8 MB，主程序大约能保留最近四五个小时
+DEFAULT_CAPACITY = 50000
+
+# (模块, 类, 方法, 分类)：开启追踪时要包装的热路径
+TRACE_POINTS = (
+    ("timer_core", "FocusCycle", "tick", "engine"),
+    ("timer_core", "FocusCycle", "run_next", "engine"),
+    ("timer_core", "FocusCycle", "pause", "engine"),
+    ("timer_core", "FocusCycle", "resume", "engine"),
+    ("ui_mailbox", "UiMailbox", "drain", "ui"),
+    ("audio", "AudioPlayer", "play", "audio"),
+    ("audio", "AudioPlayer", "_handle", "audio"),
+    ("settings_manager", "SettingsManager", "_load_settings", "settings"),
+    ("settings_manager", "SettingsManager", "save_settings", "settings"),
+    ("settings_manager", "SettingsManager", "_reload", "settings"),
+)
+
+TRACER = None
+
+
+class Tracer:
+    """收集完整事件（ph="X"）；deque.append 在多线程下是原子的，记录时不需要加锁"""
+
+    def __init__(self, path, capacity=DEFAULT_CAPACITY):
+        self.path = path
+        self.pid = os.getpid()
+        self.origin = time.perf_counter()
+        self.events = collections.deque(maxlen=capacity)
+        self.threads = {}  # 原生线程 id -> 线程名
+        self._local = threading.local()  # 每个线程只查询并保存一次自己的 id
+        self._patched = []
+
+    def now_us(self):
+        return (time.perf_counter() - self.origin) * 1e6
+
+    def complete(self, name, category, started_us, args=None):
+        tid = getattr(self._local, "tid", None)
+        if tid is None:
+            tid = self._local.tid = threading.get_native_id()
+            self.threads[tid] = threading.current_thread().name
+        # 缓冲里只放元组（名字和分类是共享的字符串），写文件时才展开成事件字典
+        self.events.append((name, category, started_us, self.now_us() - started_us, tid, args))
+
+    def wrap(self, cls, method_name, category):
+        """用计时包装替换 cls 上的方法；重复调用是安全的"""
+        original = cls.__dict__.get(method_name)
+        if original is None or getattr(original, "__traced__", False):
+            return
+        name = f"{cls.__name__}.{method_name}"
+
+        @functools.wraps(original)
+        def traced(*args, **kwargs):
+            started = self.now_us()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                self.complete(name, category, started)
+
+        traced.__traced__ = True
+        setattr(cls, method_name, traced)
+        self._patched.append((cls, method_name, original))
+
+    def install(self):
+        import importlib
+        for module_name, class_name, method_name, category in TRACE_POINTS:
+            cls = getattr(importlib.import_module(module_name), class_name)
+            self.wrap(cls, method_name, category)
+
+    def uninstall(self):
+        for cls, method_name, original in reversed(self._patched):
+            setattr(cls, method_name, original)
+        self._patched = []
+
+    def write(self, path=None):
+        """逐个事件展开并写出，不在内存中同时构造全部事件字典"""
+        path = path or self.path
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write('{"displayTimeUnit": "ms", "traceEvents": [')
+            separator = "\n"
+            for name, category, started_us, duration_us, tid, args in list(self.events):
+                event = {"name": name, "cat": category, "ph": "X", "ts": started_us,
+                         "dur": duration_us, "pid": self.pid, "tid": tid}
+                if args:
+                    event["args"] = args
+                f.write(separator + json.dumps(event, ensure_ascii=False))
+                separator = ",\n"
+            for tid, thread_name in list(self.threads.items()):
+                f.write(separator + json.dumps({"name": "thread_name", "ph": "M", "pid": self.pid, "tid": tid,
+                                                "args": {"name": thread_name}}, ensure_ascii=False))
+                separator = ",\n"
+            f.write("\n]}\n")
+        os.replace(temp_path, path)
+
+
+def configure(path=None):
+    """按参数或 FOCUS_TIMER_TRACE 开启追踪并在退出时写文件；都没有时返回 None"""
+    global TRACER
+    path = path or os.environ.get("FOCUS_TIMER_TRACE")
+    if not path or TRACER is not None:
+        return TRACER
+    TRACER = Tracer(path)
+    TRACER.install()
+    atexit.register(TRACER.write)
+    return TRACER
+
+
+def instrument(cls, method_name, category):
+    """给主程序自己的方法（例如 FocusApp.process_queue）加追踪；未开启时什么都不做"""
+    if TRACER is not None:
+        TRACER.wrap(cls, method_name, category)
+
+
+def trace_path_from_argv(argv):
+    """从没有使用 argparse 的入口（main.py）的参数里取出 --trace 路径"""
+    if "--trace" in argv:
+        index = argv.index("--trace")
+        if index + 1 < len(argv):
+            return argv[index + 1]
+    return None
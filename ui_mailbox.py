@@ -0,0 +1,95 @@
+import itertools
+import threading
+
+import metrics
+
+# 消息类型
+STATUS = "status"
+TIMER = "timer"
+PREVIEW = "preview"
+RESET = "reset"
+ERROR = "error"
+COMMAND = "command"  # 从控制端口转交来的命令
+
+# 这些类型只关心最新值，新值会覆盖尚未显示的旧值
+COALESCED_KINDS = (STATUS, TIMER, PREVIEW)
+
+
+class UiMailbox:
+    """计时线程到 Tk 线程的合并式信箱
+
+    STATUS / TIMER / PREVIEW 只保留最新值（后写覆盖先写），与界面上已显示的值相同则直接丢弃；
+    RESET / ERROR / COMMAND 等离散消息按顺序全部保留。只有信箱从空变为非空时才调用 wake()
+    唤醒 Tk 线程，因此空闲时没有任何定时轮询，UI 卡顿后也只需处理一次最新状态。
+    """
+
+    def __init__(self, wake):
+        self._wake = wake
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+        self._latest = {}     # kind -> (seq, value)，尚未交给 UI 的最新值
+        self._displayed = {}  # kind -> 最近一次交给 UI 的值
+        self._events = []     # [(seq, kind, value)]，离散消息
+        self._armed = False   # 已唤醒 UI、但 UI 还没有 drain
+
+        self.posted = 0
+        self.delivered = 0
+        self.coalesced = 0  # 被更新的值覆盖、从未显示的消息数
+        self.dropped = 0    # 与当前显示值相同而被丢弃的消息数
+        self.depth = metrics.histogram(
+            "focus_timer_mailbox_drain_messages", "每次 drain 交给 UI 的消息数", metrics.DEPTH_BUCKETS)
+
+    def post(self, kind, value=None):
+        """线程安全地投递一条消息"""
+        with self._lock:
+            self.posted += 1
+            if kind in COALESCED_KINDS:
+                pending = self._latest.get(kind)
+                if pending is not None:
+                    if pending[1] == value:
+                        self.dropped += 1
+                    else:
+                        self.coalesced += 1
+                        self._latest[kind] = (next(self._seq), value)
+                    return
+                if self._displayed.get(kind) == value:
+                    self.dropped += 1
+                    return
+                self._latest[kind] = (next(self._seq), value)
+            else:
+                self._events.append((next(self._seq), kind, value))
+
+            if self._armed:
+                return
+            self._armed = True
+        self._wake()
+
+    def drain(self):
+        """在 Tk 线程中调用，按投递顺序返回待处理的 [(kind, value)]"""
+        with self._lock:
+            messages = [(seq, kind, value) for kind, (seq, value) in self._latest.items()]
+            messages.extend(self._events)
+            for kind, (seq, value) in self._latest.items():
+                self._displayed[kind] = value
+            self._latest = {}
+            self._events = []
+            self._armed = False
+            self.delivered += len(messages)
+        if self.depth is not None:
+            self.depth.observe(len(messages))
+        messages.sort()
+        return [(kind, value) for seq, kind, value in messages]
+
+    def invalidate(self):
+        """UI 绕过信箱直接修改了显示内容时调用，之后的值不会再被误判为重复"""
+        with self._lock:
+            self._displayed.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "posted": self.posted,
+                "delivered": self.delivered,
+                "coalesced": self.coalesced,
+                "dropped": self.dropped,
+            }